@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+"""
+adaptive.py — Degradação adaptativa para segurar um FPS alvo em hardware fraco
+- Mede o tempo por frame de cada estágio (EWMA) e a latência ponta a ponta
+  (captura → saída); o estágio mais lento limita o FPS do pipeline
+- Escada de degradação (LADDER), do mais barato de perder ao mais caro:
+    0 normal
+    1 detecção 2× mais espaçada (o tracker cobre os frames do meio)
+    2 + score só a cada 2 frames (os demais repetem a última decisão)
+    3 + detecção em 75% da largura
+    4 + detecção 4× mais espaçada, score a cada 3 frames, 60% da largura
+- Desce um degrau quando o estágio mais lento passa de `high` × orçamento
+  (1/target_fps) ou a latência passa de latency_budget; sobe um degrau só
+  depois de `hold` s folgado (< `low` × orçamento). Se uma subida não se
+  sustenta, o hold dobra (até max_hold) para não oscilar
+- Só ajusta parâmetros (lidos pelos estágios a cada frame); não troca a
+  resolução do frame exibido/gravado
+
+Sem dependências externas.
+"""
+
+import time
+from collections import deque
+from typing import Dict, NamedTuple, Optional
+
+
+class Degrade(NamedTuple):
+    name: str
+    detect_mult: int      # multiplica o --detect-every
+    score_every: int      # pontua 1 a cada N frames
+    detect_scale: float   # fração da largura usada na detecção
+
+
+LADDER = (
+    Degrade("normal", 1, 1, 1.0),
+    Degrade("deteccao/2", 2, 1, 1.0),
+    Degrade("score 1/2", 2, 2, 1.0),
+    Degrade("deteccao 75%", 2, 2, 0.75),
+    Degrade("minimo", 4, 3, 0.6),
+)
+
+
+class AdaptiveScheduler:
+    def __init__(self, target_fps: float, *, latency_budget: float = 0.25,
+                 high: float = 0.9, low: float = 0.6, interval: float = 1.0,
+                 hold: float = 5.0, max_hold: float = 60.0, alpha: float = 0.2,
+                 max_level: Optional[int] = None):
+        self.budget = 1.0 / max(0.1, float(target_fps))
+        self.target_fps = float(target_fps)
+        self.latency_budget = float(latency_budget)
+        self.high, self.low = high, low
+        self.interval = interval
+        self.base_hold = self.hold = hold
+        self.max_hold = max_hold
+        self.alpha = alpha
+        self.max_level = len(LADDER) - 1 if max_level is None else min(max_level, len(LADDER) - 1)
+        self.level = 0
+        self._stage: Dict[str, float] = {}     # EWMA do tempo por frame (s)
+        self._lat: deque = deque(maxlen=64)    # latências recentes (s)
+        self._next_eval = 0.0
+        self._calm_since: Optional[float] = None
+        self._last_up = 0.0
+        self._level_t = time.monotonic()
+        self.time_in_level = [0.0] * len(LADDER)
+        self.changes = 0
+        self.last_eval = (0.0, 0.0)   # (carga, latência) na última avaliação
+
+    # ---------- parâmetros atuais (lidos pelos estágios) ----------
+    @property
+    def mode(self) -> Degrade:
+        return LADDER[self.level]
+
+    def score_this(self, frame_idx: int) -> bool:
+        return frame_idx % self.mode.score_every == 0
+
+    # ---------- medições ----------
+    def observe(self, stage: str, seconds: float):
+        prev = self._stage.get(stage)
+        self._stage[stage] = seconds if prev is None else prev + self.alpha * (seconds - prev)
+
+    def observe_latency(self, seconds: float):
+        self._lat.append(seconds)
+
+    def load(self) -> float:
+        """Estágio mais lento / orçamento por frame (1.0 = no limite do FPS alvo)."""
+        return max(list(self._stage.values()), default=0.0) / self.budget
+
+    def latency(self) -> float:
+        if not self._lat:
+            return 0.0
+        s = sorted(self._lat)
+        return s[int(0.9 * (len(s) - 1))]    # p90 recente
+
+    # ---------- controle ----------
+    def tick(self, now: Optional[float] = None) -> bool:
+        """Reavalia o nível (no máx. a cada `interval` s). True se mudou."""
+        now = time.monotonic() if now is None else now
+        if now < self._next_eval:
+            return False
+        self._next_eval = now + self.interval
+        load, lat = self.load(), self.latency()
+        self.last_eval = (load, lat)
+        if load > self.high or lat > self.latency_budget:
+            self._calm_since = None
+            if self.level < self.max_level:
+                if now - self._last_up < self.hold * 2:
+                    self.hold = min(self.max_hold, self.hold * 2)   # subida não se sustentou
+                return self._set(self.level + 1)
+            return False
+        if load < self.low and lat < self.latency_budget * 0.5:
+            if self._calm_since is None:
+                self._calm_since = now
+            elif self.level > 0 and now - self._calm_since >= self.hold:
+                self._calm_since = now
+                self._last_up = now
+                return self._set(self.level - 1)
+        else:
+            self._calm_since = None
+            if now - self._last_up > self.max_hold:
+                self.hold = self.base_hold
+        return False
+
+    def _set(self, level: int) -> bool:
+        t = time.monotonic()
+        self.time_in_level[self.level] += t - self._level_t
+        self._level_t = t
+        self.level = level
+        self.changes += 1
+        self._stage.clear()         # medições antigas não refletem o nível novo
+        self._lat.clear()
+        return True
+
+    def status_line(self) -> str:
+        load, lat = self.last_eval
+        return (f"nivel={self.level} ({self.mode.name}) carga={load:.2f} "
+                f"latencia_p90={lat * 1e3:.0f}ms alvo={self.target_fps:g}fps")
+
+    def summary(self) -> Dict[str, float]:
+        t = self.time_in_level[:]
+        t[self.level] += time.monotonic() - self._level_t
+        return {LADDER[i].name: round(v, 1) for i, v in enumerate(t) if v > 0}
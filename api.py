@@ -1,12 +1,35 @@
 # api.py
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import Literal, List
+import os, json, threading, time
+from profiler import StartupProfile
+
+# EVENTS_STARTUP_PROFILE=1 imprime [BOOT] com o tempo de import/inicialização por componente
+BOOT = StartupProfile()
+with BOOT.step("import fastapi/pydantic"):
+    from fastapi import FastAPI, HTTPException, Query
+    from fastapi.responses import StreamingResponse
+    from fastapi.middleware.cors import CORSMiddleware
+    from pydantic import BaseModel, Field, ValidationError
+from typing import Literal, List, Dict, Any, Optional
+from contextlib import asynccontextmanager
 from datetime import datetime
-import csv, os
 
-app = FastAPI(title="XP Aposta Consciente - Events API")
+with BOOT.step("import módulos"):
+    from event_store import EventStore
+    from event_log import EventLogWriter, read_tail
+    from event_stats import EventStats
+    from event_stream import EventBroker
+    from event_dedup import DedupWindow, event_key
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start: aquece o STORE e liga o writer do log; stop: grava o pendente e fecha."""
+    _start_log()
+    try:
+        yield
+    finally:
+        _flush_log()
+
+app = FastAPI(title="XP Aposta Consciente - Events API", lifespan=lifespan)
 
 # CORS: libere para Expo (web/Android em rede)
 app.add_middleware(
@@ -17,43 +40,292 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+Level = Literal["leve","medio","alto","neutro"]
+
 class Event(BaseModel):
     deviceId: str
     userId: str
     score: float = Field(ge=0, le=1)
-    level: Literal["leve","medio","alto","neutro"]
+    level: Level
     route: str
     ts: int  # epoch seconds
+    trackId: Optional[int] = None  # rosto (main.py --multi-face); não vai p/ o CSV
+    eventId: Optional[str] = Field(None, max_length=64)  # idempotência (reenvios do cliente)
+
+# memória: últimos 2000 no geral + últimos 500 por usuário/dispositivo/level;
+# no máx. EVENTS_STORE_MAX_KEYS usuários/dispositivos indexados (LRU)
+STORE_MAX_KEYS = int(os.environ.get("EVENTS_STORE_MAX_KEYS", "10000"))
+STORE = EventStore(maxlen=2000, per_key_maxlen=500, max_keys=STORE_MAX_KEYS)
+# agregados incrementais (1m/15m/1h) servidos em /stats; mesmo limite de chaves (LRU)
+STATS = EventStats(max_keys=STORE_MAX_KEYS)
+# push (SSE) p/ o app: fila por conexão; consumidor lento é desconectado
+BROKER = EventBroker(queue_size=int(os.environ.get("EVENTS_STREAM_QUEUE", "256")))
+# idempotência: reenvio (mesmo eventId, ou mesmo conteúdo sem eventId) dentro da
+# janela é confirmado mas não gravado de novo; EVENTS_DEDUP_TTL_S=0 desliga
+_DEDUP_TTL = float(os.environ.get("EVENTS_DEDUP_TTL_S", "600"))
+DEDUP = DedupWindow(_DEDUP_TTL, int(os.environ.get("EVENTS_DEDUP_MAX", "200000"))) if _DEDUP_TTL > 0 else None
+CSV_PATH = os.environ.get("EVENTS_CSV", "events_log.csv")
+CSV_HEADER = ["ts_iso","deviceId","userId","score","level","route","ts"]
+
+# log em disco: buffer + thread própria (o request não espera I/O)
+# EVENTS_LOG_ROTATE_MB=50  EVENTS_LOG_ROTATE_DAILY=1  EVENTS_LOG_COMPRESS=1
+LOG = EventLogWriter(
+    CSV_PATH, CSV_HEADER,
+    flush_rows=int(os.environ.get("EVENTS_LOG_FLUSH_ROWS", "256")),
+    flush_interval=float(os.environ.get("EVENTS_LOG_FLUSH_S", "1.0")),
+    rotate_bytes=int(float(os.environ.get("EVENTS_LOG_ROTATE_MB", "0")) * 1024 * 1024),
+    rotate_daily=os.environ.get("EVENTS_LOG_ROTATE_DAILY", "0") == "1",
+    compress=os.environ.get("EVENTS_LOG_COMPRESS", "0") == "1",
+)
+
+# modo multi-worker (uvicorn --workers N): EVENTS_SHARED_DB=events_shared.db põe
+# STORE/STATS/dedup num SQLite em WAL comum a todos os workers (/events/last igual
+# em qualquer um). O CSV passa a ter um único escritor: o worker que segura o lock
+# <EVENTS_CSV>.lock copia do banco para o arquivo a partir de um cursor salvo; se
+# ele cai, outro assume. Cada worker acompanha o banco por id e alimenta o próprio SSE
+SHARED = None
+SHARED_DB = os.environ.get("EVENTS_SHARED_DB", "")
+SHARED_POLL_S = float(os.environ.get("EVENTS_SHARED_POLL_S", "0.05"))
+SHARED_RETAIN_S = max(3600.0, float(os.environ.get("EVENTS_SHARED_RETAIN_S", "3600")))  # >= janela de 1h do /stats
+if SHARED_DB:
+    with BOOT.step("abrir banco compartilhado"):
+        from event_shared import SharedEventStore, LeaderLock
+        SHARED = SharedEventStore(SHARED_DB)
+    STORE = STATS = SHARED
+    DEDUP = None  # a dedup vai na mesma transação do insert (tabela dedup)
+
+# backend opcional: EVENTS_BACKEND=columnar grava registros binários em
+# <EVENTS_COLUMNAR>.bin (consultas por since/until sem parsear texto) no lugar do CSV;
+# o CSV sai com: python event_columnar.py export --db events_log --out events_log.csv
+COLUMNAR = None
+if os.environ.get("EVENTS_BACKEND", "csv") == "columnar" and SHARED is not None:
+    print("[WARN] EVENTS_BACKEND=columnar não suporta EVENTS_SHARED_DB; usando CSV")
+elif os.environ.get("EVENTS_BACKEND", "csv") == "columnar":
+    with BOOT.step("abrir columnar"):
+        from event_columnar import ColumnarEventLog
+        COLUMNAR = ColumnarEventLog(os.environ.get("EVENTS_COLUMNAR", "events_log"))
+
+# aquecimento: STORE, STATS e DEDUP começam com a cauda do log (leitura reversa),
+# não vazios; EVENTS_WARM_ROWS=0 desliga
+WARM_ROWS = int(os.environ.get("EVENTS_WARM_ROWS", str(STORE.maxlen)))
+
+def warm_store(n: int) -> int:
+    """
+    Carrega os últimos n eventos do log em disco; devolve quantos.
+    - STORE: /events e /events/last respondem como antes do restart
+    - STATS: /stats volta a conhecer esses usuários/dispositivos; o log não guarda o
+      instante de chegada, então as janelas 1m/15m/1h usam o ts do evento
+    - DEDUP: semeado com a chave por conteúdo dos eventos ainda dentro da janela. O
+      log não guarda o eventId, então um reenvio *com* eventId que atravesse o
+      restart não é reconhecido (só os sem eventId)
+    - receivedAt dos eventos aquecidos é aproximado pelo ts (nenhum backend grava a chegada)
+    """
+    if COLUMNAR is not None:
+        rows = COLUMNAR.query(limit=n)
+        for d in rows:
+            d["receivedAt"] = datetime.utcfromtimestamp(d["ts"]).isoformat()+"Z"
+    else:
+        rows = []
+        for r in read_tail(CSV_PATH, n):
+            try:
+                rows.append({"deviceId": r[1], "userId": r[2], "score": float(r[3]),
+                             "level": r[4], "route": r[5], "ts": int(r[6]), "receivedAt": r[0]})
+            except (IndexError, ValueError):
+                continue  # linha truncada (ex.: queda no meio de um flush)
+    STORE.add_many(rows)
+    now_wall, now_mono = time.time(), time.monotonic()
+    for d in rows:
+        STATS.add(d, now=float(d["ts"]))
+        age = now_wall - d["ts"]
+        if DEDUP is not None and age <= DEDUP.ttl:
+            DEDUP.seed(event_key(d), now_mono - age)   # DEDUP mede o tempo em monotonic
+    return len(rows)
+
+def _csv_row(d: Dict[str, Any]) -> list:
+    return [datetime.utcfromtimestamp(d["ts"]).isoformat()+"Z",
+            d["deviceId"], d["userId"], f"{d['score']:.3f}", d["level"], d["route"], d["ts"]]
 
-EVENTS: List[dict] = []
-CSV_PATH = "events_log.csv"
+_SHARED_STOP = threading.Event()
+
+def _shared_drain_log() -> int:
+    """Líder: grava no CSV o que entrou no banco depois do cursor. Devolve quantas linhas."""
+    cursor = int(SHARED.get_meta("log_cursor", 0))
+    batch = SHARED.after(cursor, 5000)
+    if batch:
+        LOG.write_now([_csv_row(d) for _, d in batch])
+        # cursor depois do arquivo: queda entre os dois repete linhas, não perde
+        SHARED.set_meta("log_cursor", batch[-1][0])
+    return len(batch)
+
+def _shared_loop():
+    """Por worker: repassa ao SSE local os eventos de todos os workers; o líder grava o CSV."""
+    lock = LeaderLock(CSV_PATH + ".lock")
+    last_id = SHARED.max_id()
+    leader = False
+    next_try = next_prune = 0.0
+    while not _SHARED_STOP.wait(SHARED_POLL_S):
+        try:
+            while True:
+                batch = SHARED.after(last_id, 1000)
+                if not batch:
+                    break
+                last_id = batch[-1][0]
+                BROKER.publish_many([d for _, d in batch])
+            now = time.monotonic()
+            if not leader and now >= next_try:
+                next_try = now + 1.0
+                leader = lock.acquire()
+                if leader:
+                    print(f"[API] worker pid={os.getpid()} é o escritor do log")
+            if leader:
+                while _shared_drain_log() >= 5000:
+                    pass
+                if now >= next_prune:
+                    next_prune = now + 60.0
+                    SHARED.prune(SHARED_RETAIN_S, _DEDUP_TTL, int(SHARED.get_meta("log_cursor", 0)))
+        except Exception as e:
+            print("[WARN] Falha no laço do banco compartilhado:", e)
+    # shutdown: quem segura (ou consegue) o lock grava o que falta antes de soltá-lo;
+    # sessões curtas podem acabar antes do 1º tick do laço
+    if leader or lock.acquire():
+        try:
+            while _shared_drain_log() >= 5000:
+                pass
+        except Exception as e:
+            print("[WARN] Falha ao gravar o log no shutdown:", e)
+        finally:
+            lock.release()
+
+_SHARED_THREAD = None
+
+def _start_log():
+    global _SHARED_THREAD
+    if SHARED is not None:
+        _SHARED_THREAD = threading.Thread(target=_shared_loop, name="events-shared", daemon=True)
+        _SHARED_THREAD.start()
+    elif WARM_ROWS > 0:
+        with BOOT.step("aquecer STORE"):
+            n = warm_store(WARM_ROWS)
+        print(f"[API] STORE aquecido com {n} eventos do log")
+    if COLUMNAR is None and SHARED is None:
+        LOG.start()
+    if os.environ.get("EVENTS_STARTUP_PROFILE", "0") == "1":
+        print(f"[BOOT] {BOOT.report()}")
+
+def _flush_log():
+    if _SHARED_THREAD is not None:
+        _SHARED_STOP.set()
+        _SHARED_THREAD.join(timeout=5.0)
+    LOG.close()
+    if COLUMNAR is not None:
+        COLUMNAR.close()
+
+def append_csv_rows(events: List[Event]):
+    """Entrega as linhas ao writer em segundo plano (um flush agrupado por lote)."""
+    if COLUMNAR is not None:
+        COLUMNAR.append([e.dict() for e in events])
+        return
+    if SHARED is not None:
+        return  # o líder grava a partir do banco (_shared_loop)
+    LOG.write_rows([_csv_row(e.dict()) for e in events])
 
 def append_csv(e: Event):
-    write_header = not os.path.exists(CSV_PATH)
-    with open(CSV_PATH, "a", newline="", encoding="utf-8") as f:
-        w = csv.writer(f)
-        if write_header:
-            w.writerow(["ts_iso","deviceId","userId","score","level","route","ts"])
-        w.writerow([
-            datetime.utcfromtimestamp(e.ts).isoformat()+"Z",
-            e.deviceId, e.userId, f"{e.score:.3f}", e.level, e.route, e.ts
-        ])
+    append_csv_rows([e])
+
+def store_events(events: List[Event]) -> List[Event]:
+    """Guarda em memória e publica no SSE; devolve só os novos (sem os duplicados)."""
+    received = datetime.utcnow().isoformat()+"Z"
+    if SHARED is not None:
+        ds = [dict(e.dict(exclude_none=True), receivedAt=received) for e in events]
+        keys = [json.dumps(event_key(d)) for d in ds]
+        ok = SHARED.add_many(ds, keys, _DEDUP_TTL)
+        return [e for e, new in zip(events, ok) if new]  # SSE: via _shared_loop
+    ds, fresh = [], []
+    for e in events:
+        d = e.dict(exclude_none=True)
+        if DEDUP is not None and DEDUP.check(event_key(d)):
+            continue
+        fresh.append(e)
+        d["receivedAt"] = received
+        STORE.add(d)
+        STATS.add(d)
+        ds.append(d)
+    BROKER.publish_many(ds)
+    return fresh
 
 @app.post("/events")
 def add_event(e: Event):
-    d = e.dict()
-    d["receivedAt"] = datetime.utcnow().isoformat()+"Z"
-    EVENTS.append(d)
-    # limita memória (últimos 2000)
-    if len(EVENTS) > 2000:
-        del EVENTS[:-2000]
+    if not store_events([e]):
+        return {"ok": True, "duplicate": True}
     append_csv(e)
     return {"ok": True}
 
+@app.post("/events/batch")
+def add_events_batch(items: List[Any]):
+    """
+    Recebe uma lista de eventos; valida item a item (um inválido não derruba o lote)
+    e grava os válidos em memória e no CSV de uma vez só. Duplicados (eventId ou
+    conteúdo já vistos na janela de dedup) voltam ok + duplicate, sem gravar.
+    """
+    valid: List[Event] = []
+    results = []
+    valid_res = []
+    for i, raw in enumerate(items):
+        try:
+            if not isinstance(raw, dict):
+                raise TypeError(f"item deve ser um objeto JSON, recebido {type(raw).__name__}")
+            valid.append(Event(**raw))
+            results.append({"index": i, "ok": True})
+            valid_res.append(results[-1])
+        except (ValidationError, TypeError) as err:
+            detail = ([f"{'.'.join(str(p) for p in x['loc'])}: {x['msg']}" for x in err.errors()]
+                      if isinstance(err, ValidationError) else [str(err)])
+            results.append({"index": i, "ok": False, "errors": detail})
+    fresh = store_events(valid)
+    append_csv_rows(fresh)
+    if len(fresh) < len(valid):
+        new = {id(e) for e in fresh}
+        for e, res in zip(valid, valid_res):
+            if id(e) not in new:
+                res["duplicate"] = True
+    return {"ok": True, "accepted": len(valid), "duplicates": len(valid) - len(fresh),
+            "rejected": len(items) - len(valid), "results": results}
+
 @app.get("/events/last")
-def last_event():
-    return EVENTS[-1] if EVENTS else {}
+def last_event(userId: Optional[str] = None, deviceId: Optional[str] = None,
+               level: Optional[Level] = None,
+               since: Optional[int] = Query(None, description="epoch s (inclusive)"),
+               until: Optional[int] = Query(None, description="epoch s (inclusive)")):
+    return STORE.last(userId, deviceId, level, since, until) or {}
+
+@app.get("/events/stream")
+async def stream_events(userId: Optional[str] = None):
+    """Server-Sent Events: cada evento novo (do userId, ou de todos) chega como `data: {...}`."""
+    sub = BROKER.subscribe(userId)
+    return StreamingResponse(BROKER.stream(sub), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 @app.get("/events")
-def list_events(limit: int = 100):
-    return EVENTS[-limit:]
+def list_events(limit: int = 100, userId: Optional[str] = None,
+                deviceId: Optional[str] = None, level: Optional[Level] = None,
+                since: Optional[int] = Query(None, description="epoch s (inclusive)"),
+                until: Optional[int] = Query(None, description="epoch s (inclusive)")):
+    if COLUMNAR is not None and (since is not None or until is not None):
+        # intervalo de tempo: histórico completo no log colunar (busca binária)
+        return COLUMNAR.query(userId, deviceId, level, since, until, limit)
+    return STORE.query(userId, deviceId, level, since, until, limit)
+
+@app.get("/stats/device/{deviceId}")
+def device_stats(deviceId: str):
+    st = STATS.device(deviceId)
+    if st is None:
+        raise HTTPException(status_code=404, detail="dispositivo sem eventos")
+    return {"deviceId": deviceId, **st}
+
+@app.get("/stats/{userId}")
+def user_stats(userId: str):
+    """Média/máx. de score em 1m/15m/1h, contagem por level e tempo desde o último "alto"."""
+    st = STATS.user(userId)
+    if st is None:
+        raise HTTPException(status_code=404, detail="usuário sem eventos")
+    return {"userId": userId, **st}
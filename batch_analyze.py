@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+batch_analyze.py — Análise offline de gravações (auditoria pós-sessão), sem janela e sem overlay
+- Aceita arquivos e/ou pastas; cada vídeo é dividido em trechos de --chunk-frames
+- Cada trecho começa --warmup frames antes (aquecem o jitter/prev_roi e a janela
+  de 30 scores) e só emite linhas a partir do seu início real
+- Trechos rodam em paralelo (ProcessPoolExecutor) e são juntados, em ordem, no
+  mesmo esquema de CSV do main.py (time_sec = tempo do vídeo)
+
+Uso:
+    python batch_analyze.py gravacoes/ --out-dir auditoria/ --width 960
+    python batch_analyze.py sessao1.mp4 sessao2.mp4 --workers 8 --chunk-frames 1800
+
+Dependências: opencv-python, numpy
+"""
+
+import argparse, csv, os, sys, time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, List, Tuple
+
+VIDEO_EXTS = (".mp4", ".avi", ".mov", ".mkv", ".m4v", ".webm")
+CSV_HEADER = [
+    "frame_idx", "time_sec", "score", "level", "route",
+    "eye_tension", "brow_tension", "mouth_press", "mouth_gasp", "jitter",
+    "eye_open", "mouth_open", "brow_eye_min",
+]
+PARTS_ORDER = CSV_HEADER[5:]
+
+
+def find_videos(inputs: List[str]) -> List[str]:
+    out = []
+    for p in inputs:
+        if os.path.isdir(p):
+            for root, _, files in os.walk(p):
+                out.extend(os.path.join(root, f) for f in sorted(files)
+                           if f.lower().endswith(VIDEO_EXTS))
+        elif os.path.isfile(p):
+            out.append(p)
+        else:
+            print(f"[WARN] Ignorando (não encontrado): {p}")
+    return out
+
+
+def probe(path: str) -> Tuple[int, float]:
+    import cv2
+    cap = cv2.VideoCapture(path)
+    n = int(cap.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+    fps = float(cap.get(cv2.CAP_PROP_FPS) or 0.0) or 30.0
+    cap.release()
+    return n, fps
+
+
+def analyze_chunk(path: str, start: int, end: int, warmup: int,
+                  cfg: Dict[str, Any]) -> Tuple[str, int, List[list]]:
+    """Processa frames [start, end) de `path`; devolve (path, start, linhas CSV)."""
+    import cv2
+    from face_detect import FaceLocator, load_face_cascade
+    from face_scoring import SimpleFaceHeuristics
+    from training_router import TrainingRouter
+
+    cv2.setNumThreads(1)
+    locator = FaceLocator(load_face_cascade(), detect_every=cfg["detect_every"],
+                          strategy=cfg["detect_strategy"])
+    heur = SimpleFaceHeuristics()
+    router = TrainingRouter(cfg["threshold"], cooldowns={})
+    target_w = max(320, int(cfg["width"]))
+    fps = cfg["fps"]
+
+    first = max(0, start - warmup)
+    cap = cv2.VideoCapture(path)
+    if first:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, first)
+    rows: List[list] = []
+    idx = first
+    while idx < end:
+        ok, frame = cap.read()
+        if not ok:
+            break
+        h, w = frame.shape[:2]
+        if w <= 0 or h <= 0:
+            idx += 1
+            continue
+        scale = target_w / float(w)
+        frame = cv2.resize(frame, (target_w, int(h*scale)), interpolation=cv2.INTER_AREA)
+        gray = cv2.equalizeHist(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        faces = locator.locate(gray)
+        if faces:
+            score, parts = heur.compute(frame, faces[0])
+            d = router.update(score)
+            if idx >= start:
+                rows.append([idx, f"{idx / fps:.3f}", f"{d.score:.6f}", d.level, d.label]
+                            + [f"{parts.get(k, 0.0):.6f}" for k in PARTS_ORDER])
+        else:
+            d = router.no_face()
+            if idx >= start:
+                rows.append([idx, f"{idx / fps:.3f}", "0.000000", d.level, d.label,
+                             0, 0, 0, 0, 0, 0, 0, 0])
+        idx += 1
+    cap.release()
+    return path, start, rows
+
+
+def out_path_for(video: str, out_dir: str) -> str:
+    base = os.path.splitext(os.path.basename(video))[0] + "_scores.csv"
+    return os.path.join(out_dir or os.path.dirname(video) or ".", base)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Análise offline em lote (headless, paralela)")
+    parser.add_argument("inputs", nargs="+", help="Vídeos e/ou pastas com vídeos")
+    parser.add_argument("--out-dir", type=str, default="", help="Pasta dos CSVs (padrão: ao lado do vídeo)")
+    parser.add_argument("--workers", type=int, default=0, help="Processos (0 = nº de núcleos)")
+    parser.add_argument("--chunk-frames", type=int, default=900, help="Frames por trecho paralelo")
+    parser.add_argument("--warmup", type=int, default=60,
+                        help="Frames de aquecimento antes de cada trecho (>= 31 p/ jitter + janela de 30)")
+    parser.add_argument("--width", type=int, default=960)
+    parser.add_argument("--threshold", type=float, default=0.65)
+    parser.add_argument("--detect-every", type=int, default=1)
+    parser.add_argument("--detect-strategy", type=str, default="full", choices=["full", "adaptive"])
+    args = parser.parse_args()
+
+    videos = find_videos(args.inputs)
+    if not videos:
+        print("[ERRO] Nenhum vídeo encontrado.")
+        return 1
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    tasks, meta = [], {}
+    for v in videos:
+        n, fps = probe(v)
+        if n <= 0:
+            print(f"[WARN] Sem contagem de frames em {v}; processando como um único trecho.")
+            n = sys.maxsize
+        meta[v] = {"frames": n, "fps": fps, "chunks": 0}
+        cfg = {"width": args.width, "threshold": args.threshold, "fps": fps,
+               "detect_every": args.detect_every, "detect_strategy": args.detect_strategy}
+        step = max(1, args.chunk_frames) if n != sys.maxsize else n
+        for start in range(0, n, step):
+            tasks.append((v, start, min(n, start + step), args.warmup, cfg))
+            meta[v]["chunks"] += 1
+
+    workers = args.workers or os.cpu_count() or 1
+    print(f"[BATCH] {len(videos)} vídeos, {len(tasks)} trechos, {workers} workers")
+    t0 = time.time()
+    parts: Dict[str, Dict[int, List[list]]] = {v: {} for v in videos}
+    with ProcessPoolExecutor(max_workers=workers) as ex:
+        futs = [ex.submit(analyze_chunk, *t) for t in tasks]
+        for fut in as_completed(futs):
+            v, start, rows = fut.result()
+            parts[v][start] = rows
+            if len(parts[v]) == meta[v]["chunks"]:
+                out = out_path_for(v, args.out_dir)
+                with open(out, "w", newline="", encoding="utf-8") as f:
+                    w = csv.writer(f)
+                    w.writerow(CSV_HEADER)
+                    for s in sorted(parts[v]):
+                        w.writerows(parts[v][s])
+                n_rows = sum(len(r) for r in parts[v].values())
+                print(f"[CSV] {v} -> {out} ({n_rows} frames)")
+                parts[v] = {s: [] for s in parts[v]}  # libera memória
+
+    elapsed = max(1e-6, time.time() - t0)
+    media_s = sum(m["frames"] / m["fps"] for m in meta.values() if m["frames"] != sys.maxsize)
+    if media_s:
+        print(f"[BATCH] {media_s:.1f}s de vídeo em {elapsed:.1f}s ({media_s / elapsed:.1f}x tempo real)")
+    else:
+        print(f"[BATCH] concluído em {elapsed:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_events_batch.py — Compara POST /events (1 evento por request) com POST /events/batch
+- Sem --url: roda em processo (fastapi TestClient) com CSV temporário, sem tocar no events_log.csv
+- Com --url: dispara contra um uvicorn já rodando (ex.: http://127.0.0.1:8081)
+- Mede eventos/s e latência p50/p95 por request para 1k e 10k eventos (ou --counts)
+
+Uso:
+    python bench_events_batch.py
+    python bench_events_batch.py --counts 1000 5000 10000 --batch-size 100
+    python bench_events_batch.py --url http://127.0.0.1:8081
+
+Dependências: fastapi, httpx (TestClient)
+"""
+
+import argparse, json, os, random, statistics, tempfile, time
+
+
+def make_events(n: int, tag: str):
+    levels = ["leve", "medio", "alto", "neutro"]
+    now = int(time.time())
+    return [{
+        "deviceId": f"xp-edge-{i % 24:02d}",
+        "userId": f"user-{i % 50}",
+        "score": round(random.random(), 3),
+        "level": levels[i % 4],
+        "route": "Pausa guiada (respiracao 60s)",
+        "ts": now + i,
+        "eventId": f"{tag}-{i}",   # único por rodada: nenhum evento cai na dedup da API
+    } for i in range(n)]
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s)-1, int(round(p/100.0 * (len(s)-1))))]
+
+
+def run_single(client, events):
+    lat, dups = [], 0
+    t0 = time.perf_counter()
+    for ev in events:
+        t = time.perf_counter()
+        r = client.post("/events", json=ev)
+        lat.append((time.perf_counter() - t) * 1000.0)
+        r.raise_for_status()
+        dups += int(bool(r.json().get("duplicate")))
+    return time.perf_counter() - t0, lat, dups
+
+
+def run_batch(client, events, batch_size):
+    lat, dups = [], 0
+    t0 = time.perf_counter()
+    for i in range(0, len(events), batch_size):
+        t = time.perf_counter()
+        r = client.post("/events/batch", json=events[i:i+batch_size])
+        lat.append((time.perf_counter() - t) * 1000.0)
+        r.raise_for_status()
+        dups += r.json().get("duplicates", 0)
+    return time.perf_counter() - t0, lat, dups
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", type=str, default="", help="API já rodando; vazio = em processo")
+    parser.add_argument("--counts", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--json", type=str, default="", help="Salva resultados em JSON")
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.url:
+        import httpx
+        client = httpx.Client(base_url=args.url.rstrip("/"))
+    else:
+        from fastapi.testclient import TestClient
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["EVENTS_CSV"] = os.path.join(tmpdir.name, "events_log.csv")
+        import api
+        client = TestClient(api.app)
+
+    results = []
+    run_id = os.urandom(4).hex()
+    for n in args.counts:
+        for mode in ("single", "batch"):
+            events = make_events(n, f"{run_id}-{mode}-{n}")
+            if mode == "single":
+                dt, lat, dups = run_single(client, events)
+            else:
+                dt, lat, dups = run_batch(client, events, args.batch_size)
+            row = {
+                "mode": mode, "events": n,
+                "batch_size": args.batch_size if mode == "batch" else 1,
+                "seconds": round(dt, 3),
+                "duplicates": dups,
+                "events_per_s": round(n / dt, 1),
+                "req_p50_ms": round(statistics.median(lat), 3),
+                "req_p95_ms": round(pct(lat, 95), 3),
+            }
+            results.append(row)
+            print(f"[BENCH] {mode:6s} n={n:6d}  {row['events_per_s']:10.1f} ev/s  "
+                  f"p50={row['req_p50_ms']:.2f}ms  p95={row['req_p95_ms']:.2f}ms  duplicados={dups}")
+
+    for n in args.counts:
+        s = next(r for r in results if r["mode"] == "single" and r["events"] == n)
+        b = next(r for r in results if r["mode"] == "batch" and r["events"] == n)
+        print(f"[BENCH] n={n}: batch {b['events_per_s'] / s['events_per_s']:.1f}x mais rápido")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url or "in-process", "results": results}, f, indent=2)
+        print(f"[BENCH] Resultados em: {args.json}")
+    client.close()
+    if tmpdir is not None:
+        api.LOG.close()
+        tmpdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_scoring.py — Microbenchmark do núcleo de score (SimpleFaceHeuristics × FixedSizeFaceHeuristics)
+- Gera frames sintéticos com um retângulo de rosto que oscila alguns px de
+  tamanho/posição (o caso que zerava o jitter no SimpleFaceHeuristics)
+- Mede tempo por chamada (µs, p50/p95) e bytes alocados por chamada (tracemalloc:
+  pico transitório e saldo retido), além da fração de frames com jitter = 0
+- Também mede o modo em lote (score_stack) para N ROIs já reamostrados
+
+Uso:
+    python bench_scoring.py --frames 2000 --face 220 --roi-size 64
+    python bench_scoring.py --json bench_scoring.json
+
+Dependências: opencv-python, numpy
+"""
+
+import argparse, json, statistics, time, tracemalloc
+
+import numpy as np
+
+from face_scoring import FixedSizeFaceHeuristics, SimpleFaceHeuristics
+
+
+def make_inputs(n: int, width: int, face: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    h = width * 3 // 4
+    frames = [rng.integers(0, 256, (h, width, 3), dtype=np.uint8) for _ in range(min(n, 16))]
+    rects = []
+    for i in range(n):
+        d = int(rng.integers(-2, 3))
+        x = (width - face) // 2 + int(rng.integers(-3, 4))
+        y = (h - face) // 2 + int(rng.integers(-3, 4))
+        rects.append((x, y, face + d, face + d))
+    return frames, rects
+
+
+def run(heur, frames, rects, warmup: int = 20):
+    for i in range(warmup):
+        heur.compute(frames[i % len(frames)], rects[i])
+    times, zero_jitter = [], 0
+    for i, r in enumerate(rects):
+        t = time.perf_counter()
+        _, parts = heur.compute(frames[i % len(frames)], r)
+        times.append((time.perf_counter() - t) * 1e6)
+        zero_jitter += parts["jitter"] == 0.0
+    # alocações: medidas numa segunda passada (tracemalloc distorce o tempo)
+    tracemalloc.start()
+    peaks = []
+    base, _ = tracemalloc.get_traced_memory()
+    for i, r in enumerate(rects[:500]):
+        tracemalloc.reset_peak()
+        cur0, _ = tracemalloc.get_traced_memory()
+        heur.compute(frames[i % len(frames)], r)
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - cur0)
+    retained = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    times.sort()
+    return {
+        "us_p50": round(statistics.median(times), 2),
+        "us_p95": round(times[int(0.95 * (len(times) - 1))], 2),
+        "alloc_peak_bytes_per_call": int(statistics.mean(peaks)),
+        "retained_bytes": int(retained),
+        "zero_jitter_frac": round(zero_jitter / len(rects), 3),
+    }
+
+
+def run_stack(size: int, frames, rects):
+    heur = FixedSizeFaceHeuristics(size)
+    stack = np.empty((len(rects), heur.size, heur.size), np.uint8)
+    t = time.perf_counter()
+    for i, r in enumerate(rects):
+        heur.resample(frames[i % len(frames)], r, stack[i])
+    t_res = time.perf_counter() - t
+    t = time.perf_counter()
+    heur.score_stack(stack)
+    t_score = time.perf_counter() - t
+    n = len(rects)
+    return {"resample_us_per_roi": round(t_res / n * 1e6, 2),
+            "score_us_per_roi": round(t_score / n * 1e6, 2)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmark do núcleo de score")
+    parser.add_argument("--frames", type=int, default=2000)
+    parser.add_argument("--width", type=int, default=960)
+    parser.add_argument("--face", type=int, default=220, help="Lado do rosto sintético (px)")
+    parser.add_argument("--roi-size", type=int, default=64)
+    parser.add_argument("--json", type=str, default="")
+    args = parser.parse_args()
+
+    frames, rects = make_inputs(args.frames, args.width, args.face)
+    results = {
+        "simple": run(SimpleFaceHeuristics(), frames, rects),
+        "fixed": run(FixedSizeFaceHeuristics(args.roi_size), frames, rects),
+        "fixed_stack": run_stack(args.roi_size, frames, rects),
+    }
+    for name in ("simple", "fixed"):
+        r = results[name]
+        print(f"[BENCH] {name:6s} p50={r['us_p50']}µs p95={r['us_p95']}µs "
+              f"alloc/call={r['alloc_peak_bytes_per_call']}B retido={r['retained_bytes']}B "
+              f"jitter=0 em {r['zero_jitter_frac']*100:.1f}% dos frames")
+    st = results["fixed_stack"]
+    print(f"[BENCH] stack  reamostragem={st['resample_us_per_roi']}µs/ROI "
+          f"score={st['score_us_per_roi']}µs/ROI")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_stream.py — Teste de carga do push SSE (GET /events/stream)
+- Sobe um uvicorn local com 1 worker (ou usa --url) e abre N assinantes SSE
+- Publica eventos via POST /events/batch carregando o instante de envio no campo
+  `route`; cada assinante mede a latência ponta a ponta (envio → recebimento)
+- Repete para cada N em --subscribers e informa quantos ficaram conectados,
+  eventos entregues, despejos e latência p50/p95/p99
+
+Uso:
+    python bench_stream.py --subscribers 100 500 1000 --events 50 --rate 20
+    python bench_stream.py --url http://127.0.0.1:8081 --subscribers 200
+
+Obs.: com milhares de conexões, aumente o limite de arquivos (ulimit -n).
+Dependências: httpx, uvicorn
+"""
+
+import argparse, asyncio, json, os, statistics, subprocess, sys, tempfile, time
+from typing import Dict, Optional
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s)-1, int(round(p/100.0 * (len(s)-1))))]
+
+
+async def subscriber(client, url, user, ready, lat, counters, stop):
+    try:
+        async with client.stream("GET", url + "/events/stream", params={"userId": user},
+                                 timeout=None) as r:
+            ready.release()
+            counters["connected"] += 1
+            async for line in r.aiter_lines():
+                if line.startswith("event: evicted"):
+                    counters["evicted"] += 1
+                    return
+                if not line.startswith("data: "):
+                    continue
+                d = json.loads(line[6:])
+                if d.get("route", "").startswith("bench:"):
+                    lat.append((time.time() - float(d["route"][6:])) * 1000.0)
+                    counters["received"] += 1
+                if stop.is_set():
+                    return
+    except Exception:
+        counters["errors"] += 1
+        ready.release()
+
+
+async def run_level(url, n_subs, n_events, rate, user):
+    import httpx
+    limits = httpx.Limits(max_connections=n_subs + 10, max_keepalive_connections=n_subs + 10)
+    lat, counters = [], {"connected": 0, "received": 0, "evicted": 0, "errors": 0}
+    stop = asyncio.Event()
+    ready = asyncio.Semaphore(0)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        tasks = [asyncio.create_task(subscriber(client, url, user, ready, lat, counters, stop))
+                 for _ in range(n_subs)]
+        t0 = time.perf_counter()
+        for _ in range(n_subs):
+            await ready.acquire()
+        connect_s = time.perf_counter() - t0
+        await asyncio.sleep(0.5)
+
+        interval = 1.0 / rate if rate > 0 else 0.0
+        for i in range(n_events):
+            ev = {"deviceId": "bench-dev", "userId": user, "score": 0.5, "level": "medio",
+                  "route": f"bench:{time.time():.6f}", "ts": int(time.time())}
+            await client.post(url + "/events/batch", json=[ev])
+            if interval:
+                await asyncio.sleep(interval)
+
+        expected = n_events * counters["connected"]
+        deadline = time.time() + 10.0
+        while counters["received"] < expected and time.time() < deadline:
+            await asyncio.sleep(0.1)
+        stop.set()
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return {
+        "subscribers": n_subs,
+        "connected": counters["connected"],
+        "connect_s": round(connect_s, 3),
+        "events": n_events,
+        "delivered": counters["received"],
+        "expected": expected,
+        "evicted": counters["evicted"],
+        "errors": counters["errors"],
+        "lat_p50_ms": round(statistics.median(lat), 2) if lat else None,
+        "lat_p95_ms": round(pct(lat, 95), 2) if lat else None,
+        "lat_p99_ms": round(pct(lat, 99), 2) if lat else None,
+    }
+
+
+def start_server(port: int, tmpdir: str, workers: int = 1,
+                 env: Optional[Dict[str, str]] = None) -> subprocess.Popen:
+    env = dict(os.environ, EVENTS_CSV=os.path.join(tmpdir, "events_log.csv"), **(env or {}))
+    here = os.path.dirname(os.path.abspath(__file__))
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--port", str(port),
+                             "--workers", str(workers), "--log-level", "warning"], cwd=here, env=env)
+    import httpx
+    for _ in range(100 + 50 * workers):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/events/last", timeout=0.5)
+            return proc
+        except Exception:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("uvicorn não subiu")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", type=str, default="", help="API já rodando; vazio = sobe uvicorn local")
+    parser.add_argument("--port", type=int, default=8799)
+    parser.add_argument("--subscribers", type=int, nargs="+", default=[50, 200, 500])
+    parser.add_argument("--events", type=int, default=30)
+    parser.add_argument("--rate", type=float, default=20.0, help="Eventos/s publicados")
+    parser.add_argument("--json", type=str, default="")
+    args = parser.parse_args()
+
+    proc, tmp = None, None
+    url = args.url.rstrip("/")
+    if not url:
+        tmp = tempfile.TemporaryDirectory()
+        proc = start_server(args.port, tmp.name)
+        url = f"http://127.0.0.1:{args.port}"
+    results = []
+    try:
+        for i, n in enumerate(args.subscribers):
+            row = asyncio.run(run_level(url, n, args.events, args.rate, user=f"bench-{i}"))
+            results.append(row)
+            print(f"[SSE] subs={row['connected']}/{n}  entregues={row['delivered']}/{row['expected']}  "
+                  f"despejos={row['evicted']}  p50={row['lat_p50_ms']}ms  p95={row['lat_p95_ms']}ms  "
+                  f"p99={row['lat_p99_ms']}ms")
+    finally:
+        if proc is not None:
+            proc.terminate(); proc.wait(timeout=10)
+            tmp.cleanup()
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
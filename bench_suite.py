@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_suite.py — Benchmark de regressão (visão + API), sem câmera e sem rede
+- Visão: gera vídeo sintético com "rostos" desenhados (elipses de pele, olhos,
+  sobrancelhas e boca que se movem e mudam de tamanho) e roda o caminho do
+  main.py (resize → cvtColor/equalizeHist → FaceLocator → score → router →
+  painel) para cada --widths, com FPS e p50/p95/p99 por estágio (StageProfiler)
+  * o Haar nem sempre acha o rosto desenhado: quando erra, o score usa a caixa
+    conhecida do gerador (o custo do score é medido igual) e o JSON traz a taxa
+    de acerto da detecção
+- API: gerador de carga local contra api.py (em processo com TestClient e CSV
+  temporário, ou --url) em POST /events, GET /events/last e GET /events, com
+  --concurrency threads; req/s e latência p50/p95/p99 por endpoint
+- Resultado em JSON (--json); com --baseline compara com uma execução anterior e
+  marca [REGRESSÃO] se FPS/req/s cair ou p95 subir mais que --tolerance (sai com 1)
+
+Uso:
+    python bench_suite.py --json bench_base.json
+    python bench_suite.py --json bench_novo.json --baseline bench_base.json --tolerance 0.15
+    python bench_suite.py --only api --url http://127.0.0.1:8081 --requests 5000 --concurrency 8
+    python bench_suite.py --only vision --widths 640 960 1280 --save-video sintetico.mp4
+
+Dependências: opencv-python, numpy, fastapi + httpx (parte API)
+"""
+
+import argparse, json, os, platform, random, subprocess, sys, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Tuple
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s)-1, int(round(p/100.0 * (len(s)-1))))]
+
+
+# ==================== Vídeo sintético ====================
+def draw_face(img, cx: int, cy: int, s: int, mouth: float):
+    """Rosto esquemático centrado em (cx, cy) com meia-altura s; mouth 0..1 = abertura."""
+    import cv2
+    cv2.ellipse(img, (cx, cy), (int(s*0.8), s), 0, 0, 360, (150, 170, 200), -1)
+    for dx in (-1, 1):
+        ex, ey = cx + int(dx*s*0.35), cy - int(s*0.2)
+        cv2.ellipse(img, (ex, ey - int(s*0.18)), (int(s*0.22), int(s*0.05)), 0, 0, 360, (50, 60, 70), -1)
+        cv2.ellipse(img, (ex, ey), (int(s*0.16), int(s*0.08)), 0, 0, 360, (40, 40, 40), -1)
+    cv2.ellipse(img, (cx, cy + int(s*0.1)), (int(s*0.08), int(s*0.2)), 0, 0, 360, (130, 150, 180), -1)
+    cv2.ellipse(img, (cx, cy + int(s*0.5)), (int(s*0.3), max(2, int(s*0.08*(1 + 2*mouth)))),
+                0, 0, 360, (60, 60, 110), -1)
+
+
+def synthetic_frames(n: int, size: Tuple[int, int] = (1280, 720), seed: int = 0):
+    """Gera n frames BGR; devolve [(frame, caixa_verdadeira ou None)]."""
+    import cv2
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    W, H = size
+    bg = rng.integers(60, 120, (H, W, 3), dtype=np.uint8)
+    bg = cv2.GaussianBlur(bg, (0, 0), 9)
+    out = []
+    for i in range(n):
+        f = bg.copy()
+        cv2.rectangle(f, (int(W*0.05 + 40*np.sin(i/25)), int(H*0.6)),
+                      (int(W*0.25 + 40*np.sin(i/25)), int(H*0.95)), (70, 80, 60), -1)
+        box = None
+        if (i // 90) % 4 != 3:   # 1/4 do tempo sem rosto
+            s = int(H * (0.16 + 0.03*np.sin(i/40)))
+            cx = int(W/2 + W*0.15*np.sin(i/30))
+            cy = int(H/2 + H*0.05*np.cos(i/17))
+            draw_face(f, cx, cy, s, 0.5 + 0.5*np.sin(i/6))
+            box = (cx - int(s*0.8), cy - s, int(s*1.6), 2*s)
+        f = cv2.GaussianBlur(f, (5, 5), 0)
+        cv2.randn(noise := np.empty((H, W, 3), np.int16), 0, 4)
+        f = np.clip(f.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+        out.append((f, box))
+    return out
+
+
+def save_video(frames, path: str, fps: float = 25.0):
+    import cv2
+    h, w = frames[0][0].shape[:2]
+    wr = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, (w, h))
+    for f, _ in frames:
+        wr.write(f)
+    wr.release()
+
+
+# ==================== Visão ====================
+def bench_vision(frames, width: int, cfg: Dict[str, Any]) -> Dict[str, Any]:
+    import cv2
+    from face_detect import FaceLocator, load_face_cascade
+    from face_scoring import FixedSizeFaceHeuristics, SimpleFaceHeuristics
+    from training_router import TrainingRouter
+    from overlay import PanelSprite
+    from profiler import StageProfiler
+    from main import draw_panel
+
+    prof = StageProfiler(window=len(frames))
+    locator = FaceLocator(load_face_cascade(), detect_every=cfg["detect_every"],
+                          strategy=cfg["detect_strategy"])
+    heur = FixedSizeFaceHeuristics() if cfg["scorer"] == "fixed" else SimpleFaceHeuristics()
+    router = TrainingRouter(0.65)
+    sprite = PanelSprite(0.75)
+    hits = with_face = 0
+    t_start = time.perf_counter()
+    for src, box in frames:
+        t = prof.tick()
+        h, w = src.shape[:2]
+        scale = width / float(w)
+        frame = cv2.resize(src, (width, int(h*scale)), interpolation=cv2.INTER_AREA)
+        t = prof.lap("resize", t)
+        gray = cv2.equalizeHist(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+        t = prof.lap("preprocess", t)
+        faces = locator.locate(gray)
+        t = prof.lap("detect", t)
+        if box is not None:
+            with_face += 1
+            hits += bool(faces)
+        rect = faces[0] if faces else (tuple(int(v*scale) for v in box) if box else None)
+        if rect is not None:
+            score, _ = heur.compute(frame, rect)
+            d = router.update(score)
+        else:
+            d = router.no_face()
+        t = prof.lap("score", t)
+        draw_panel(frame, d.score, d.level, d.label, sprite=sprite)
+        prof.lap("draw", t)
+        prof.frame_done()
+    elapsed = time.perf_counter() - t_start
+    stages = {k: {"p50_ms": round(v["p50_ms"], 3), "p95_ms": round(v["p95_ms"], 3),
+                  "p99_ms": round(v["p99_ms"], 3)} for k, v in prof.snapshot().items()}
+    return {
+        "width": width,
+        "frames": len(frames),
+        "fps": round(len(frames) / elapsed, 2),
+        "detect_hit_rate": round(hits / with_face, 3) if with_face else None,
+        "detector_rate": locator.stats()["detector_rate"],
+        "stages": stages,
+    }
+
+
+# ==================== API ====================
+def _make_event(i: int) -> Dict[str, Any]:
+    levels = ["leve", "medio", "alto", "neutro"]
+    return {"deviceId": f"xp-edge-{i % 24:02d}", "userId": f"user-{i % 50}",
+            "score": round(random.random(), 3), "level": levels[i % 4],
+            "route": "Pausa guiada (respiracao 60s)", "ts": int(time.time())}
+
+
+def _load(make_client, n: int, concurrency: int, call) -> Dict[str, Any]:
+    """Dispara n chamadas `call(client, i)` em `concurrency` threads (um cliente por thread)."""
+    per = [list(range(k, n, concurrency)) for k in range(concurrency)]
+    lat: List[float] = []
+    errors = [0]
+
+    def worker(idx):
+        client = make_client()
+        local = []
+        try:
+            for i in idx:
+                t = time.perf_counter()
+                r = call(client, i)
+                local.append((time.perf_counter() - t) * 1000.0)
+                if r.status_code >= 400:
+                    errors[0] += 1
+        finally:
+            client.close()
+        return local
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as ex:
+        for local in ex.map(worker, per):
+            lat.extend(local)
+    dt = time.perf_counter() - t0
+    return {"requests": n, "errors": errors[0], "req_per_s": round(n / dt, 1),
+            "p50_ms": round(pct(lat, 50), 3), "p95_ms": round(pct(lat, 95), 3),
+            "p99_ms": round(pct(lat, 99), 3)}
+
+
+def bench_api(url: str, n: int, concurrency: int) -> Dict[str, Any]:
+    tmpdir = None
+    if url:
+        import httpx
+        make_client = lambda: httpx.Client(base_url=url.rstrip("/"), timeout=10.0)
+    else:
+        tmpdir = tempfile.TemporaryDirectory()
+        os.environ["EVENTS_CSV"] = os.path.join(tmpdir.name, "events_log.csv")
+        from fastapi.testclient import TestClient
+        import api
+        make_client = lambda: TestClient(api.app)
+    try:
+        out = {
+            "post_events": _load(make_client, n, concurrency,
+                                 lambda c, i: c.post("/events", json=_make_event(i))),
+            "get_last": _load(make_client, n, concurrency,
+                              lambda c, i: c.get("/events/last", params={"userId": f"user-{i % 50}"})),
+            "list_events": _load(make_client, max(1, n // 5), concurrency,
+                                 lambda c, i: c.get("/events", params={"limit": 100})),
+        }
+    finally:
+        if tmpdir is not None:
+            api.LOG.close()
+            tmpdir.cleanup()
+    return out
+
+
+# ==================== Comparação ====================
+def compare(new: Dict[str, Any], base: Dict[str, Any], tol: float) -> List[str]:
+    """Lista de regressões: vazão caiu ou p95 subiu mais que `tol` (fração)."""
+    regs = []
+    old_v = {r["width"]: r for r in base.get("vision", [])}
+    for r in new.get("vision", []):
+        o = old_v.get(r["width"])
+        if not o:
+            continue
+        if r["fps"] < o["fps"] * (1 - tol):
+            regs.append(f"visão w={r['width']}: fps {o['fps']} → {r['fps']}")
+        for st, v in r["stages"].items():
+            ov = o["stages"].get(st)
+            # estágios sub-milissegundo oscilam muito: exige também +0.2 ms absolutos
+            if ov and v["p95_ms"] > ov["p95_ms"] * (1 + tol) and v["p95_ms"] - ov["p95_ms"] > 0.2:
+                regs.append(f"visão w={r['width']} {st}: p95 {ov['p95_ms']}ms → {v['p95_ms']}ms")
+    for ep, v in new.get("api", {}).items():
+        ov = base.get("api", {}).get(ep)
+        if not ov:
+            continue
+        if v["req_per_s"] < ov["req_per_s"] * (1 - tol):
+            regs.append(f"api {ep}: req/s {ov['req_per_s']} → {v['req_per_s']}")
+        if v["p95_ms"] > ov["p95_ms"] * (1 + tol):
+            regs.append(f"api {ep}: p95 {ov['p95_ms']}ms → {v['p95_ms']}ms")
+    return regs
+
+
+def run_meta() -> Dict[str, Any]:
+    meta = {"time": int(time.time()), "python": platform.python_version(),
+            "platform": platform.platform(), "cpus": os.cpu_count()}
+    try:
+        import cv2
+        meta["opencv"] = cv2.__version__
+    except ImportError:
+        pass
+    try:
+        here = os.path.dirname(os.path.abspath(__file__))
+        meta["git"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=here,
+                                     capture_output=True, text=True, timeout=5).stdout.strip()
+    except Exception:
+        pass
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de regressão (visão + API)")
+    parser.add_argument("--only", type=str, default="", choices=["", "vision", "api"])
+    parser.add_argument("--frames", type=int, default=300, help="Frames sintéticos por largura")
+    parser.add_argument("--widths", type=int, nargs="+", default=[480, 640, 960])
+    parser.add_argument("--detect-every", type=int, default=1)
+    parser.add_argument("--detect-strategy", type=str, default="full", choices=["full", "adaptive"])
+    parser.add_argument("--scorer", type=str, default="simple", choices=["simple", "fixed"])
+    parser.add_argument("--save-video", type=str, default="", help="Salva o vídeo sintético (mp4)")
+    parser.add_argument("--url", type=str, default="", help="API já rodando; vazio = em processo")
+    parser.add_argument("--requests", type=int, default=2000, help="Requisições por endpoint")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--json", type=str, default="", help="Salva resultados em JSON")
+    parser.add_argument("--baseline", type=str, default="", help="JSON anterior p/ comparar")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="Piora tolerada (fração)")
+    args = parser.parse_args()
+
+    result: Dict[str, Any] = {"meta": run_meta(), "args": vars(args)}
+    if args.only in ("", "vision"):
+        import cv2
+        cv2.setNumThreads(1)  # números comparáveis entre máquinas
+        frames = synthetic_frames(args.frames)
+        if args.save_video:
+            save_video(frames, args.save_video)
+            print(f"[BENCH] vídeo sintético em {args.save_video}")
+        cfg = {"detect_every": args.detect_every, "detect_strategy": args.detect_strategy,
+               "scorer": args.scorer}
+        result["vision"] = []
+        for w in args.widths:
+            r = bench_vision(frames, w, cfg)
+            result["vision"].append(r)
+            st = "  ".join(f"{k}={v['p50_ms']:.1f}/{v['p95_ms']:.1f}" for k, v in r["stages"].items())
+            print(f"[VISAO] w={w:5d}  {r['fps']:7.1f} fps  acerto={r['detect_hit_rate']}  {st} ms (p50/p95)")
+    if args.only in ("", "api"):
+        result["api"] = bench_api(args.url, args.requests, max(1, args.concurrency))
+        for ep, r in result["api"].items():
+            print(f"[API] {ep:12s} {r['req_per_s']:9.1f} req/s  p50={r['p50_ms']:.2f}ms  "
+                  f"p95={r['p95_ms']:.2f}ms  p99={r['p99_ms']:.2f}ms  erros={r['errors']}")
+
+    regs: List[str] = []
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            regs = compare(result, json.load(f), args.tolerance)
+        result["regressions"] = regs
+        for r in regs:
+            print(f"[REGRESSÃO] {r}")
+        if not regs:
+            print(f"[BENCH] sem regressões além de {args.tolerance:.0%} vs {args.baseline}")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        print(f"[BENCH] Resultados em: {args.json}")
+    return 1 if regs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
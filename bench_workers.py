@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+bench_workers.py — Escala da API com vários workers (uvicorn --workers N + EVENTS_SHARED_DB)
+- Para cada N em --workers sobe um uvicorn local com o banco compartilhado (SQLite
+  WAL) num diretório temporário e dispara carga por --duration s: `--concurrency`
+  clientes em paralelo, POST /events/batch (--batch-size) ou /events (--batch-size 1),
+  com uma fração --reads de GET /events/last no meio
+- Informa eventos/s aceitos, requests/s, latência p50/p95 e o ganho sobre N=1
+- Confere a consistência ao fim de cada rodada:
+    csv:  linhas no CSV == eventos aceitos, todas com 7 campos (sem linhas intercaladas)
+    last: um evento marcador é enviado e GET /events/last em conexões novas (caem
+          em workers diferentes) tem de devolvê-lo em todas
+- --baseline roda antes 1 worker sem o banco (estado em memória), p/ ver o custo do modo
+
+Uso:
+    python bench_workers.py --workers 1 2 4 --duration 10
+    python bench_workers.py --workers 1 2 --batch-size 1 --concurrency 32 --json workers.json
+
+Obs.: o gerador de carga roda na mesma máquina; o ganho com N workers depende de haver
+núcleos livres (com 1 núcleo, mais workers só dividem a mesma CPU).
+Dependências: httpx, uvicorn
+"""
+
+import argparse, asyncio, csv, json, os, random, tempfile, time
+
+from bench_stream import pct, start_server
+
+
+def make_batch(n: int, seq: int):
+    levels = ["leve", "medio", "alto", "neutro"]
+    now = int(time.time())
+    return [{
+        "deviceId": f"xp-edge-{(seq + i) % 24:02d}",
+        "userId": f"user-{(seq + i) % 50}",
+        "score": round(random.random(), 3),
+        "level": levels[(seq + i) % 4],
+        "route": "Pausa guiada (respiracao 60s)",
+        "ts": now,
+        "eventId": f"bench-{seq + i}",
+    } for i in range(n)]
+
+
+async def load(url: str, duration: float, concurrency: int, batch_size: int, reads: float):
+    import httpx
+    counters = {"accepted": 0, "requests": 0, "reads": 0, "errors": 0}
+    lat = []
+    seq = [0]
+    deadline = time.perf_counter() + duration
+
+    async def worker(client):
+        while time.perf_counter() < deadline:
+            t = time.perf_counter()
+            try:
+                if random.random() < reads:
+                    r = await client.get(url + "/events/last")
+                    counters["reads"] += 1
+                else:
+                    evs = make_batch(batch_size, seq[0]); seq[0] += batch_size
+                    if batch_size == 1:
+                        r = await client.post(url + "/events", json=evs[0])
+                        counters["accepted"] += 0 if r.json().get("duplicate") else 1
+                    else:
+                        r = await client.post(url + "/events/batch", json=evs)
+                        body = r.json()
+                        counters["accepted"] += body["accepted"] - body["duplicates"]
+                r.raise_for_status()
+                lat.append((time.perf_counter() - t) * 1000.0)
+                counters["requests"] += 1
+            except Exception:
+                counters["errors"] += 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(limits=limits, timeout=30.0) as client:
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    return counters, lat, elapsed
+
+
+def csv_rows(path: str):
+    if not os.path.exists(path):
+        return 0, 0
+    with open(path, newline="", encoding="utf-8") as f:
+        rows = list(csv.reader(f))[1:]
+    return len(rows), sum(1 for r in rows if len(r) != 7)
+
+
+def check_consistency(url: str, csv_path: str, accepted: int, probes: int, timeout: float = 15.0):
+    import httpx
+    # marcador: o último evento aceito tem de aparecer em /events/last de qualquer worker
+    marker = dict(make_batch(1, 0)[0], eventId=f"marker-{time.time_ns()}", deviceId="bench-marker")
+    httpx.post(url + "/events", json=marker, timeout=10.0).raise_for_status()
+    seen = set()
+    for _ in range(probes):
+        last = httpx.get(url + "/events/last", timeout=10.0).json()  # conexão nova a cada vez
+        seen.add(last.get("eventId"))
+    last_ok = seen == {marker["eventId"]}
+    # CSV: o líder do log grava de forma assíncrona; espera alcançar o total
+    expected = accepted + 1
+    t_end = time.time() + timeout
+    n, bad = csv_rows(csv_path)
+    while n < expected and time.time() < t_end:
+        time.sleep(0.2)
+        n, bad = csv_rows(csv_path)
+    return {"csv_rows": n, "csv_expected": expected, "csv_bad_rows": bad,
+            "csv_ok": n == expected and bad == 0, "last_probes": probes,
+            "last_answers": len(seen), "last_ok": last_ok}
+
+
+def run_level(args, workers: int, shared: bool, port: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {"EVENTS_LOG_FLUSH_S": "0.2"}
+        if shared:
+            env["EVENTS_SHARED_DB"] = os.path.join(tmp, "events_shared.db")
+        proc = start_server(port, tmp, workers=workers, env=env)
+        url = f"http://127.0.0.1:{port}"
+        try:
+            time.sleep(0.5 * workers)  # todos os workers de pé antes de medir
+            counters, lat, elapsed = asyncio.run(
+                load(url, args.duration, args.concurrency, args.batch_size, args.reads))
+            cons = check_consistency(url, os.path.join(tmp, "events_log.csv"),
+                                     counters["accepted"], args.probes)
+        finally:
+            proc.terminate(); proc.wait(timeout=20)
+    return {
+        "workers": workers,
+        "shared": shared,
+        "events_per_s": round(counters["accepted"] / elapsed, 1),
+        "requests_per_s": round(counters["requests"] / elapsed, 1),
+        "accepted": counters["accepted"],
+        "reads": counters["reads"],
+        "errors": counters["errors"],
+        "lat_p50_ms": round(pct(lat, 50), 2),
+        "lat_p95_ms": round(pct(lat, 95), 2),
+        **cons,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--duration", type=float, default=10.0, help="Segundos de carga por rodada")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=20, help="1 = POST /events")
+    parser.add_argument("--reads", type=float, default=0.2, help="Fração de GET /events/last")
+    parser.add_argument("--probes", type=int, default=20, help="GETs de /events/last na checagem")
+    parser.add_argument("--port", type=int, default=8798)
+    parser.add_argument("--baseline", action="store_true",
+                        help="Roda antes 1 worker sem EVENTS_SHARED_DB (estado em memória)")
+    parser.add_argument("--json", type=str, default="")
+    args = parser.parse_args()
+
+    print(f"[WRK] núcleos={os.cpu_count()}  concorrência={args.concurrency}  "
+          f"lote={args.batch_size}  leituras={args.reads:.0%}  {args.duration:g}s por rodada")
+    plan = ([(1, False)] if args.baseline else []) + [(n, True) for n in args.workers]
+    results = []
+    base = None
+    for workers, shared in plan:
+        row = run_level(args, workers, shared, args.port)
+        results.append(row)
+        if shared and base is None:
+            base = row["events_per_s"]
+        gain = f"{row['events_per_s'] / base:.2f}x" if shared and base else "-"
+        print(f"[WRK] workers={workers} {'compartilhado' if shared else 'memória    '}  "
+              f"ev/s={row['events_per_s']:.0f} ({gain})  req/s={row['requests_per_s']:.0f}  "
+              f"p50={row['lat_p50_ms']}ms  p95={row['lat_p95_ms']}ms  erros={row['errors']}  "
+              f"csv={row['csv_rows']}/{row['csv_expected']} {'ok' if row['csv_ok'] else 'FALHOU'}  "
+              f"last={'ok' if row['last_ok'] else 'FALHOU'} ({row['last_answers']} resposta(s) "
+              f"em {row['last_probes']})")
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"cpu_count": os.cpu_count(), "args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
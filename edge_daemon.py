@@ -0,0 +1,276 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+edge_daemon.py — Vários streams (webcams, arquivos, URLs RTSP/HTTP) num único processo supervisor
+- Cada fonte tem seu deviceId/userId; as fontes são distribuídas entre processos
+  worker (um por núcleo, no máx. um por fonte)
+- Em cada worker, uma thread de captura por fonte (fila "drop" p/ fontes ao vivo,
+  "block" p/ arquivos) e um loop que detecta/pontua as fontes em rodízio, com um
+  SimpleFaceHeuristics + FaceLocator + TrainingRouter por stream
+- Os workers mandam só eventos (SendPolicy por stream: troca de nível, variação
+  de score, heartbeat) e contadores; o processo principal tem um único
+  EventPublisher e imprime FPS por stream e total, e no fim enviados/suprimidos
+  por deviceId
+
+Uso:
+    python edge_daemon.py --source "video=cam1.mp4,device=xp-edge-01,user=admin" \\
+                          --source "video=0,device=xp-edge-02,user=joao"
+    python edge_daemon.py --sources fontes.json --workers 4 --api http://127.0.0.1:8081
+
+fontes.json: [{"video": "rtsp://...", "deviceId": "xp-edge-01", "userId": "admin"}, ...]
+(um arquivo local com --loop serve de substituto de câmera em testes)
+
+Dependências: opencv-python, numpy, (opcional) requests
+"""
+
+import argparse, json, multiprocessing as mp, os, queue, signal, sys, threading, time
+from typing import Any, Dict, List
+
+LIVE_PREFIXES = ("rtsp://", "rtmp://", "http://", "https://", "udp://", "tcp://")
+
+
+def parse_source(text: str) -> Dict[str, str]:
+    """'video=x.mp4,device=d1,user=u1' → {"video":..., "deviceId":..., "userId":...}"""
+    out: Dict[str, str] = {}
+    for part in text.split(","):
+        if "=" not in part:
+            raise ValueError(f"fonte inválida: {text!r} (use video=...,device=...,user=...)")
+        k, v = part.split("=", 1)
+        k = k.strip()
+        out[{"device": "deviceId", "user": "userId"}.get(k, k)] = v.strip()
+    if "video" not in out:
+        raise ValueError(f"fonte sem video=: {text!r}")
+    return out
+
+
+def is_live(video: str) -> bool:
+    return video.isdigit() or video.startswith(LIVE_PREFIXES)
+
+
+# ==================== Worker ====================
+def _worker(wid: int, sources: List[Dict[str, Any]], cfg: Dict[str, Any],
+            out_q, stop) -> None:
+    streams: List[Dict[str, Any]] = []
+    policy = None
+    stop_local = threading.Event()
+    try:
+        # imports e cascade dentro do try: uma falha aqui também chega ao supervisor
+        import cv2
+        from pipeline import FrameRing, start_capture
+        from face_detect import FaceLocator, load_face_cascade
+        from face_scoring import SimpleFaceHeuristics
+        from training_router import TrainingRouter
+        from send_policy import SendPolicy
+
+        signal.signal(signal.SIGINT, signal.SIG_IGN)  # quem encerra é o supervisor
+        cv2.setNumThreads(1)  # um núcleo por worker; evita disputa entre processos
+        cascade = load_face_cascade()
+        target_w = max(320, int(cfg["width"]))
+        policy = SendPolicy(cfg["send_policy"], epsilon=cfg["send_epsilon"],
+                            heartbeat=cfg["heartbeat"], min_interval=cfg["push_interval"])
+
+        for src in sources:
+            video = src["video"]
+            cap = cv2.VideoCapture(int(video) if video.isdigit() else video)
+            if not cap.isOpened():
+                out_q.put(("error", src["index"], f"não abriu {video}"))
+                continue
+            live = is_live(video)
+            ring = FrameRing(2, "drop" if live else "block", name=f"s{src['index']}")
+
+            def read(cap=cap, live=live):
+                ok, frame = cap.read()
+                if not ok and cfg["loop"] and not live:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    ok, frame = cap.read()
+                if not ok:
+                    return None
+                h, w = frame.shape[:2]
+                scale = target_w / float(w)
+                return cv2.resize(frame, (target_w, int(h*scale)), interpolation=cv2.INTER_AREA)
+
+            th = start_capture(read, ring, stop_local, name=f"capture-{src['index']}")
+            streams.append({
+                "src": src, "cap": cap, "ring": ring, "th": th,
+                "heur": SimpleFaceHeuristics(),
+                "locator": FaceLocator(cascade, detect_every=cfg["detect_every"],
+                                       strategy=cfg["detect_strategy"]),
+                "router": TrainingRouter(cfg["threshold"], cooldowns={}),
+                "frames": 0, "eof": False,
+            })
+
+        last_report = time.time()
+        while not stop.is_set() and any(not s["eof"] for s in streams):
+            did = False
+            for s in streams:
+                if s["eof"]:
+                    continue
+                frame = s["ring"].get(timeout=0.0)
+                if frame is None:
+                    if s["ring"].closed and len(s["ring"]) == 0:
+                        s["eof"] = True
+                        out_q.put(("eof", s["src"]["index"], s["frames"]))
+                    continue
+                did = True
+                gray = cv2.equalizeHist(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+                faces = s["locator"].locate(gray)
+                if faces:
+                    score, _ = s["heur"].compute(frame, faces[0])
+                    d = s["router"].update(score)
+                else:
+                    d = s["router"].no_face()
+                s["frames"] += 1
+                now = time.time()
+                if cfg["api"] and policy.check(s["src"]["deviceId"], d.level, d.score, now, d.alert):
+                    out_q.put(("event", s["src"]["index"], {
+                        "deviceId": s["src"]["deviceId"], "userId": s["src"]["userId"],
+                        "score": float(round(d.score, 3)), "level": d.level,
+                        "route": d.label, "ts": int(now)}))
+            now = time.time()
+            if now - last_report >= 1.0:
+                out_q.put(("frames", wid, {s["src"]["index"]: s["frames"] for s in streams}))
+                last_report = now
+            if not did:
+                time.sleep(0.002)
+    except Exception as e:
+        out_q.put(("fail", wid, f"{type(e).__name__}: {e}"))
+    finally:
+        out_q.put(("frames", wid, {s["src"]["index"]: s["frames"] for s in streams}))
+        if policy is not None:
+            out_q.put(("send", wid, policy.per_key()))
+        stop_local.set()
+        for s in streams:
+            s["ring"].close()
+            s["th"].join(timeout=1.0)
+            s["cap"].release()
+        out_q.put(("done", wid, None))
+
+
+# ==================== Supervisor ====================
+def main():
+    parser = argparse.ArgumentParser(description="Daemon multi-stream do facial")
+    parser.add_argument("--source", action="append", default=[],
+                        help='Fonte: "video=arquivo|0|rtsp://...,device=ID,user=ID" (repetível)')
+    parser.add_argument("--sources", type=str, default="", help="JSON com lista de fontes")
+    parser.add_argument("--workers", type=int, default=0, help="Processos worker (0 = nº de núcleos)")
+    parser.add_argument("--width", type=int, default=640)
+    parser.add_argument("--threshold", type=float, default=0.65)
+    parser.add_argument("--detect-every", type=int, default=1)
+    parser.add_argument("--detect-strategy", type=str, default="full", choices=["full", "adaptive"])
+    parser.add_argument("--loop", action="store_true", help="Reinicia arquivos ao terminar (simula câmera)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Para após N segundos (0 = até acabar)")
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    # REST
+    parser.add_argument("--api", type=str, default="http://127.0.0.1:8000")
+    parser.add_argument("--push-interval", type=float, default=1.0)
+    parser.add_argument("--send-policy", type=str, default="change", choices=["change", "interval"])
+    parser.add_argument("--send-epsilon", type=float, default=0.05)
+    parser.add_argument("--heartbeat", type=float, default=30.0)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--batch-window", type=float, default=1.0)
+    parser.add_argument("--spool", type=str, default="events_spool.jsonl")
+    args = parser.parse_args()
+
+    sources: List[Dict[str, Any]] = []
+    if args.sources:
+        with open(args.sources, "r", encoding="utf-8") as f:
+            sources.extend(json.load(f))
+    sources.extend(parse_source(s) for s in args.source)
+    if not sources:
+        parser.error("informe ao menos uma --source ou --sources")
+    for i, src in enumerate(sources):
+        src["video"] = str(src["video"])
+        src.setdefault("deviceId", f"xp-edge-{i+1:02d}")
+        src.setdefault("userId", "demo-admin")
+        src["index"] = i
+
+    n_workers = args.workers or os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, len(sources)))
+    groups = [sources[i::n_workers] for i in range(n_workers)]
+    cfg = {"width": args.width, "threshold": args.threshold, "loop": args.loop,
+           "detect_every": args.detect_every, "detect_strategy": args.detect_strategy,
+           "api": args.api, "push_interval": args.push_interval, "send_policy": args.send_policy,
+           "send_epsilon": args.send_epsilon, "heartbeat": args.heartbeat}
+
+    from event_publisher import EventPublisher
+    publisher = EventPublisher(args.api, batch_size=args.batch_size,
+                               batch_window=args.batch_window, spool_path=args.spool)
+
+    ctx = mp.get_context("spawn")
+    out_q = ctx.Queue()
+    stop = ctx.Event()
+    procs = [ctx.Process(target=_worker, args=(i, g, cfg, out_q, stop), daemon=True)
+             for i, g in enumerate(groups)]
+    print(f"[DAEMON] {len(sources)} streams em {n_workers} workers")
+    t0 = time.time()
+    for p in procs:
+        p.start()
+
+    frames = {s["index"]: 0 for s in sources}
+    send_stats: Dict[str, Dict[str, Any]] = {}
+    prev = dict(frames)
+    t_prev = t0
+    finished = set()   # workers que mandaram "done" ou morreram sem mandar
+    next_alive = t0
+    try:
+        while len(finished) < len(procs):
+            now = time.time()
+            if now >= next_alive:
+                # a cada 0.5 s, com ou sem tráfego na fila: worker morto com exitcode != 0
+                # (crash, kill, erro fora do try) não manda "done". Saída normal (0) manda
+                # "done" antes de sair, então esse é esperado pela fila
+                next_alive = now + 0.5
+                for i, p in enumerate(procs):
+                    if i not in finished and not p.is_alive() and p.exitcode != 0:
+                        finished.add(i)
+                        print(f"[WARN] worker {i} terminou sem avisar (exitcode={p.exitcode})")
+            if args.duration and now - t0 >= args.duration:
+                stop.set()
+            if now - t_prev >= args.report_interval:
+                dt = now - t_prev
+                per = {i: (frames[i] - prev[i]) / dt for i in frames}
+                line = "  ".join(f"{sources[i]['deviceId']}={fps:.1f}" for i, fps in per.items())
+                print(f"[DAEMON] total={sum(per.values()):.1f} fps | {line} | pub={publisher.metrics()['queue_depth']}q")
+                prev, t_prev = dict(frames), now
+            try:
+                kind, key, data = out_q.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            if kind == "event":
+                publisher.publish(data)
+            elif kind == "frames":
+                frames.update(data)
+            elif kind == "send":
+                send_stats.update(data)
+            elif kind == "eof":
+                print(f"[DAEMON] fim do stream {sources[key]['deviceId']} ({data} frames)")
+            elif kind == "error":
+                print(f"[WARN] stream {sources[key]['deviceId']}: {data}")
+            elif kind == "fail":
+                print(f"[WARN] worker {key} falhou: {data}")
+            elif kind == "done":
+                finished.add(key)
+    except KeyboardInterrupt:
+        print("\n[DAEMON] Encerrando...")
+        stop.set()
+    finally:
+        stop.set()
+        for p in procs:
+            p.join(timeout=5.0)
+        elapsed = max(1e-6, time.time() - t0)
+        total = sum(frames.values())
+        for i, n in frames.items():
+            print(f"[DAEMON] {sources[i]['deviceId']}: {n} frames, {n/elapsed:.1f} fps")
+        print(f"[DAEMON] throughput total: {total/elapsed:.1f} fps ({total} frames em {elapsed:.1f}s)")
+        if args.api:
+            publisher.close()
+            for dev, st in sorted(send_stats.items()):
+                print(f"[SEND] {dev}: {st}")
+            print(f"[PUB] {publisher.metrics()}")
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except KeyboardInterrupt:
+        sys.exit(130)
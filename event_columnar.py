@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+event_columnar.py — Log de eventos binário, registros de tamanho fixo (backend opcional da API)
+- <base>.bin: registros de 28 bytes (ts int64, score float32, level uint8,
+  deviceId/userId/route como ids internados uint32), append-only, lido via np.memmap
+- <base>.strings.jsonl: tabela de strings internadas (id = nº da linha), append-only
+- Índice esparso de tempo em memória: (min_ts, max_ts) por bloco de BLOCK registros;
+  se o arquivo está ordenado por ts, a busca é binária (np.searchsorted) direto
+- ts_iso não é gravado; só é calculado (vetorizado) no export para CSV
+
+Uso (CLI):
+    python event_columnar.py import --db events_log --csv events_log.csv
+    python event_columnar.py export --db events_log --out events_log_export.csv [--since ..] [--until ..]
+
+Dependências: numpy
+"""
+
+import argparse, csv, json, os, struct, threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+LEVELS = ["leve", "medio", "alto", "neutro"]
+LEVEL_CODE = {name: i for i, name in enumerate(LEVELS)}
+CSV_HEADER = ["ts_iso", "deviceId", "userId", "score", "level", "route", "ts"]
+
+RECORD = struct.Struct("<qfB3xIII")
+DTYPE = np.dtype([("ts", "<i8"), ("score", "<f4"), ("level", "u1"), ("_pad", "V3"),
+                  ("device", "<u4"), ("user", "<u4"), ("route", "<u4")])
+assert DTYPE.itemsize == RECORD.size
+BLOCK = 1024
+
+
+class ColumnarEventLog:
+    def __init__(self, base: str):
+        self.base = base
+        self.bin_path = base + ".bin"
+        self.str_path = base + ".strings.jsonl"
+        d = os.path.dirname(base)
+        if d and not os.path.exists(d):
+            os.makedirs(d, exist_ok=True)
+        self._lock = threading.Lock()
+        self._strings: List[str] = []
+        self._ids: Dict[str, int] = {}
+        self._load_strings()
+        # descarta um registro parcial no fim (queda no meio de uma escrita)
+        size = os.path.getsize(self.bin_path) if os.path.exists(self.bin_path) else 0
+        if size % RECORD.size:
+            with open(self.bin_path, "r+b") as f:
+                f.truncate(size - size % RECORD.size)
+        self._bin = open(self.bin_path, "ab")
+        self._str = open(self.str_path, "a", encoding="utf-8")
+        self._count = 0
+        self._mm = None
+        self._mm_count = 0
+        self._blk_min: List[int] = []
+        self._blk_max: List[int] = []
+        self._sorted = True
+        self._last_ts: Optional[int] = None
+        self._build_index()
+
+    # ---------- strings internadas ----------
+    def _load_strings(self):
+        if not os.path.exists(self.str_path):
+            return
+        with open(self.str_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                s = json.loads(line)
+                self._ids[s] = len(self._strings)
+                self._strings.append(s)
+
+    def _intern(self, s: str) -> int:
+        i = self._ids.get(s)
+        if i is None:
+            i = self._ids[s] = len(self._strings)
+            self._strings.append(s)
+            self._str.write(json.dumps(s, ensure_ascii=False) + "\n")
+            self._str.flush()
+        return i
+
+    # ---------- índice esparso ----------
+    def _build_index(self):
+        n = os.path.getsize(self.bin_path) // RECORD.size
+        self._count = n
+        if n == 0:
+            return
+        ts = self._map(n)["ts"]
+        full = (n // BLOCK) * BLOCK
+        if full:
+            blocks = ts[:full].reshape(-1, BLOCK)
+            self._blk_min = blocks.min(axis=1).tolist()
+            self._blk_max = blocks.max(axis=1).tolist()
+        if full < n:
+            self._blk_min.append(int(ts[full:].min()))
+            self._blk_max.append(int(ts[full:].max()))
+        self._sorted = bool(np.all(ts[1:] >= ts[:-1])) if n > 1 else True
+        self._last_ts = int(ts[-1])
+
+    def _map(self, n: int):
+        if self._mm is None or self._mm_count != n:
+            self._mm = np.memmap(self.bin_path, dtype=DTYPE, mode="r", shape=(n,)) if n else \
+                np.zeros(0, dtype=DTYPE)
+            self._mm_count = n
+        return self._mm
+
+    def __len__(self) -> int:
+        return self._count
+
+    # ---------- escrita ----------
+    def append(self, events: List[Dict[str, Any]]):
+        if not events:
+            return
+        with self._lock:
+            buf = bytearray()
+            for e in events:
+                ts = int(e["ts"])
+                buf += RECORD.pack(ts, float(e["score"]), LEVEL_CODE[e["level"]],
+                                   self._intern(e["deviceId"]), self._intern(e["userId"]),
+                                   self._intern(e["route"]))
+                i = self._count
+                if i % BLOCK == 0:
+                    self._blk_min.append(ts); self._blk_max.append(ts)
+                else:
+                    b = i // BLOCK
+                    if ts < self._blk_min[b]: self._blk_min[b] = ts
+                    if ts > self._blk_max[b]: self._blk_max[b] = ts
+                if self._last_ts is not None and ts < self._last_ts:
+                    self._sorted = False
+                self._last_ts = ts
+                self._count += 1
+            self._bin.write(buf)
+            self._bin.flush()
+
+    def close(self):
+        with self._lock:
+            for f in (self._bin, self._str):
+                try: f.close()
+                except Exception: pass
+            self._mm = None
+
+    # ---------- leitura ----------
+    def _slice_range(self, since: Optional[int], until: Optional[int]):
+        """Registros (numpy) com since <= ts <= until, sem parsear texto."""
+        with self._lock:
+            n = self._count
+            mm = self._map(n)
+            sorted_ = self._sorted
+            bmin = np.asarray(self._blk_min, dtype=np.int64)
+            bmax = np.asarray(self._blk_max, dtype=np.int64)
+        if n == 0:
+            return mm
+        lo_ts = np.iinfo(np.int64).min if since is None else int(since)
+        hi_ts = np.iinfo(np.int64).max if until is None else int(until)
+        if sorted_:
+            ts = mm["ts"]
+            lo = int(np.searchsorted(ts, lo_ts, side="left"))
+            hi = int(np.searchsorted(ts, hi_ts, side="right"))
+            return mm[lo:hi]
+        # fora de ordem: só os blocos cujo [min, max] cruza o intervalo
+        hit = np.nonzero((bmax >= lo_ts) & (bmin <= hi_ts))[0]
+        if hit.size == 0:
+            return mm[:0]
+        parts = [mm[b*BLOCK:min(n, (b+1)*BLOCK)] for b in hit]
+        recs = np.concatenate(parts)
+        ts = recs["ts"]
+        return recs[(ts >= lo_ts) & (ts <= hi_ts)]
+
+    def query(self, userId: Optional[str] = None, deviceId: Optional[str] = None,
+              level: Optional[str] = None, since: Optional[int] = None,
+              until: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        recs = self._slice_range(since, until)
+        mask = None
+        for col, val in (("user", userId), ("device", deviceId)):
+            if val is not None:
+                sid = self._ids.get(val)
+                if sid is None:
+                    return []
+                m = recs[col] == sid
+                mask = m if mask is None else mask & m
+        if level is not None:
+            m = recs["level"] == LEVEL_CODE[level]
+            mask = m if mask is None else mask & m
+        if mask is not None:
+            recs = recs[mask]
+        if limit is not None and limit >= 0:
+            recs = recs[max(0, len(recs) - limit):]
+        return [self._to_dict(r) for r in recs]
+
+    def _to_dict(self, r) -> Dict[str, Any]:
+        return {
+            "deviceId": self._strings[int(r["device"])],
+            "userId": self._strings[int(r["user"])],
+            "score": round(float(r["score"]), 3),
+            "level": LEVELS[int(r["level"])],
+            "route": self._strings[int(r["route"])],
+            "ts": int(r["ts"]),
+        }
+
+    # ---------- CSV ----------
+    def export_csv(self, out_path: str, since: Optional[int] = None,
+                   until: Optional[int] = None, chunk: int = 65536) -> int:
+        """Gera o CSV no layout atual do events_log.csv. Retorna nº de linhas."""
+        recs = self._slice_range(since, until)
+        strings = np.asarray(self._strings, dtype=object)
+        levels = np.asarray(LEVELS, dtype=object)
+        with open(out_path, "w", newline="", encoding="utf-8") as f:
+            w = csv.writer(f)
+            w.writerow(CSV_HEADER)
+            for i in range(0, len(recs), chunk):
+                part = recs[i:i+chunk]
+                iso = np.datetime_as_string(part["ts"].astype("datetime64[s]"))
+                w.writerows(zip(
+                    (s + "Z" for s in iso.tolist()),
+                    strings[part["device"]].tolist(), strings[part["user"]].tolist(),
+                    (f"{x:.3f}" for x in part["score"].tolist()),
+                    levels[part["level"]].tolist(), strings[part["route"]].tolist(),
+                    part["ts"].tolist()))
+        return len(recs)
+
+    def import_csv(self, csv_path: str, chunk: int = 10000) -> int:
+        """Carrega um events_log.csv existente (colunas deviceId..ts)."""
+        n, batch = 0, []
+        with open(csv_path, "r", newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                if row.get("level") not in LEVEL_CODE:
+                    continue
+                try:
+                    batch.append({"deviceId": row["deviceId"], "userId": row["userId"],
+                                  "score": float(row["score"]), "level": row["level"],
+                                  "route": row["route"], "ts": int(row["ts"])})
+                except (KeyError, ValueError):
+                    continue
+                if len(batch) >= chunk:
+                    self.append(batch); n += len(batch); batch = []
+        self.append(batch)
+        return n + len(batch)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Log colunar de eventos (import/export CSV)")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_exp = sub.add_parser("export", help="Exporta para o layout do events_log.csv")
+    p_exp.add_argument("--db", type=str, default="events_log", help="Base dos arquivos (.bin/.strings.jsonl)")
+    p_exp.add_argument("--out", type=str, required=True)
+    p_exp.add_argument("--since", type=int, default=None)
+    p_exp.add_argument("--until", type=int, default=None)
+    p_imp = sub.add_parser("import", help="Importa um events_log.csv existente")
+    p_imp.add_argument("--db", type=str, default="events_log")
+    p_imp.add_argument("--csv", type=str, default="events_log.csv")
+    args = parser.parse_args()
+
+    log = ColumnarEventLog(args.db)
+    try:
+        if args.cmd == "export":
+            n = log.export_csv(args.out, args.since, args.until)
+            print(f"[EXPORT] {n} eventos -> {args.out}")
+        else:
+            n = log.import_csv(args.csv)
+            print(f"[IMPORT] {n} eventos de {args.csv} -> {log.bin_path}")
+    finally:
+        log.close()
+
+
+if __name__ == "__main__":
+    main()
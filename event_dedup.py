@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+event_dedup.py — Ingestão idempotente: descarta reenvios do mesmo evento
+- Chave: eventId enviado pelo cliente (EventPublisher gera um por evento) ou,
+  sem ele, o conteúdo (deviceId, userId, trackId, ts, score, level, route)
+- DedupWindow: OrderedDict em ordem de inserção = LRU por tempo; cada chave
+  vale por `ttl` segundos desde a primeira vez e o total é limitado a `maxlen`
+  (descarta a mais antiga). Consulta e inserção O(1); expiração amortizada O(1)
+- Duplicado é confirmado ao cliente (ok) mas não vai para STORE/STATS/SSE/log
+"""
+
+import threading, time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+
+def event_key(d: Dict[str, Any]) -> Hashable:
+    eid = d.get("eventId")
+    if eid:
+        return ("id", d["deviceId"], eid)
+    return (d["deviceId"], d["userId"], d.get("trackId"), int(d["ts"]),
+            round(float(d["score"]), 3), d["level"], d["route"])
+
+
+class DedupWindow:
+    def __init__(self, ttl: float = 600.0, maxlen: int = 200_000):
+        self.ttl = float(ttl)
+        self.maxlen = max(1, int(maxlen))
+        # chave → instante da 1ª vez; OrderedDict porque descartar do início de um
+        # dict comum degrada (a iteração pula os slots apagados)
+        self._seen: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.duplicates = 0
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def _expire(self, now: float):
+        seen = self._seen
+        limit = now - self.ttl
+        while seen:
+            if seen[next(iter(seen))] > limit and len(seen) < self.maxlen:
+                break
+            seen.popitem(last=False)
+            self.evicted += 1
+
+    def check(self, key: Hashable, now: Optional[float] = None) -> bool:
+        """True se `key` já foi vista na janela (duplicado); senão registra e devolve False."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            self.checked += 1
+            t = self._seen.get(key)
+            if t is not None and now - t <= self.ttl:
+                self.duplicates += 1
+                return True
+            if t is not None:
+                del self._seen[key]   # expirou: reinsere no fim
+            self._expire(now)
+            self._seen[key] = now
+            return False
+
+    def seed(self, key: Hashable, now: float):
+        """Registra uma chave já vista (aquecimento após restart) sem contar nas métricas."""
+        with self._lock:
+            if key not in self._seen:
+                self._expire(now)
+                self._seen[key] = now
+
+    def stats(self) -> Dict[str, Any]:
+        return {"keys": len(self._seen), "checked": self.checked,
+                "duplicates": self.duplicates, "evicted": self.evicted,
+                "ttl_s": self.ttl, "maxlen": self.maxlen}
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+event_log.py — Escrita do log de eventos (CSV) fora do request handler
+- write_rows() só coloca as linhas num buffer em memória (não toca disco)
+- Thread própria grava em grupo quando o buffer enche (flush_rows) ou a cada
+  flush_interval segundos, mantendo o arquivo aberto entre flushes
+- Rotação por tamanho (rotate_bytes) e/ou por dia (UTC); segmentos rotacionados
+  viram events_log.AAAAMMDD-HHMMSS.csv e podem ser comprimidos (.gz)
+- write_now(): gravação síncrona, para quem já serializa a escrita (líder do log
+  no modo multi-worker da API)
+- close() grava tudo o que estiver pendente (ligado ao shutdown da API e ao atexit)
+- read_tail(): últimas N linhas lendo o arquivo de trás para frente em blocos
+  (custo proporcional a N, não ao tamanho do log) — aquece o STORE da API no start
+"""
+
+import atexit, csv, gzip, io, os, shutil, threading, time
+from datetime import datetime, timezone
+from typing import List, Optional, Sequence
+
+
+class EventLogWriter:
+    def __init__(self, path: str, header: Sequence[str], *, flush_rows: int = 256,
+                 flush_interval: float = 1.0, rotate_bytes: int = 0,
+                 rotate_daily: bool = False, compress: bool = False,
+                 max_buffer: int = 100_000):
+        self.path = path
+        self.header = list(header)
+        self.flush_rows = max(1, int(flush_rows))
+        self.flush_interval = max(0.01, float(flush_interval))
+        self.rotate_bytes = int(rotate_bytes)
+        self.rotate_daily = rotate_daily
+        self.compress = compress
+        self.max_buffer = max_buffer
+        self._buf: List[list] = []
+        self._cond = threading.Condition()
+        self._io_lock = threading.Lock()
+        self._th: Optional[threading.Thread] = None
+        self._closed = False
+        self._f = None
+        self._size = 0
+        self._day = None
+        self._header_len = len(self._format([self.header]).encode("utf-8"))
+        # métricas
+        self.rows_written = 0
+        self.rows_dropped = 0
+        self.flushes = 0
+        self.rotations = 0
+
+    # ---------- API ----------
+    def start(self):
+        with self._cond:
+            if self._th is not None or self._closed:
+                return
+            self._th = threading.Thread(target=self._run, name="event-log-writer", daemon=True)
+            self._th.start()
+        atexit.register(self.close)
+
+    def write_rows(self, rows: List[list]):
+        """Enfileira linhas para gravação. Não bloqueia em I/O."""
+        if not rows:
+            return
+        if self._th is None:
+            self.start()
+        with self._cond:
+            if len(self._buf) + len(rows) > self.max_buffer:
+                # disco travado: protege a memória descartando o excedente
+                keep = max(0, self.max_buffer - len(self._buf))
+                self.rows_dropped += len(rows) - keep
+                rows = rows[:keep]
+            self._buf.extend(rows)
+            if len(self._buf) >= self.flush_rows:
+                self._cond.notify()
+
+    def write_now(self, rows: List[list]):
+        """Grava as linhas já, na thread de quem chamou (quem controla a ordem é o chamador)."""
+        self._write(rows)
+
+    def flush(self):
+        """Grava o pendente agora (na thread de quem chamou)."""
+        with self._cond:
+            rows, self._buf = self._buf, []
+        self._write(rows)
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        if self._th is not None:
+            self._th.join(timeout=5.0)
+        self.flush()
+        with self._io_lock:
+            if self._f is not None:
+                self._f.close()
+                self._f = None
+
+    # ---------- thread ----------
+    def _run(self):
+        while True:
+            with self._cond:
+                if not self._closed and len(self._buf) < self.flush_rows:
+                    self._cond.wait(timeout=self.flush_interval)
+                rows, self._buf = self._buf, []
+                closed = self._closed
+            try:
+                self._write(rows)
+            except Exception as e:
+                print("[WARN] Falha ao gravar log de eventos:", e)
+            if closed:
+                return
+
+    @staticmethod
+    def _utc_day(ts: float) -> str:
+        return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y%m%d")
+
+    def _open(self):
+        d = os.path.dirname(self.path)
+        if d and not os.path.exists(d):
+            os.makedirs(d, exist_ok=True)
+        self._f = open(self.path, "a", newline="", encoding="utf-8")
+        self._size = self._f.tell()
+        if self._size == 0:
+            self._f.write(self._format([self.header]))
+            self._size = self._f.tell()
+        mtime = os.path.getmtime(self.path)
+        self._day = self._utc_day(mtime)
+
+    def _needs_rotation(self) -> bool:
+        if self.rotate_bytes and self._size >= self.rotate_bytes:
+            return True
+        return self.rotate_daily and self._day != self._utc_day(time.time())
+
+    def _rotate(self):
+        self._f.close()
+        self._f = None
+        base, ext = os.path.splitext(self.path)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+        dst = f"{base}.{stamp}{ext}"
+        n = 1
+        while os.path.exists(dst) or os.path.exists(dst + ".gz"):
+            dst = f"{base}.{stamp}-{n}{ext}"; n += 1
+        os.replace(self.path, dst)
+        self.rotations += 1
+        if self.compress:
+            threading.Thread(target=_gzip_file, args=(dst,), daemon=True).start()
+
+    @staticmethod
+    def _format(rows: List[list]) -> str:
+        sio = io.StringIO()
+        csv.writer(sio).writerows(rows)
+        return sio.getvalue()
+
+    def _write(self, rows: List[list]):
+        if not rows:
+            return
+        data = self._format(rows)
+        with self._io_lock:
+            if self._f is None:
+                self._open()
+            if self._needs_rotation() and self._size > self._header_len:
+                self._rotate()
+                self._open()
+            self._f.write(data)
+            self._f.flush()
+            self._size = self._f.tell()
+        self.rows_written += len(rows)
+        self.flushes += 1
+
+
+def _gzip_file(path: str):
+    try:
+        with open(path, "rb") as src, gzip.open(path + ".gz", "wb") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(path)
+    except Exception as e:
+        print("[WARN] Falha ao comprimir", path, e)
+
+
+def read_tail(path: str, n: int, block: int = 64 * 1024) -> List[List[str]]:
+    """Últimas `n` linhas de dados do CSV (ordem cronológica, sem o cabeçalho)."""
+    if n <= 0 or not os.path.exists(path):
+        return []
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        chunks: List[bytes] = []
+        newlines = 0
+        while pos > 0 and newlines <= n:
+            step = min(block, pos)
+            pos -= step
+            f.seek(pos)
+            chunk = f.read(step)
+            chunks.append(chunk)
+            newlines += chunk.count(b"\n")
+    lines = b"".join(reversed(chunks)).decode("utf-8", errors="replace").splitlines()
+    lines = lines[1:]   # no meio do arquivo: linha cortada; no início: cabeçalho
+    return [r for r in csv.reader(lines[-n:]) if r]
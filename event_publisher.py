@@ -0,0 +1,422 @@
+# -*- coding: utf-8 -*-
+"""
+event_publisher.py — Envio de eventos em segundo plano para a API (FastAPI)
+- publish() nunca bloqueia o loop de frames: só enfileira (fila limitada, descarta o mais antigo)
+- Thread própria agrupa eventos em lotes (por tamanho ou janela de tempo) e envia
+  para POST /events/batch; se o gateway não tiver o endpoint, cai para POST /events
+- Conexões keep-alive (requests.Session com pool; fallback http.client persistente);
+  o requests só é importado no primeiro envio, já na thread do publicador
+- Retry com backoff exponencial; o que não sair vai para um spool em disco
+  (JSONL append-only) que é reenviado quando o gateway volta — inclusive após restart
+- Cada evento leva um eventId único (prefixo aleatório do processo + contador):
+  reenvios após timeout/restart são descartados pela API como duplicados
+- metrics(): profundidade da fila, latência de lote, descartes, spool pendente
+
+Dependências: nenhuma obrigatória; (opcional) requests
+"""
+
+import json, os, random, threading, time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+# ==================== Cliente HTTP persistente ====================
+class _HttpClient:
+    """POST JSON reaproveitando conexões. Retorna (status, corpo_json|None)."""
+
+    def __init__(self, base_url: str, timeout: float = 2.5, pool_size: int = 2):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.pool_size = pool_size
+        self._session = None
+        self._conn = None
+        self._ready = False
+
+    def _setup(self):
+        # import tardio: o requests custa ~0.1 s de import e só é preciso quando há envio
+        self._ready = True
+        try:
+            import requests  # recomendado (pool de conexões)
+            from requests.adapters import HTTPAdapter
+        except Exception:
+            return
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, self.pool_size))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def post_json(self, path: str, obj: Any) -> Tuple[int, Any]:
+        if not self._ready:
+            self._setup()
+        url = self.base_url + path
+        if self._session is not None:
+            resp = self._session.post(url, json=obj, timeout=self.timeout)
+            try:
+                body = resp.json()
+            except Exception:
+                body = None
+            return resp.status_code, body
+        return self._post_native(url, obj)
+
+    def _post_native(self, url: str, obj: Any) -> Tuple[int, Any]:
+        # fallback nativo: http.client com conexão keep-alive reaproveitada
+        import http.client
+        parts = urlsplit(url)
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+            self._conn = cls(parts.netloc, timeout=self.timeout)
+        data = json.dumps(obj).encode("utf-8")
+        try:
+            self._conn.request("POST", parts.path or "/", body=data,
+                               headers={"Content-Type": "application/json"})
+            r = self._conn.getresponse()
+            raw = r.read()
+        except Exception:
+            self.close()
+            raise
+        try:
+            body = json.loads(raw.decode("utf-8")) if raw else None
+        except Exception:
+            body = None
+        return r.status, body
+
+    def close(self):
+        if self._conn is not None:
+            try: self._conn.close()
+            except Exception: pass
+            self._conn = None
+        if self._session is not None:
+            try: self._session.close()
+            except Exception: pass
+
+
+# ==================== Spool em disco ====================
+class EventSpool:
+    """
+    Arquivo JSONL append-only com os eventos não entregues.
+    Um arquivo irmão `.offset` guarda até onde já foi reenviado; quando tudo
+    foi entregue, ambos são zerados. Linha parcial no fim (queda no meio de um
+    append) é cortada ao abrir, para o próximo append não colar nela.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.offset_path = path + ".offset"
+        self._lock = threading.Lock()
+        d = os.path.dirname(path)
+        if d and not os.path.exists(d):
+            os.makedirs(d, exist_ok=True)
+        self._truncate_partial()
+
+    def _truncate_partial(self, block: int = 4096):
+        """Corta o arquivo no último \\n (descarta só o fragmento da escrita interrompida)."""
+        try:
+            f = open(self.path, "r+b")
+        except FileNotFoundError:
+            return
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            pos = end
+            while pos > 0:
+                step = min(block, pos)
+                f.seek(pos - step)
+                chunk = f.read(step)
+                i = chunk.rfind(b"\n")
+                if i >= 0:
+                    pos = pos - step + i + 1
+                    break
+                pos -= step
+            if pos < end:
+                f.truncate(pos)
+                print(f"[SPOOL] linha parcial descartada ({end - pos} bytes) em {self.path}")
+
+    def _read_offset(self) -> int:
+        try:
+            with open(self.offset_path, "r", encoding="utf-8") as f:
+                return int(f.read().strip() or 0)
+        except Exception:
+            return 0
+
+    def _write_offset(self, off: int):
+        tmp = self.offset_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(str(off))
+        os.replace(tmp, self.offset_path)
+
+    def append(self, events: List[Dict[str, Any]]):
+        if not events:
+            return
+        data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in events)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+
+    def pending_bytes(self) -> int:
+        try:
+            return max(0, os.path.getsize(self.path) - self._read_offset())
+        except OSError:
+            return 0
+
+    def read_batch(self, max_items: int) -> Tuple[List[Dict[str, Any]], int]:
+        """Lê até max_items eventos pendentes. Retorna (eventos, offset_final)."""
+        with self._lock:
+            off = self._read_offset()
+            out: List[Dict[str, Any]] = []
+            try:
+                with open(self.path, "rb") as f:
+                    f.seek(off)
+                    while len(out) < max_items:
+                        line = f.readline()
+                        if not line or not line.endswith(b"\n"):
+                            break  # linha parcial (queda no meio da escrita): ignora por ora
+                        off += len(line)
+                        try:
+                            out.append(json.loads(line.decode("utf-8")))
+                        except Exception:
+                            continue
+            except FileNotFoundError:
+                pass
+            return out, off
+
+    def commit(self, off: int):
+        """Marca como entregue até `off`; compacta quando o spool esvazia."""
+        with self._lock:
+            try:
+                size = os.path.getsize(self.path)
+            except OSError:
+                size = 0
+            if off >= size:
+                for p in (self.path, self.offset_path):
+                    try: os.remove(p)
+                    except OSError: pass
+            else:
+                self._write_offset(off)
+
+
+# ==================== Publisher ====================
+class EventPublisher:
+    """
+    Publicador assíncrono de eventos. Uso:
+        pub = EventPublisher("http://127.0.0.1:8000", spool_path="events_spool.jsonl")
+        pub.publish({...})   # não bloqueia
+        ...
+        pub.close()          # envia o que der; o resto fica no spool
+    """
+
+    def __init__(self, base_url: str, *, batch_size: int = 50, batch_window: float = 1.0,
+                 max_queue: int = 5000, spool_path: str = "events_spool.jsonl",
+                 timeout: float = 2.5, max_retries: int = 3, backoff: float = 0.5,
+                 backoff_max: float = 30.0, pool_size: int = 2, verbose: bool = True,
+                 event_ids: bool = True):
+        self.base_url = (base_url or "").rstrip("/")
+        self.batch_size = max(1, int(batch_size))
+        self.batch_window = max(0.0, float(batch_window))
+        self.max_retries = max(0, int(max_retries))
+        self.backoff = max(0.01, float(backoff))
+        self.backoff_max = float(backoff_max)
+        self.verbose = verbose
+        self._id_prefix = os.urandom(6).hex() if event_ids else ""
+        self._q: deque = deque(maxlen=max(1, int(max_queue)))
+        self._cond = threading.Condition()
+        self._closing = False
+        self._client = _HttpClient(self.base_url, timeout=timeout, pool_size=pool_size)
+        self._spool = EventSpool(spool_path) if spool_path else None
+        self._batch_supported = True
+        self._down_until = 0.0   # gateway fora: não tenta antes disso
+        self._down_backoff = self.backoff
+        # métricas
+        self.published = 0
+        self.sent = 0
+        self.rejected = 0
+        self.duplicates = 0
+        self.dropped = 0
+        self.spooled = 0
+        self.retries = 0
+        self.batches = 0
+        self.last_status: Optional[int] = None
+        self.last_error = ""
+        self.last_batch_ms = 0.0
+        self.avg_batch_ms = 0.0
+        self._th = threading.Thread(target=self._run, name="event-publisher", daemon=True)
+        if self.base_url:
+            self._th.start()
+
+    # ---------- API pública ----------
+    def publish(self, event: Dict[str, Any]) -> bool:
+        """Enfileira um evento. Nunca bloqueia; se a fila estiver cheia, descarta o mais antigo."""
+        if not self.base_url:
+            return False
+        with self._cond:
+            if self._closing:
+                return False
+            if len(self._q) == self._q.maxlen:
+                self.dropped += 1
+            if self._id_prefix and "eventId" not in event:
+                event = dict(event, eventId=f"{self._id_prefix}-{self.published}")
+            self._q.append(event)
+            self.published += 1
+            if len(self._q) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "queue_depth": len(self._q),
+            "published": self.published,
+            "sent": self.sent,
+            "rejected": self.rejected,
+            "duplicates": self.duplicates,
+            "dropped": self.dropped,
+            "spooled": self.spooled,
+            "spool_pending_bytes": self._spool.pending_bytes() if self._spool else 0,
+            "retries": self.retries,
+            "batches": self.batches,
+            "last_batch_ms": round(self.last_batch_ms, 2),
+            "avg_batch_ms": round(self.avg_batch_ms, 2),
+            "last_status": self.last_status,
+            "last_error": self.last_error,
+            "gateway_up": time.time() >= self._down_until,
+        }
+
+    def close(self, timeout: float = 5.0):
+        """Para a thread, tenta enviar o pendente e grava o restante no spool."""
+        if not self.base_url:
+            return
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._th.join(timeout=timeout)
+        with self._cond:
+            rest = list(self._q)
+            self._q.clear()
+        if rest and self._spool is not None:
+            self._spool.append(rest)
+            self.spooled += len(rest)
+        self._client.close()
+
+    # ---------- thread de envio ----------
+    def _take_batch(self) -> List[Dict[str, Any]]:
+        with self._cond:
+            # espera o primeiro evento
+            while not self._q and not self._closing:
+                self._cond.wait(timeout=max(0.05, self.batch_window))
+                if not self._q and self._spool_has_pending():
+                    return []
+            if not self._q:
+                return []
+            # janela: espera encher o lote até batch_window desde o 1º evento
+            deadline = time.monotonic() + self.batch_window
+            while len(self._q) < self.batch_size and not self._closing:
+                left = deadline - time.monotonic()
+                if left <= 0:
+                    break
+                self._cond.wait(timeout=left)
+            n = min(self.batch_size, len(self._q))
+            return [self._q.popleft() for _ in range(n)]
+
+    def _spool_has_pending(self) -> bool:
+        return self._spool is not None and time.time() >= self._down_until \
+            and self._spool.pending_bytes() > 0
+
+    def _run(self):
+        while True:
+            # reenvia spool (eventos antigos primeiro) quando o gateway está de pé
+            if not self._closing and self._spool_has_pending():
+                events, off = self._spool.read_batch(self.batch_size)
+                if events and self._send_with_retry(events, retries=0):
+                    self._spool.commit(off)
+                    continue
+                elif not events:
+                    self._spool.commit(off)
+
+            batch = self._take_batch()
+            if not batch:
+                if self._closing:
+                    return
+                continue
+            if time.time() < self._down_until:
+                self._to_spool(batch)
+                continue
+            if not self._send_with_retry(batch, retries=0 if self._closing else self.max_retries):
+                self._to_spool(batch)
+            if self._closing and not self._q:
+                return
+
+    def _to_spool(self, batch: List[Dict[str, Any]]):
+        if self._spool is None:
+            self.dropped += len(batch)
+            return
+        try:
+            self._spool.append(batch)
+            self.spooled += len(batch)
+        except Exception as e:
+            self.dropped += len(batch)
+            self.last_error = f"spool: {e}"
+
+    def _send_with_retry(self, batch: List[Dict[str, Any]], retries: int) -> bool:
+        delay = self.backoff
+        for attempt in range(retries + 1):
+            t = time.perf_counter()
+            ok = self._send(batch)
+            ms = (time.perf_counter() - t) * 1000.0
+            self.last_batch_ms = ms
+            self.avg_batch_ms = ms if self.batches == 0 else 0.9*self.avg_batch_ms + 0.1*ms
+            self.batches += 1
+            if ok:
+                self.last_error = ""
+                if self._down_until:
+                    if self.verbose:
+                        print("[PUB] Gateway de volta; reenviando spool.")
+                    self._down_until = 0.0
+                    self._down_backoff = self.backoff
+                return True
+            if attempt < retries:
+                self.retries += 1
+                time.sleep(min(self.backoff_max, delay) * (0.5 + random.random()))
+                delay *= 2
+        # gateway fora: segura novas tentativas por um tempo (backoff exponencial)
+        if self.verbose and not self._down_until:
+            print(f"[WARN] Gateway indisponível ({self.last_error}); eventos vão para o spool.")
+        self._down_until = time.time() + self._down_backoff
+        self._down_backoff = min(self.backoff_max, self._down_backoff * 2)
+        return False
+
+    def _send(self, batch: List[Dict[str, Any]]) -> bool:
+        try:
+            if self._batch_supported:
+                status, body = self._client.post_json("/events/batch", batch)
+                self.last_status = status
+                if status in (404, 405):
+                    self._batch_supported = False  # gateway antigo: só /events
+                else:
+                    return self._handle_status(status, body, len(batch))
+            for i, ev in enumerate(batch):
+                status, body = self._client.post_json("/events", ev)
+                self.last_status = status
+                if not self._handle_status(status, body, 1):
+                    # reenvia apenas o que faltou
+                    del batch[:i]
+                    return False
+            return True
+        except Exception as e:
+            self.last_error = str(e)
+            return False
+
+    def _handle_status(self, status: int, body: Any, n: int) -> bool:
+        if 200 <= status < 300:
+            rej = int(body.get("rejected", 0)) if isinstance(body, dict) else 0
+            if isinstance(body, dict):
+                self.duplicates += int(body.get("duplicates", 0)) + bool(body.get("duplicate"))
+            self.rejected += rej
+            self.sent += n - rej
+            return True
+        if 400 <= status < 500 and status not in (408, 429):
+            # payload inválido: não adianta reenviar
+            self.rejected += n
+            self.last_error = f"HTTP {status}"
+            return True
+        self.last_error = f"HTTP {status}"
+        return False
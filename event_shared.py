@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+"""
+event_shared.py — Estado da API compartilhado entre workers do uvicorn (--workers N)
+- SharedEventStore: SQLite em modo WAL (vários leitores + um escritor por vez,
+  sem servidor). Mesma interface de consulta do EventStore (last/query) e do
+  EventStats (user/device), então /events, /events/last e /stats respondem igual
+  em qualquer worker
+- Idempotência na mesma transação do insert: tabela dedup(chave, instante) com
+  UPSERT condicional — um reenvio que cai noutro worker também é descartado
+- Agregados cumulativos (total, contagem por level, último "alto") numa tabela
+  agg atualizada no insert; janelas 1m/15m/1h por SQL sobre o instante de chegada
+- Cada evento recebe um id crescente; workers acompanham a tabela por id (SSE) e
+  o líder do log grava em disco a partir de um cursor persistido (meta.log_cursor)
+- LeaderLock: flock não-bloqueante num arquivo .lock; só quem o segura grava o
+  CSV (um único escritor, sem linhas intercaladas). Se o líder cai, o SO solta o
+  lock e outro worker assume do cursor salvo
+"""
+
+import json, os, sqlite3, threading, time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from event_stats import WINDOWS
+
+LEVELS = ("leve", "medio", "alto", "neutro")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events(
+    id INTEGER PRIMARY KEY AUTOINCREMENT, rt REAL NOT NULL, ts INTEGER NOT NULL,
+    deviceId TEXT NOT NULL, userId TEXT NOT NULL, score REAL NOT NULL,
+    level TEXT NOT NULL, body TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS ev_user ON events(userId, id);
+CREATE INDEX IF NOT EXISTS ev_device ON events(deviceId, id);
+CREATE INDEX IF NOT EXISTS ev_user_rt ON events(userId, rt);
+CREATE INDEX IF NOT EXISTS ev_device_rt ON events(deviceId, rt);
+CREATE INDEX IF NOT EXISTS ev_level ON events(level, id);
+CREATE INDEX IF NOT EXISTS ev_rt ON events(rt);
+CREATE TABLE IF NOT EXISTS dedup(k TEXT PRIMARY KEY, t REAL NOT NULL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS agg(
+    kind TEXT NOT NULL, key TEXT NOT NULL, total INTEGER NOT NULL DEFAULT 0,
+    leve INTEGER NOT NULL DEFAULT 0, medio INTEGER NOT NULL DEFAULT 0,
+    alto INTEGER NOT NULL DEFAULT 0, neutro INTEGER NOT NULL DEFAULT 0,
+    last_ts INTEGER, last_score REAL, last_alto_rt REAL, last_alto_ts INTEGER,
+    PRIMARY KEY(kind, key)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta(k TEXT PRIMARY KEY, v) WITHOUT ROWID;
+"""
+
+_AGG_UPSERT = """
+INSERT INTO agg(kind, key, total, {lv}, last_ts, last_score, last_alto_rt, last_alto_ts)
+VALUES(?, ?, 1, 1, ?, ?, ?, ?)
+ON CONFLICT(kind, key) DO UPDATE SET
+    total = total + 1, {lv} = {lv} + 1, last_ts = excluded.last_ts,
+    last_score = excluded.last_score,
+    last_alto_rt = COALESCE(excluded.last_alto_rt, last_alto_rt),
+    last_alto_ts = COALESCE(excluded.last_alto_ts, last_alto_ts)
+"""
+
+
+class SharedEventStore:
+    def __init__(self, path: str, *, busy_timeout: float = 10.0):
+        self.path = path
+        self.busy_timeout = busy_timeout
+        self.maxlen = 0          # sem anel em memória (api.py: nada a aquecer)
+        self._local = threading.local()
+        d = os.path.dirname(path)
+        if d and not os.path.exists(d):
+            os.makedirs(d, exist_ok=True)
+        con = self._con()
+        con.execute("PRAGMA journal_mode=WAL")
+        with self._tx(con):
+            for stmt in _SCHEMA.split(";"):
+                if stmt.strip():
+                    con.execute(stmt)
+
+    # ---------- conexão (uma por thread) ----------
+    def _con(self) -> sqlite3.Connection:
+        con = getattr(self._local, "con", None)
+        if con is None:
+            con = sqlite3.connect(self.path, timeout=self.busy_timeout,
+                                  isolation_level=None, check_same_thread=False)
+            con.execute("PRAGMA synchronous=NORMAL")
+            self._local.con = con
+        return con
+
+    class _tx:
+        """BEGIN IMMEDIATE ... COMMIT (ROLLBACK em erro)."""
+        def __init__(self, con):
+            self.con = con
+
+        def __enter__(self):
+            self.con.execute("BEGIN IMMEDIATE")
+            return self.con
+
+        def __exit__(self, exc_type, *_):
+            self.con.execute("ROLLBACK" if exc_type else "COMMIT")
+            return False
+
+    # ---------- escrita ----------
+    def add_many(self, items: Sequence[Dict[str, Any]], keys: Optional[Sequence[str]] = None,
+                 dedup_ttl: float = 0.0, now: Optional[float] = None) -> List[bool]:
+        """Grava os eventos numa transação; devolve, por item, True = novo, False = duplicado."""
+        now = time.time() if now is None else now
+        out: List[bool] = []
+        con = self._con()
+        with self._tx(con):
+            for i, d in enumerate(items):
+                if keys is not None and dedup_ttl > 0:
+                    cur = con.execute(
+                        "INSERT INTO dedup(k, t) VALUES(?, ?) ON CONFLICT(k) DO UPDATE "
+                        "SET t = excluded.t WHERE dedup.t < ?", (keys[i], now, now - dedup_ttl))
+                    if cur.rowcount == 0:
+                        out.append(False)
+                        continue
+                level = d["level"]
+                score = float(d["score"])
+                con.execute("INSERT INTO events(rt, ts, deviceId, userId, score, level, body) "
+                            "VALUES(?, ?, ?, ?, ?, ?, ?)",
+                            (now, int(d["ts"]), d["deviceId"], d["userId"], score, level,
+                             json.dumps(d, ensure_ascii=False)))
+                alto = level == "alto"
+                sql = _AGG_UPSERT.format(lv=level if level in LEVELS else "neutro")
+                for kind, key in (("user", d["userId"]), ("device", d["deviceId"])):
+                    con.execute(sql, (kind, key, int(d["ts"]), score,
+                                      now if alto else None, int(d["ts"]) if alto else None))
+                out.append(True)
+        return out
+
+    def add(self, d: Dict[str, Any]):
+        self.add_many([d])
+
+    # ---------- consultas (mesma semântica do EventStore) ----------
+    @staticmethod
+    def _where(userId, deviceId, level, since, until) -> Tuple[str, list]:
+        conds, args = [], []
+        for col, val in (("userId", userId), ("deviceId", deviceId), ("level", level)):
+            if val is not None:
+                conds.append(f"{col} = ?"); args.append(val)
+        if since is not None:
+            conds.append("ts >= ?"); args.append(int(since))
+        if until is not None:
+            conds.append("ts <= ?"); args.append(int(until))
+        return (" WHERE " + " AND ".join(conds)) if conds else "", args
+
+    def last(self, userId: Optional[str] = None, deviceId: Optional[str] = None,
+             level: Optional[str] = None, since: Optional[int] = None,
+             until: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        where, args = self._where(userId, deviceId, level, since, until)
+        row = self._con().execute(f"SELECT body FROM events{where} ORDER BY id DESC LIMIT 1",
+                                  args).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def query(self, userId: Optional[str] = None, deviceId: Optional[str] = None,
+              level: Optional[str] = None, since: Optional[int] = None,
+              until: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Últimos `limit` eventos que batem com os filtros, em ordem de chegada."""
+        if limit <= 0:
+            return []
+        where, args = self._where(userId, deviceId, level, since, until)
+        rows = self._con().execute(f"SELECT body FROM events{where} ORDER BY id DESC LIMIT ?",
+                                   args + [int(limit)]).fetchall()
+        return [json.loads(r[0]) for r in reversed(rows)]
+
+    def __len__(self) -> int:
+        return self._con().execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    # ---------- agregados (mesma saída do EventStats) ----------
+    def user(self, userId: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        return self._stats("user", "userId", userId, now)
+
+    def device(self, deviceId: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        return self._stats("device", "deviceId", deviceId, now)
+
+    def _stats(self, kind: str, col: str, key: str, now: Optional[float]) -> Optional[Dict[str, Any]]:
+        now = time.time() if now is None else now
+        con = self._con()
+        a = con.execute("SELECT total, leve, medio, alto, neutro, last_ts, last_score, "
+                        "last_alto_rt, last_alto_ts FROM agg WHERE kind = ? AND key = ?",
+                        (kind, key)).fetchone()
+        if a is None:
+            return None
+        windows = {}
+        for name, span in WINDOWS:
+            n, mean, mx = con.execute(
+                f"SELECT COUNT(*), AVG(score), MAX(score) FROM events WHERE {col} = ? AND rt > ?",
+                (key, now - span)).fetchone()
+            windows[name] = {"count": n, "mean": round(mean, 4) if n else None,
+                             "max": round(mx, 4) if n else None}
+        return {
+            "windows": windows,
+            "levels": dict(zip(LEVELS, a[1:5])),
+            "total": a[0],
+            "lastTs": a[5],
+            "lastScore": a[6],
+            "lastAltoTs": a[8],
+            "secondsSinceAlto": round(now - a[7], 1) if a[7] is not None else None,
+        }
+
+    # ---------- acompanhamento por id (SSE e líder do log) ----------
+    def max_id(self) -> int:
+        return self._con().execute("SELECT COALESCE(MAX(id), 0) FROM events").fetchone()[0]
+
+    def after(self, last_id: int, limit: int = 1000) -> List[Tuple[int, Dict[str, Any]]]:
+        rows = self._con().execute("SELECT id, body FROM events WHERE id > ? ORDER BY id LIMIT ?",
+                                   (int(last_id), int(limit))).fetchall()
+        return [(i, json.loads(b)) for i, b in rows]
+
+    def get_meta(self, k: str, default=None):
+        row = self._con().execute("SELECT v FROM meta WHERE k = ?", (k,)).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, k: str, v):
+        self._con().execute("INSERT INTO meta(k, v) VALUES(?, ?) ON CONFLICT(k) DO UPDATE "
+                            "SET v = excluded.v", (k, v))
+
+    def prune(self, retain_s: float, dedup_ttl: float, keep_after_id: int,
+              now: Optional[float] = None) -> int:
+        """Apaga eventos mais velhos que retain_s já gravados em disco (id <= keep_after_id)."""
+        now = time.time() if now is None else now
+        con = self._con()
+        with self._tx(con):
+            n = con.execute("DELETE FROM events WHERE rt < ? AND id <= ?",
+                            (now - retain_s, int(keep_after_id))).rowcount
+            con.execute("DELETE FROM dedup WHERE t < ?", (now - max(dedup_ttl, 0.0),))
+        return n
+
+
+class LeaderLock:
+    """Lock exclusivo entre processos (flock; msvcrt no Windows). acquire() não bloqueia."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = None
+
+    def acquire(self) -> bool:
+        if self._f is not None:
+            return True
+        f = open(self.path, "a+")
+        try:
+            try:
+                import fcntl
+                fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except ImportError:
+                import msvcrt
+                msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            f.close()
+            return False
+        self._f = f
+        return True
+
+    def release(self):
+        if self._f is not None:
+            self._f.close()   # fechar solta o lock
+            self._f = None
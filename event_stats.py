@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+event_stats.py — Agregados incrementais de stress por usuário e por dispositivo
+- Janelas móveis de 1 min, 15 min e 1 h: média (soma corrente) e máximo
+  (deque monotônica), atualizados a cada evento em O(1) amortizado
+- Contagem de eventos por level e tempo desde o último "alto"
+- Tempo das janelas = chegada do evento no servidor (replays com ts antigo
+  não caem fora da janela na hora)
+- No máx. max_keys usuários e max_keys dispositivos (LRU: o sem evento/consulta há
+  mais tempo sai); IDs rotativos não fazem a memória crescer sem limite
+"""
+
+import threading, time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Optional
+
+WINDOWS = (("1m", 60.0), ("15m", 900.0), ("1h", 3600.0))
+
+
+class RollingWindow:
+    """Média e máximo de (t, valor) nos últimos `span` segundos."""
+    __slots__ = ("span", "_q", "_max", "_sum")
+
+    def __init__(self, span: float):
+        self.span = span
+        self._q: deque = deque()
+        self._max: deque = deque()
+        self._sum = 0.0
+
+    def _evict(self, now: float):
+        cutoff = now - self.span
+        q, mx = self._q, self._max
+        while q and q[0][0] <= cutoff:
+            self._sum -= q.popleft()[1]
+        while mx and mx[0][0] <= cutoff:
+            mx.popleft()
+        if not q:
+            self._sum = 0.0  # zera o erro acumulado de ponto flutuante
+
+    def add(self, t: float, v: float):
+        self._evict(t)
+        self._q.append((t, v))
+        self._sum += v
+        mx = self._max
+        while mx and mx[-1][1] <= v:
+            mx.pop()
+        mx.append((t, v))
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        self._evict(now)
+        n = len(self._q)
+        return {
+            "count": n,
+            "mean": round(self._sum / n, 4) if n else None,
+            "max": round(self._max[0][1], 4) if self._max else None,
+        }
+
+
+class StreamStats:
+    """Agregados de um usuário ou de um dispositivo."""
+    __slots__ = ("windows", "levels", "total", "last_ts", "last_score",
+                 "last_alto_at", "last_alto_ts")
+
+    def __init__(self):
+        self.windows = {name: RollingWindow(span) for name, span in WINDOWS}
+        self.levels = {"leve": 0, "medio": 0, "alto": 0, "neutro": 0}
+        self.total = 0
+        self.last_ts: Optional[int] = None
+        self.last_score: Optional[float] = None
+        self.last_alto_at: Optional[float] = None
+        self.last_alto_ts: Optional[int] = None
+
+    def add(self, d: Dict[str, Any], now: float):
+        score = float(d["score"])
+        for w in self.windows.values():
+            w.add(now, score)
+        level = d["level"]
+        self.levels[level] = self.levels.get(level, 0) + 1
+        self.total += 1
+        self.last_ts = d["ts"]
+        self.last_score = score
+        if level == "alto":
+            self.last_alto_at = now
+            self.last_alto_ts = d["ts"]
+
+    def snapshot(self, now: float) -> Dict[str, Any]:
+        return {
+            "windows": {name: w.snapshot(now) for name, w in self.windows.items()},
+            "levels": dict(self.levels),
+            "total": self.total,
+            "lastTs": self.last_ts,
+            "lastScore": self.last_score,
+            "lastAltoTs": self.last_alto_ts,
+            "secondsSinceAlto": (round(now - self.last_alto_at, 1)
+                                 if self.last_alto_at is not None else None),
+        }
+
+
+class EventStats:
+    def __init__(self, max_keys: int = 10_000):
+        self.max_keys = max(1, int(max_keys))
+        self._lock = threading.Lock()
+        self._by_user: "OrderedDict[str, StreamStats]" = OrderedDict()
+        self._by_device: "OrderedDict[str, StreamStats]" = OrderedDict()
+        self.evicted_keys = 0
+
+    def add(self, d: Dict[str, Any], now: Optional[float] = None):
+        now = time.time() if now is None else now
+        with self._lock:
+            for index, key in ((self._by_user, d["userId"]), (self._by_device, d["deviceId"])):
+                st = index.get(key)
+                if st is None:
+                    st = index[key] = StreamStats()
+                    if len(index) > self.max_keys:
+                        index.popitem(last=False)
+                        self.evicted_keys += 1
+                else:
+                    index.move_to_end(key)
+                st.add(d, now)
+
+    def user(self, userId: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        return self._get(self._by_user, userId, now)
+
+    def device(self, deviceId: str, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        return self._get(self._by_device, deviceId, now)
+
+    def _get(self, index, key, now) -> Optional[Dict[str, Any]]:
+        now = time.time() if now is None else now
+        with self._lock:
+            st = index.get(key)
+            if st is None:
+                return None
+            index.move_to_end(key)
+            return st.snapshot(now)
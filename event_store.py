@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+"""
+event_store.py — Armazenamento em memória dos eventos da API, indexado e limitado
+- Ring buffer global (últimos N) + um ring por (userId, deviceId), por userId,
+  por deviceId e por level; append e descarte O(1) (deque com maxlen)
+- "Último evento" por usuário/dispositivo/par em O(1)
+- Índices por chave limitados a max_keys chaves cada (LRU: o usuário/dispositivo/par
+  sem evento há mais tempo sai com o ring e o "último evento"); IDs rotativos não
+  fazem a memória crescer sem limite
+- Consultas com filtro (userId, deviceId, level, since/until em epoch s) percorrem
+  só o menor índice aplicável, nunca a lista inteira
+- since: cada ring guarda, em paralelo, a marca d'água (maior ts visto até aquele
+  evento, não decrescente). A varredura do mais novo p/ o mais velho para quando a
+  marca fica abaixo de since — nada mais antigo pode bater. ts fora de ordem só
+  afrouxam a marca (correto, mas para mais tarde). until sozinho ainda percorre a
+  ponta nova do ring até achar ts <= until
+"""
+
+import threading
+from itertools import islice
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _Ring:
+    """deque de eventos + deque paralela com a marca d'água de ts (descartam juntas)."""
+    __slots__ = ("items", "wm", "top")
+
+    def __init__(self, maxlen: int):
+        self.items: deque = deque(maxlen=maxlen)
+        self.wm: deque = deque(maxlen=maxlen)
+        self.top = float("-inf")
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def append(self, d: Dict[str, Any]):
+        ts = d["ts"]
+        if ts > self.top:
+            self.top = ts
+        self.items.append(d)
+        self.wm.append(self.top)
+
+    def newest_first(self, since: Optional[int]):
+        """Do mais novo ao mais velho; com since, para na 1ª marca d'água < since."""
+        if since is None:
+            yield from reversed(self.items)
+            return
+        for d, wm in zip(reversed(self.items), reversed(self.wm)):
+            if wm < since:
+                return
+            yield d
+
+
+_EMPTY = _Ring(0)
+
+
+class EventStore:
+    def __init__(self, maxlen: int = 2000, per_key_maxlen: int = 500, max_keys: int = 10_000):
+        self.maxlen = maxlen
+        self.per_key_maxlen = per_key_maxlen
+        self.max_keys = max(1, int(max_keys))
+        self._lock = threading.Lock()
+        self._all = _Ring(maxlen)
+        # OrderedDict = ordem de uso (LRU) p/ descartar a chave mais antiga
+        self._by_pair: "OrderedDict[Tuple[str, str], _Ring]" = OrderedDict()
+        self._by_user: "OrderedDict[str, _Ring]" = OrderedDict()
+        self._by_device: "OrderedDict[str, _Ring]" = OrderedDict()
+        self._by_level: Dict[str, _Ring] = {}
+        self._last_pair: Dict[Tuple[str, str], dict] = {}
+        self._last_user: Dict[str, dict] = {}
+        self._last_device: Dict[str, dict] = {}
+        self.evicted_keys = 0
+
+    def __len__(self) -> int:
+        return len(self._all)
+
+    def _ring(self, index: dict, key) -> _Ring:
+        ring = index.get(key)
+        if ring is None:
+            ring = index[key] = _Ring(self.per_key_maxlen)
+        return ring
+
+    def _add_keyed(self, index: OrderedDict, last: dict, key, d: Dict[str, Any]):
+        self._ring(index, key).append(d)
+        index.move_to_end(key)
+        last[key] = d
+        if len(index) > self.max_keys:
+            old, _ = index.popitem(last=False)
+            del last[old]
+            self.evicted_keys += 1
+
+    def add(self, d: Dict[str, Any]):
+        user, device = d["userId"], d["deviceId"]
+        with self._lock:
+            self._all.append(d)
+            self._add_keyed(self._by_pair, self._last_pair, (user, device), d)
+            self._add_keyed(self._by_user, self._last_user, user, d)
+            self._add_keyed(self._by_device, self._last_device, device, d)
+            self._ring(self._by_level, d["level"]).append(d)
+
+    def add_many(self, items: List[Dict[str, Any]]):
+        for d in items:
+            self.add(d)
+
+    # ---------- consultas ----------
+    def _candidates(self, userId, deviceId, level) -> _Ring:
+        """Escolhe o menor índice que cobre os filtros informados."""
+        if userId is not None and deviceId is not None:
+            return self._by_pair.get((userId, deviceId), _EMPTY)
+        options = []
+        if userId is not None:
+            options.append(self._by_user.get(userId, _EMPTY))
+        if deviceId is not None:
+            options.append(self._by_device.get(deviceId, _EMPTY))
+        if level is not None:
+            options.append(self._by_level.get(level, _EMPTY))
+        if not options:
+            return self._all
+        return min(options, key=len)
+
+    @staticmethod
+    def _match(d, userId, deviceId, level, since, until) -> bool:
+        return ((userId is None or d["userId"] == userId)
+                and (deviceId is None or d["deviceId"] == deviceId)
+                and (level is None or d["level"] == level)
+                and (since is None or d["ts"] >= since)
+                and (until is None or d["ts"] <= until))
+
+    def last(self, userId: Optional[str] = None, deviceId: Optional[str] = None,
+             level: Optional[str] = None, since: Optional[int] = None,
+             until: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            if level is None and since is None and until is None:
+                # caminho O(1)
+                if userId is not None and deviceId is not None:
+                    return self._last_pair.get((userId, deviceId))
+                if userId is not None:
+                    return self._last_user.get(userId)
+                if deviceId is not None:
+                    return self._last_device.get(deviceId)
+                return self._all.items[-1] if self._all else None
+            ring = self._candidates(userId, deviceId, level)
+            for d in ring.newest_first(since):
+                if self._match(d, userId, deviceId, level, since, until):
+                    return d
+            return None
+
+    def query(self, userId: Optional[str] = None, deviceId: Optional[str] = None,
+              level: Optional[str] = None, since: Optional[int] = None,
+              until: Optional[int] = None, limit: int = 100) -> List[Dict[str, Any]]:
+        """Últimos `limit` eventos que batem com os filtros, em ordem de chegada."""
+        if limit <= 0:
+            return []
+        with self._lock:
+            ring = self._candidates(userId, deviceId, level)
+            if userId is None and deviceId is None and level is None \
+                    and since is None and until is None:
+                out = list(islice(reversed(ring.items), limit))
+                out.reverse()
+                return out
+            out = []
+            for d in ring.newest_first(since):
+                if self._match(d, userId, deviceId, level, since, until):
+                    out.append(d)
+                    if len(out) >= limit:
+                        break
+            out.reverse()
+            return out
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+event_stream.py — Fan-out de eventos para clientes conectados (Server-Sent Events)
+- Cada assinante tem uma fila asyncio limitada (por conexão) e um filtro de userId
+  (None = todos os usuários, p/ dashboards)
+- publish_many() é chamado pelos handlers síncronos (threadpool do FastAPI): o
+  evento é serializado uma vez e entregue ao loop via call_soon_threadsafe
+- Consumidor lento (fila cheia) é despejado: recebe "event: evicted" e a
+  conexão é encerrada, para não segurar memória nem atrasar os demais
+"""
+
+import asyncio, json, threading
+from typing import Any, Dict, List, Optional, Set
+
+EVICT = object()  # sentinela: consumidor lento
+
+
+class Subscriber:
+    __slots__ = ("userId", "loop", "queue", "sent", "evicted")
+
+    def __init__(self, userId: Optional[str], loop: asyncio.AbstractEventLoop, maxsize: int):
+        self.userId = userId
+        self.loop = loop
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.sent = 0
+        self.evicted = False
+
+    def offer(self, items: List[str]):
+        """Roda no loop do assinante."""
+        if self.evicted:
+            return
+        for data in items:
+            try:
+                self.queue.put_nowait(data)
+            except asyncio.QueueFull:
+                self.evicted = True
+                # libera espaço para o aviso de despejo e acorda o consumidor
+                while not self.queue.empty():
+                    self.queue.get_nowait()
+                self.queue.put_nowait(EVICT)
+                return
+
+
+class EventBroker:
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._by_user: Dict[Optional[str], Set[Subscriber]] = {}
+        self.evicted = 0
+        self.published = 0
+
+    def subscribe(self, userId: Optional[str] = None,
+                  maxsize: Optional[int] = None) -> Subscriber:
+        sub = Subscriber(userId, asyncio.get_running_loop(), maxsize or self.queue_size)
+        with self._lock:
+            self._by_user.setdefault(userId, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        with self._lock:
+            subs = self._by_user.get(sub.userId)
+            if subs is not None:
+                subs.discard(sub)
+                if not subs:
+                    del self._by_user[sub.userId]
+            if sub.evicted:
+                self.evicted += 1
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._by_user.values())
+
+    def publish_many(self, events: List[Dict[str, Any]]):
+        """Entrega eventos aos assinantes do userId correspondente e aos de todos (None)."""
+        if not events or not self._by_user:
+            return
+        per_user: Dict[str, List[str]] = {}
+        for d in events:
+            per_user.setdefault(d["userId"], []).append(
+                "data: " + json.dumps(d, ensure_ascii=False) + "\n\n")
+        with self._lock:
+            targets = []
+            for userId, items in per_user.items():
+                for sub in self._by_user.get(userId, ()):
+                    targets.append((sub, items))
+            everyone = self._by_user.get(None, ())
+            if everyone:
+                all_items = [x for items in per_user.values() for x in items]
+                targets.extend((sub, all_items) for sub in everyone)
+        self.published += len(events)
+        for sub, items in targets:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, items)
+            except RuntimeError:
+                pass  # loop já encerrado
+
+    async def stream(self, sub: Subscriber, keepalive: float = 15.0):
+        """Gerador SSE para StreamingResponse; sempre remove o assinante no fim."""
+        try:
+            yield "retry: 3000\n: conectado\n\n"
+            while True:
+                try:
+                    data = await asyncio.wait_for(sub.queue.get(), timeout=keepalive)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if data is EVICT:
+                    yield "event: evicted\ndata: {}\n\n"
+                    break
+                sub.sent += 1
+                yield data
+        finally:
+            self.unsubscribe(sub)
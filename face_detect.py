@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+"""
+face_detect.py — Localização de rosto com Haar Cascade + rastreamento barato entre detecções
+- TemplateTracker: segue o rosto por template matching (TM_CCOEFF_NORMED) numa
+  janela de busca ao redor do último face_rect
+- FaceLocator: roda o detectMultiScale a cada N frames (ou quando a confiança do
+  tracker cai abaixo de min_conf) e rastreia nos frames intermediários
+- Estratégia "adaptive": procura primeiro numa janela ao redor do rosto anterior
+  (minSize/maxSize derivados do último tamanho), depois num nível reduzido da
+  pirâmide com refinamento em resolução cheia; varredura completa só se errar
+  (e a cada full_every detecções, para achar rostos novos)
+- load_face_cascade(): XML lido uma única vez por processo (cache)
+- Estatísticas: taxa de chamadas ao detector e latência por frame (p50/p95)
+
+Dependências: opencv-python, numpy
+"""
+
+import time
+from collections import deque
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+Rect = Tuple[int, int, int, int]
+
+
+@lru_cache(maxsize=4)
+def load_face_cascade(name: str = "haarcascade_frontalface_default.xml") -> "cv2.CascadeClassifier":
+    """Carrega (parse do XML) uma vez por processo; chamadas seguintes devolvem o mesmo objeto.
+    O classificador não é thread-safe: um FaceLocator por thread de detecção."""
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + name)
+    if cascade.empty():
+        raise RuntimeError(f"Haar Cascade não carregou: {name}")
+    return cascade
+
+
+class TemplateTracker:
+    """Rastreia um retângulo por correlação normalizada numa janela de busca."""
+
+    def __init__(self, search_pad: float = 0.5):
+        self.search_pad = search_pad
+        self.template: Optional[np.ndarray] = None
+        self.rect: Optional[Rect] = None
+
+    def reset(self, gray: np.ndarray, rect: Rect):
+        x, y, w, h = rect
+        self.template = gray[y:y+h, x:x+w].copy()
+        self.rect = (int(x), int(y), int(w), int(h))
+
+    def clear(self):
+        self.template = None
+        self.rect = None
+
+    def update(self, gray: np.ndarray) -> Tuple[Optional[Rect], float]:
+        """Retorna (novo_rect, confiança 0..1). (None, 0.0) se não há o que rastrear."""
+        if self.template is None or self.rect is None:
+            return None, 0.0
+        x, y, w, h = self.rect
+        H, W = gray.shape[:2]
+        px, py = int(w * self.search_pad), int(h * self.search_pad)
+        x0, y0 = max(0, x - px), max(0, y - py)
+        x1, y1 = min(W, x + w + px), min(H, y + h + py)
+        window = gray[y0:y1, x0:x1]
+        if window.shape[0] < h or window.shape[1] < w:
+            return None, 0.0
+        res = cv2.matchTemplate(window, self.template, cv2.TM_CCOEFF_NORMED)
+        _, conf, _, loc = cv2.minMaxLoc(res)
+        self.rect = (x0 + loc[0], y0 + loc[1], w, h)
+        return self.rect, float(max(0.0, conf))
+
+
+class FaceLocator:
+    """
+    detect_every=1 → detecta em todo frame (comportamento original).
+    detect_every=N → detecta a cada N frames; entre elas, usa o TemplateTracker.
+    """
+
+    def __init__(self, cascade, *, detect_every: int = 1, min_conf: float = 0.6,
+                 search_pad: float = 0.5, scale_factor: float = 1.1,
+                 min_neighbors: int = 5, min_size: Tuple[int, int] = (60, 60),
+                 strategy: str = "full", roi_pad: float = 0.5, size_tol: float = 0.35,
+                 pyramid_scale: float = 0.5, full_every: int = 15):
+        if strategy not in ("full", "adaptive"):
+            raise ValueError(f"strategy inválida: {strategy!r} (use 'full' ou 'adaptive')")
+        self.cascade = cascade
+        self.strategy = strategy
+        self.roi_pad = roi_pad
+        self.size_tol = size_tol
+        self.pyramid_scale = pyramid_scale
+        self.full_every = max(1, int(full_every))
+        self._last_face: Optional[Rect] = None
+        self._since_full = 0
+        self.roi_hits = 0
+        self.pyramid_hits = 0
+        self.full_scans = 0
+        self.detect_every = max(1, int(detect_every))
+        self.min_conf = min_conf
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_size = min_size
+        self.tracker = TemplateTracker(search_pad)
+        self._since_detect = 0
+        # estatísticas
+        self.frames = 0
+        self.detector_calls = 0
+        self.tracked_frames = 0
+        self.track_failures = 0
+        self.last_conf = 0.0
+        self._lat_ms: deque = deque(maxlen=1000)
+
+    def reset(self, min_size: Optional[Tuple[int, int]] = None):
+        """Esquece o rosto anterior (ex.: a escala da imagem de detecção mudou)."""
+        self.tracker.clear()
+        self._last_face = None
+        self._since_detect = 0
+        self._since_full = 0
+        if min_size is not None:
+            self.min_size = min_size
+
+    def _cascade(self, gray: np.ndarray, min_size, max_size=None) -> List[Rect]:
+        kw = {"maxSize": max_size} if max_size else {}
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=self.scale_factor,
+                                              minNeighbors=self.min_neighbors,
+                                              minSize=min_size, **kw)
+        return [tuple(int(v) for v in r) for r in faces]
+
+    def _in_window(self, gray: np.ndarray, rect: Rect, pad: float) -> List[Rect]:
+        """Cascade só numa janela ao redor de `rect`, com tamanho restrito ao do rosto."""
+        x, y, w, h = rect
+        H, W = gray.shape[:2]
+        px, py = int(w * pad), int(h * pad)
+        x0, y0 = max(0, x - px), max(0, y - py)
+        x1, y1 = min(W, x + w + px), min(H, y + h + py)
+        side = max(w, h)
+        lo = max(self.min_size[0], int(side * (1.0 - self.size_tol)))
+        hi = int(side * (1.0 + self.size_tol))
+        if x1 - x0 < lo or y1 - y0 < lo:
+            return []
+        found = self._cascade(gray[y0:y1, x0:x1], (lo, lo), (hi, hi))
+        return [(fx + x0, fy + y0, fw, fh) for fx, fy, fw, fh in found]
+
+    def _detect_adaptive(self, gray: np.ndarray) -> List[Rect]:
+        # 1) janela ao redor do rosto anterior
+        if self._last_face is not None and self._since_full < self.full_every:
+            faces = self._in_window(gray, self._last_face, self.roi_pad)
+            if faces:
+                self.roi_hits += 1
+                self._since_full += 1
+                return faces
+        # 2) pirâmide: procura em resolução reduzida, refina em resolução cheia
+        s = self.pyramid_scale
+        if 0.0 < s < 1.0 and self._since_full < self.full_every:
+            small = cv2.resize(gray, None, fx=s, fy=s, interpolation=cv2.INTER_AREA)
+            mn = max(20, int(self.min_size[0] * s))
+            faces = []
+            for fx, fy, fw, fh in self._cascade(small, (mn, mn)):
+                cand = (int(fx / s), int(fy / s), int(fw / s), int(fh / s))
+                faces.extend(self._in_window(gray, cand, 0.25))
+            if faces:
+                self.pyramid_hits += 1
+                self._since_full += 1
+                return faces
+        # 3) varredura completa
+        self.full_scans += 1
+        self._since_full = 0
+        return self._cascade(gray, self.min_size)
+
+    def detect(self, gray: np.ndarray) -> List[Rect]:
+        self.detector_calls += 1
+        if self.strategy == "adaptive":
+            faces = self._detect_adaptive(gray)
+        else:
+            faces = self._cascade(gray, self.min_size)
+        faces = sorted(faces, key=lambda r: r[2]*r[3], reverse=True)
+        self._last_face = faces[0] if faces else None
+        return faces
+
+    def locate(self, gray: np.ndarray) -> List[Rect]:
+        """Rostos do frame (maior primeiro). Em frames rastreados, só o rosto principal."""
+        t = time.perf_counter()
+        self.frames += 1
+        faces: Optional[List[Rect]] = None
+        if self.detect_every > 1 and self._since_detect < self.detect_every - 1 \
+                and self.tracker.rect is not None:
+            rect, conf = self.tracker.update(gray)
+            self.last_conf = conf
+            if rect is not None and conf >= self.min_conf:
+                faces = [rect]
+                self._since_detect += 1
+                self.tracked_frames += 1
+            else:
+                self.track_failures += 1
+        if faces is None:
+            faces = self.detect(gray)
+            self._since_detect = 0
+            if faces and self.detect_every > 1:
+                self.tracker.reset(gray, faces[0])
+                self.last_conf = 1.0
+            elif not faces:
+                self.tracker.clear()
+        self._lat_ms.append((time.perf_counter() - t) * 1000.0)
+        return faces
+
+    def stats(self) -> Dict[str, float]:
+        lat = sorted(self._lat_ms)
+        p = lambda q: lat[min(len(lat)-1, int(q * (len(lat)-1)))] if lat else 0.0
+        return {
+            "frames": self.frames,
+            "detector_calls": self.detector_calls,
+            "detector_rate": round(self.detector_calls / self.frames, 3) if self.frames else 0.0,
+            "tracked_frames": self.tracked_frames,
+            "track_failures": self.track_failures,
+            "roi_hits": self.roi_hits,
+            "pyramid_hits": self.pyramid_hits,
+            "full_scans": self.full_scans,
+            "locate_p50_ms": round(p(0.50), 3),
+            "locate_p95_ms": round(p(0.95), 3),
+        }
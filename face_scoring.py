@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+face_scoring.py — Score de stress a partir do ROI do rosto (sem landmarks)
+- SimpleFaceHeuristics: jitter (movimento no ROI entre frames) + proxy de
+  abertura da boca (brilho da metade inferior vs superior)
+- FixedSizeFaceHeuristics: mesmo score, mas reamostra o ROI para um buffer fixo
+  pré-alocado (sem cópias por frame; jitter não zera quando a caixa muda 1 px) e
+  oferece score_stack() para pontuar uma pilha de ROIs de uma vez (modo offline)
+  e score_pairs() para vários rostos do mesmo frame (face_tracks.py)
+- Compartilhado por main.py, edge_daemon.py e demais modos
+
+Dependências: opencv-python, numpy
+"""
+
+from typing import Dict, Optional, Tuple
+import cv2
+import numpy as np
+
+
+# ==================== Heurísticas simples (sem landmarks) ====================
+class SimpleFaceHeuristics:
+    def __init__(self):
+        self.prev_roi = None
+
+    @staticmethod
+    def _norm01(x):
+        return float(max(0.0, min(1.0, x)))
+
+    def compute(self, frame_bgr, face_rect) -> Tuple[float, Dict[str,float]]:
+        x,y,w,h = face_rect
+        roi = frame_bgr[y:y+h, x:x+w]
+        if roi.size == 0:
+            return 0.0, {"jitter":0.0, "mouth_open":0.0, "eye_open":0.0,
+                         "eye_tension":0.0, "brow_tension":0.0, "mouth_press":0.0,
+                         "mouth_gasp":0.0, "brow_eye_min":0.0}
+
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+
+        # --- JITTER: movimento médio no ROI (normalizado)
+        jitter = 0.0
+        if self.prev_roi is not None and self.prev_roi.shape == gray.shape:
+            diff = cv2.absdiff(gray, self.prev_roi)
+            jitter = float(diff.mean())/255.0
+        self.prev_roi = gray.copy()
+
+        # --- "Abertura da boca" proxy: média brilho metade inferior vs superior
+        h2 = gray.shape[0]//2
+        top = gray[:h2, :]
+        bot = gray[h2:, :]
+        diff_mean = max(0.0, float(bot.mean() - top.mean())) / 255.0
+        mouth_open = self._norm01(diff_mean * 2.0)  # ganho
+
+        # score final simples
+        score = self._norm01(0.55*jitter + 0.45*mouth_open)
+
+        parts = {
+            "jitter": float(jitter),
+            "mouth_open": float(mouth_open),
+            "eye_open": 0.0,
+            "eye_tension": 0.0,
+            "brow_tension": 0.0,
+            "mouth_press": 0.0,
+            "mouth_gasp": 0.0,
+            "brow_eye_min": 0.0
+        }
+        return score, parts
+
+
+# ==================== Núcleo de tamanho fixo (sem alocação por frame) ====================
+class FixedSizeFaceHeuristics:
+    """
+    Mesma heurística (0.55*jitter + 0.45*mouth_open), com o ROI reamostrado para
+    size x size. Buffers (BGR, dois cinzas alternados e o diff) são alocados uma
+    vez; o frame anterior é só o outro buffer, sem gray.copy().
+    """
+
+    def __init__(self, size: int = 64, interpolation: int = cv2.INTER_LINEAR):
+        # INTER_LINEAR: ~10x mais barato que INTER_AREA p/ ROIs de 150-300 px; as
+        # médias usadas no score quase não mudam
+        self.interpolation = interpolation
+        self.size = s = int(size) + (int(size) % 2)  # par: metades iguais
+        self._bgr = np.empty((s, s, 3), np.uint8)
+        self._gray = (np.empty((s, s), np.uint8), np.empty((s, s), np.uint8))
+        self._diff = np.empty((s, s), np.uint8)
+        self._cur = 0
+        self._has_prev = False
+        self._h2 = s // 2
+
+    def reset(self):
+        self._has_prev = False
+
+    def resample(self, frame_bgr, face_rect, out: np.ndarray) -> bool:
+        """Reamostra o ROI (em cinza) para `out` (size x size, uint8). False se vazio."""
+        x, y, w, h = face_rect
+        roi = frame_bgr[y:y+h, x:x+w]
+        if roi.size == 0:
+            return False
+        cv2.resize(roi, (self.size, self.size), dst=self._bgr, interpolation=self.interpolation)
+        cv2.cvtColor(self._bgr, cv2.COLOR_BGR2GRAY, dst=out)
+        return True
+
+    def compute(self, frame_bgr, face_rect) -> Tuple[float, Dict[str, float]]:
+        cur = self._gray[self._cur]
+        if not self.resample(frame_bgr, face_rect, cur):
+            return 0.0, dict(_ZERO_PARTS)
+
+        jitter = 0.0
+        if self._has_prev:
+            cv2.absdiff(cur, self._gray[1 - self._cur], dst=self._diff)
+            jitter = cv2.mean(self._diff)[0] / 255.0
+        self._has_prev = True
+        self._cur = 1 - self._cur  # o atual vira o "anterior" do próximo frame
+
+        top = cv2.mean(cur[:self._h2])[0]
+        bot = cv2.mean(cur[self._h2:])[0]
+        mouth_open = min(1.0, max(0.0, (bot - top) / 255.0) * 2.0)
+        score = min(1.0, max(0.0, 0.55*jitter + 0.45*mouth_open))
+
+        parts = dict(_ZERO_PARTS)
+        parts["jitter"] = jitter
+        parts["mouth_open"] = mouth_open
+        return score, parts
+
+    def score_stack(self, stack: np.ndarray,
+                    prev: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Pontua N ROIs consecutivos já reamostrados (stack: N x size x size, uint8) numa
+        chamada vetorizada. `prev` é o ROI anterior ao primeiro (None = sem jitter no 1º).
+        Retorna (score, jitter, mouth_open), cada um com shape (N,).
+        """
+        n = stack.shape[0]
+        flat = stack.reshape(n, -1)
+        jitter = np.zeros(n, np.float64)
+        if n > 1:
+            d = np.abs(stack[1:].astype(np.int16) - stack[:-1]).reshape(n-1, -1)
+            jitter[1:] = d.mean(axis=1) / 255.0
+        if prev is not None:
+            jitter[0] = np.abs(stack[0].astype(np.int16) - prev).mean() / 255.0
+        mouth = self._mouth_open(flat)
+        score = np.clip(0.55*jitter + 0.45*mouth, 0.0, 1.0)
+        return score, jitter, mouth
+
+    def score_pairs(self, cur: np.ndarray, prev: np.ndarray,
+                    has_prev: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Pontua N rostos diferentes do mesmo frame numa chamada: cur[i] contra o ROI
+        anterior do mesmo rosto, prev[i] (N x size x size). has_prev[i] False = sem
+        jitter (rosto novo). Retorna (score, jitter, mouth_open), cada um (N,).
+        """
+        n = cur.shape[0]
+        flat = cur.reshape(n, -1)
+        d = np.abs(flat.astype(np.int16) - prev.reshape(n, -1))
+        jitter = np.where(has_prev, d.mean(axis=1) / 255.0, 0.0)
+        mouth = self._mouth_open(flat)
+        score = np.clip(0.55*jitter + 0.45*mouth, 0.0, 1.0)
+        return score, jitter, mouth
+
+    def _mouth_open(self, flat: np.ndarray) -> np.ndarray:
+        half = self._h2 * self.size
+        top = flat[:, :half].mean(axis=1)
+        bot = flat[:, half:].mean(axis=1)
+        return np.clip(np.maximum(0.0, (bot - top) / 255.0) * 2.0, 0.0, 1.0)
+
+
+_ZERO_PARTS = {"jitter": 0.0, "mouth_open": 0.0, "eye_open": 0.0, "eye_tension": 0.0,
+               "brow_tension": 0.0, "mouth_press": 0.0, "mouth_gasp": 0.0, "brow_eye_min": 0.0}
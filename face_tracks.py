@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+face_tracks.py — Vários rostos por frame, cada um com identidade e estado próprios
+- FaceTracker: associa as caixas do frame às trilhas existentes por IoU (guloso,
+  matriz IoU vetorizada); sem sobreposição suficiente, tenta pela distância dos
+  centróides (relativa ao tamanho do rosto). Trilha sem caixa por max_misses
+  frames é encerrada; caixa sem trilha abre uma nova (trackId crescente)
+- Cada trilha tem seu TrainingRouter (janela de suavização, histerese, cooldown)
+  e um slot no pool de ROIs anteriores — o jitter é sempre do mesmo rosto
+- MultiFaceScorer: reamostra todos os rostos do frame para uma pilha N x S x S e
+  pontua a pilha inteira numa chamada (FixedSizeFaceHeuristics.score_pairs);
+  o custo por rosto extra é só o resize do ROI
+
+Dependências: opencv-python, numpy
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from face_scoring import FixedSizeFaceHeuristics, _ZERO_PARTS
+from training_router import RouteDecision, TrainingRouter
+
+Rect = Tuple[int, int, int, int]
+
+
+def iou_matrix(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU entre caixas (x, y, w, h): a (N,4) x b (M,4) → (N, M)."""
+    ax0, ay0 = a[:, 0:1], a[:, 1:2]
+    ax1, ay1 = ax0 + a[:, 2:3], ay0 + a[:, 3:4]
+    bx0, by0 = b[:, 0], b[:, 1]
+    bx1, by1 = bx0 + b[:, 2], by0 + b[:, 3]
+    iw = np.clip(np.minimum(ax1, bx1) - np.maximum(ax0, bx0), 0, None)
+    ih = np.clip(np.minimum(ay1, by1) - np.maximum(ay0, by0), 0, None)
+    inter = iw * ih
+    union = (a[:, 2:3] * a[:, 3:4]) + (b[:, 2] * b[:, 3]) - inter
+    return inter / np.maximum(union, 1e-6)
+
+
+class FaceTrack:
+    __slots__ = ("id", "rect", "router", "slot", "has_prev", "misses", "age",
+                 "decision", "parts")
+
+    def __init__(self, track_id: int, rect: Rect, router: TrainingRouter, slot: int):
+        self.id = track_id
+        self.rect = rect
+        self.router = router
+        self.slot = slot
+        self.has_prev = False
+        self.misses = 0
+        self.age = 0
+        self.decision: Optional[RouteDecision] = None
+        self.parts: Optional[Dict[str, float]] = None
+
+
+class FaceTracker:
+    def __init__(self, make_router: Callable[[], TrainingRouter], *, iou_min: float = 0.3,
+                 centroid_max: float = 0.6, max_misses: int = 10, max_tracks: int = 32):
+        self.make_router = make_router
+        self.iou_min = iou_min
+        self.centroid_max = centroid_max
+        self.max_misses = max(0, int(max_misses))
+        self.max_tracks = max(1, int(max_tracks))
+        self.tracks: List[FaceTrack] = []
+        self._next_id = 1
+        self._free_slots = list(range(self.max_tracks - 1, -1, -1))
+        self.created = 0
+        self.ended = 0
+        self.ended_ids: List[int] = []   # trilhas encerradas no último update()
+
+    def update(self, rects: List[Rect]) -> List[FaceTrack]:
+        """Associa as caixas do frame; devolve as trilhas vistas neste frame."""
+        rects = [tuple(int(v) for v in r) for r in rects]
+        matched: Dict[int, int] = {}          # índice da caixa → índice da trilha
+        if self.tracks and rects:
+            tb = np.array([t.rect for t in self.tracks], np.float64)
+            rb = np.array(rects, np.float64)
+            iou = iou_matrix(rb, tb)
+            # centróide: distância / lado médio (1.0 = um rosto de distância)
+            rc = rb[:, :2] + rb[:, 2:] / 2
+            tc = tb[:, :2] + tb[:, 2:] / 2
+            side = (rb[:, 2:3] + rb[:, 3:4] + tb[:, 2] + tb[:, 3]) / 4
+            dist = np.linalg.norm(rc[:, None, :] - tc[None, :, :], axis=2) / np.maximum(side, 1.0)
+            # custo único: IoU primeiro; centróide só desempata abaixo do iou_min
+            cost = np.where(iou >= self.iou_min, 2.0 - iou,
+                            np.where(dist <= self.centroid_max, 2.0 + dist, np.inf))
+            used_t = set()
+            for flat in np.argsort(cost, axis=None):
+                ri, ti = divmod(int(flat), len(self.tracks))
+                if not np.isfinite(cost[ri, ti]):
+                    break
+                if ri in matched or ti in used_t:
+                    continue
+                matched[ri] = ti
+                used_t.add(ti)
+
+        seen: List[FaceTrack] = []
+        for ri, r in enumerate(rects):
+            ti = matched.get(ri)
+            if ti is not None:
+                tr = self.tracks[ti]
+                tr.rect = r
+                tr.misses = 0
+            else:
+                if not self._free_slots:
+                    continue  # limite de trilhas simultâneas
+                tr = FaceTrack(self._next_id, r, self.make_router(), self._free_slots.pop())
+                self._next_id += 1
+                self.created += 1
+                self.tracks.append(tr)
+            tr.age += 1
+            seen.append(tr)
+
+        seen_ids = {tr.id for tr in seen}
+        self.ended_ids = []
+        alive = []
+        for tr in self.tracks:
+            if tr.id in seen_ids:
+                alive.append(tr)
+                continue
+            tr.misses += 1
+            if tr.misses > self.max_misses:
+                self._free_slots.append(tr.slot)
+                self.ended += 1
+                self.ended_ids.append(tr.id)
+            else:
+                alive.append(tr)
+        self.tracks = alive
+        return seen
+
+
+class MultiFaceScorer:
+    """Pontua todas as trilhas vistas no frame de uma vez (pilha N x S x S)."""
+
+    def __init__(self, size: int = 64, max_tracks: int = 32):
+        self.heur = FixedSizeFaceHeuristics(size)
+        s = self.heur.size
+        self._stack = np.empty((max_tracks, s, s), np.uint8)
+        self._pool = np.zeros((max_tracks, s, s), np.uint8)   # ROI anterior por slot
+
+    def score(self, frame_bgr, tracks: List[FaceTrack]) -> List[FaceTrack]:
+        ok_tracks = []
+        for tr in tracks:
+            if self.heur.resample(frame_bgr, tr.rect, self._stack[len(ok_tracks)]):
+                ok_tracks.append(tr)
+        n = len(ok_tracks)
+        if n == 0:
+            return ok_tracks
+        slots = np.fromiter((t.slot for t in ok_tracks), np.intp, n)
+        has_prev = np.fromiter((t.has_prev for t in ok_tracks), bool, n)
+        cur = self._stack[:n]
+        score, jitter, mouth = self.heur.score_pairs(cur, self._pool[slots], has_prev)
+        self._pool[slots] = cur
+        for i, tr in enumerate(ok_tracks):
+            tr.has_prev = True
+            parts = dict(_ZERO_PARTS)
+            parts["jitter"] = float(jitter[i])
+            parts["mouth_open"] = float(mouth[i])
+            tr.parts = parts
+            tr.decision = tr.router.update(float(score[i]))
+        return ok_tracks
@@ -8,25 +8,53 @@ main_final.py — Versão sem MediaPipe (compatível com Python 3.13)
     * mouth_open_proxy (média da metade inferior do rosto vs superior)
 - Exibe painel lateral com quebra de linha
 - Gera CSV opcional
-- Dispara "rota" (leve/médio/alto) via TrainingRouter
+- Dispara "rota" (leve/médio/alto) via TrainingRouter (suavização O(1),
+  histerese e cooldown por nível)
 - Integração REST/FastAPI (#3): POST /events (deviceId, userId, score, level, route, ts)
-- (Opcional) salva vídeo processado com --out-video quando não há GUI
+  via EventPublisher (lotes em segundo plano, keep-alive, retry e spool em disco);
+  SendPolicy decide o envio: troca de nível, variação de score ou heartbeat
+- (Opcional) salva vídeo processado com --out-video quando não há GUI, numa
+  thread de encode própria, no FPS da fonte; --out-segments grava só os trechos
+  ao redor de alertas (pre/post-roll)
+- Pipeline em estágios: captura (thread) → detecção/score (thread) → saída,
+  com filas limitadas (--capture-depth/--output-depth) e política drop/block
+- Modo detecta-e-rastreia (--detect-every N): Haar a cada N frames, template
+  matching no meio (redetecta se a confiança cair abaixo de --track-min-conf)
+- Detecção adaptativa (--detect-strategy adaptive): janela do rosto anterior,
+  pirâmide reduzida + refinamento, e só então o frame inteiro
+- --multi-face: todos os rostos do frame, cada um com trackId e TrainingRouter
+  próprios (face_tracks.py); um evento por trilha, com trackId
+- --profile: tempo por estágio (p50/p95/p99) e FPS, resumo [PROF] periódico e
+  /metrics no formato Prometheus (--profile-port)
+- --target-fps: agendador adaptativo (adaptive.py) mede o tempo por frame e a
+  latência e degrada em degraus (detecção mais espaçada, score a cada N frames,
+  detecção em largura menor) até segurar o alvo; volta quando sobra folga.
+  O nível ativo aparece no HUD, no [ADAPT] e em /metrics
+- Cold start: módulos opcionais (vídeo, multi-face, requests) só são importados
+  quando usados, o Haar é carregado em paralelo com a abertura da câmera e
+  --startup-profile imprime [BOOT] com o tempo de cada componente até o 1º frame
 
 Dependências: opencv-python, numpy, (opcional) requests
 """
 
-import argparse, time, csv, os, sys, json
-from collections import deque
-from typing import Dict, Any, Optional, Tuple
-import cv2
-import numpy as np
+import argparse, time, csv, os, sys, threading
+from typing import Optional
 
-try:
-    import requests  # recomendado para REST
-except Exception:
-    requests = None
+from profiler import NullProfiler, StageProfiler, StartupProfile
 
-from training_router import TrainingRouter  # seu router já existente
+BOOT = StartupProfile()   # --startup-profile
+with BOOT.step("import cv2"):
+    import cv2
+with BOOT.step("import módulos"):
+    from training_router import TrainingRouter
+    from pipeline import FrameRing, StageThread, start_capture
+    from event_publisher import EventPublisher
+    from face_detect import FaceLocator, load_face_cascade
+    from face_scoring import FixedSizeFaceHeuristics, SimpleFaceHeuristics
+    from overlay import PanelSprite, text_size, wrap_text
+    from send_policy import SendPolicy
+
+PANEL_TITLE = "Aposta Consciente - XP (proto)"
 
 
 # ==================== UI helpers ====================
@@ -38,128 +66,43 @@ def put_text(img, text, org, scale=0.6, thickness=2):
 
 def draw_panel(frame, score, level, route_label, *,
                pos="tr", panel_w=280, alpha=0.75, font_scale=0.6,
-               line_spacing=6, margin=10):
+               line_spacing=6, margin=10, sprite: Optional[PanelSprite] = None):
+    """
+    Painel translúcido com quebra de linha. Com `sprite`, o painel só é
+    redesenhado quando o texto visível muda; senão, desenha do zero.
+    """
     h, w = frame.shape[:2]
     panel_w = int(max(180, min(panel_w, w * 0.6)))
-    avail_w = panel_w - 2 * margin
-
-    def txt_sz(t: str) -> Tuple[int,int]:
-        (tw, th), _ = cv2.getTextSize(t, cv2.FONT_HERSHEY_SIMPLEX, font_scale, 2)
-        return tw, th
-
-    def wrap_line(text: str) -> list[str]:
-        words = text.split()
-        if not words: return [""]
-        lines, cur = [], ""
-        for tok in words:
-            test = (cur + " " + tok).strip()
-            if not cur or txt_sz(test)[0] <= avail_w:
-                cur = test
-            else:
-                lines.append(cur); cur = tok
-        if cur: lines.append(cur)
-        return lines
-
-    base = [
-        "Aposta Consciente - XP (proto)",
-        f"Stress score: {score:.2f}",
-        f"Nível: {level}",
-        "Sugestão:",
-    ]
-    expanded = []
-    for L in base: expanded.extend(wrap_line(L))
-    expanded.extend(wrap_line(route_label))
-
-    heights = [txt_sz(L)[1] for L in expanded]
-    total_text_h = sum(heights) + line_spacing*(len(expanded)-1)
-    panel_h = total_text_h + 2*margin
-
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    score_txt = f"Stress score: {score:.2f}"
+    sprite = sprite or PanelSprite(alpha)
+    key = (score_txt, level, route_label, panel_w, font_scale, line_spacing, margin)
+
+    if key != sprite.key or alpha != sprite.alpha:
+        avail_w = panel_w - 2 * margin
+        expanded = []
+        for L in (PANEL_TITLE, score_txt, f"Nível: {level}", "Sugestão:", route_label):
+            expanded.extend(wrap_text(L, avail_w, font, font_scale, 2))
+        sizes = [text_size(L, font, font_scale, 2) for L in expanded]
+        heights = [th for _, th in sizes]
+        panel_h = sum(heights) + line_spacing*(len(expanded)-1) + 2*margin
+        # palavra maior que o painel vaza para a direita, como no desenho direto
+        canvas_w = max(panel_w + 1, margin + max(tw for tw, _ in sizes) + 4)
+
+        def draw_text(canvas):
+            y = margin + heights[0]
+            for i, L in enumerate(expanded):
+                put_text(canvas, L, (margin, y), scale=font_scale)
+                if i < len(expanded)-1:
+                    y += heights[i+1] + line_spacing
+
+        sprite.update(key, (panel_h + 1, canvas_w), draw_text, alpha,
+                      panel=(panel_h + 1, panel_w + 1))
+
+    panel_h = sprite.size[0] - 1
     x0 = (w - panel_w - 10) if pos in ("tr","br") else 10
     y0 = 10 if pos in ("tr","tl") else (h - panel_h - 10)
-
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (x0,y0), (x0+panel_w, y0+panel_h), (0,0,0), -1)
-    cv2.rectangle(overlay, (x0,y0), (x0+panel_w, y0+panel_h), (255,255,255), 1)
-    cv2.addWeighted(overlay, alpha, frame, 1-alpha, 0, frame)
-
-    y = y0 + margin + heights[0]
-    for i, L in enumerate(expanded):
-        put_text(frame, L, (x0+margin, y), scale=font_scale)
-        if i < len(expanded)-1:
-            y += heights[i+1] + line_spacing
-
-
-# ==================== Integração REST (FastAPI) ====================
-def post_event(base_url: str, payload: Dict[str,Any], timeout: float=2.5) -> Optional[int]:
-    """
-    Envia POST para {base_url}/events com JSON payload.
-    Espera FastAPI em api.py (endpoint /events).
-    """
-    if not base_url:
-        return None
-    endpoint = base_url.rstrip("/") + "/events"
-    try:
-        if requests is not None:
-            resp = requests.post(endpoint, json=payload, timeout=timeout)
-            return getattr(resp, "status_code", None)
-        # fallback nativo
-        import urllib.request
-        data = json.dumps(payload).encode("utf-8")
-        req = urllib.request.Request(endpoint, data=data, headers={"Content-Type":"application/json"})
-        with urllib.request.urlopen(req, timeout=timeout) as r:
-            return getattr(r, "status", None)
-    except Exception as e:
-        print("[WARN] Falha ao enviar evento:", e)
-        return None
-
-
-# ==================== Heurísticas simples (sem landmarks) ====================
-class SimpleFaceHeuristics:
-    def __init__(self):
-        self.prev_roi = None
-
-    @staticmethod
-    def _norm01(x):
-        return float(max(0.0, min(1.0, x)))
-
-    def compute(self, frame_bgr, face_rect) -> Tuple[float, Dict[str,float]]:
-        x,y,w,h = face_rect
-        roi = frame_bgr[y:y+h, x:x+w]
-        if roi.size == 0:
-            return 0.0, {"jitter":0.0, "mouth_open":0.0, "eye_open":0.0,
-                         "eye_tension":0.0, "brow_tension":0.0, "mouth_press":0.0,
-                         "mouth_gasp":0.0, "brow_eye_min":0.0}
-
-        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
-
-        # --- JITTER: movimento médio no ROI (normalizado)
-        jitter = 0.0
-        if self.prev_roi is not None and self.prev_roi.shape == gray.shape:
-            diff = cv2.absdiff(gray, self.prev_roi)
-            jitter = float(diff.mean())/255.0
-        self.prev_roi = gray.copy()
-
-        # --- "Abertura da boca" proxy: média brilho metade inferior vs superior
-        h2 = gray.shape[0]//2
-        top = gray[:h2, :]
-        bot = gray[h2:, :]
-        diff_mean = max(0.0, float(bot.mean() - top.mean())) / 255.0
-        mouth_open = self._norm01(diff_mean * 2.0)  # ganho
-
-        # score final simples
-        score = self._norm01(0.55*jitter + 0.45*mouth_open)
-
-        parts = {
-            "jitter": float(jitter),
-            "mouth_open": float(mouth_open),
-            "eye_open": 0.0,
-            "eye_tension": 0.0,
-            "brow_tension": 0.0,
-            "mouth_press": 0.0,
-            "mouth_gasp": 0.0,
-            "brow_eye_min": 0.0
-        }
-        return score, parts
+    sprite.blit(frame, x0, y0)
 
 
 # ==================== Main ====================
@@ -170,14 +113,27 @@ def main():
     parser.add_argument("--width", type=int, default=960)
     parser.add_argument("--no-draw", action="store_true", help="Não desenhar retângulo do rosto.")
     parser.add_argument("--threshold", type=float, default=0.65, help="Limiar de alerta (0..1)")
-    parser.add_argument("--cooldown", type=float, default=8.0, help="Tempo mínimo (s) entre alertas")
+    parser.add_argument("--cooldown", type=float, default=8.0, help="Tempo mínimo (s) entre alertas (por nível)")
+    parser.add_argument("--smoothing", type=str, default="mean", choices=["mean", "ema"],
+                        help="Suavização do score: média móvel ou EMA")
+    parser.add_argument("--window", type=int, default=30, help="Janela de suavização (frames)")
+    parser.add_argument("--hysteresis", type=float, default=0.0,
+                        help="Margem p/ descer de nível (0 = sem histerese)")
     parser.add_argument("--csv", type=str, default="", help="Se definido, exporta CSV com score por frame.")
     # REST/FastAPI
     parser.add_argument("--api", type=str, default="http://127.0.0.1:8000")
     parser.add_argument("--user-id", type=str, default="demo-admin")
     parser.add_argument("--device-id", type=str, default="xp-edge-01")
-    parser.add_argument("--push-interval", type=float, default=1.0)
-    help="Intervalo mínimo (s) entre POSTs de eventos"
+    parser.add_argument("--push-interval", type=float, default=1.0,
+                        help="Intervalo mín. (s) entre envios por variação de score (ou fixo, c/ --send-policy interval)")
+    parser.add_argument("--send-policy", type=str, default="change", choices=["change", "interval"],
+                        help="change = só troca de nível/alerta, variação > --send-epsilon e heartbeat")
+    parser.add_argument("--send-epsilon", type=float, default=0.05, help="Variação de score que justifica envio")
+    parser.add_argument("--heartbeat", type=float, default=30.0, help="Envio mínimo sem mudanças (s)")
+    parser.add_argument("--batch-size", type=int, default=50, help="Eventos por lote enviado à API")
+    parser.add_argument("--batch-window", type=float, default=1.0, help="Janela máx. (s) para fechar um lote")
+    parser.add_argument("--spool", type=str, default="events_spool.jsonl",
+                        help="Spool em disco p/ eventos não entregues (vazio = desliga)")
     # painel
     parser.add_argument("--panel-pos", type=str, default="tr", help="tr, tl, br, bl")
     parser.add_argument("--panel-w", type=int, default=280, help="Largura do painel (px)")
@@ -186,11 +142,73 @@ def main():
     parser.add_argument("--no-panel", action="store_true", help="Não desenhar painel")
     # headless
     parser.add_argument("--out-video", type=str, default="", help="Se informado, salva MP4 processado (sem janela).")
+    parser.add_argument("--out-codec", type=str, default="mp4v",
+                        help="FourCC do vídeo (mp4v, MJPG, avc1, XVID...); container = extensão de --out-video")
+    parser.add_argument("--out-fps", type=float, default=0.0, help="FPS do vídeo gravado (0 = FPS da fonte)")
+    parser.add_argument("--out-segments", action="store_true",
+                        help="Grava só trechos ao redor de alertas (<base>_alert_NNN.ext)")
+    parser.add_argument("--pre-roll", type=float, default=3.0, help="Segundos antes do alerta (--out-segments)")
+    parser.add_argument("--post-roll", type=float, default=5.0, help="Segundos após o último alerta (--out-segments)")
+    parser.add_argument("--video-queue", type=int, default=32, help="Fila saída→encoder (frames)")
+    # detecção
+    parser.add_argument("--detect-every", type=int, default=1,
+                        help="Roda o Haar a cada N frames e rastreia entre eles (1 = todo frame)")
+    parser.add_argument("--track-min-conf", type=float, default=0.6,
+                        help="Confiança mínima do tracker (0..1); abaixo disso redetecta")
+    parser.add_argument("--track-pad", type=float, default=0.5,
+                        help="Margem da janela de busca do tracker (fração do rosto)")
+    parser.add_argument("--detect-strategy", type=str, default="full", choices=["full", "adaptive"],
+                        help="adaptive = janela do rosto anterior → pirâmide reduzida → frame inteiro")
+    parser.add_argument("--pyramid-scale", type=float, default=0.5,
+                        help="Escala do nível reduzido da pirâmide (estratégia adaptive)")
+    # score
+    parser.add_argument("--target-fps", type=float, default=0.0,
+                        help="Se > 0, degrada (detecção espaçada/reduzida, score pulado) p/ segurar esse FPS")
+    parser.add_argument("--latency-budget", type=float, default=250.0,
+                        help="Latência captura→saída máx. (ms) antes de degradar (--target-fps)")
+    parser.add_argument("--adapt-max-level", type=int, default=4, help="Degrau máximo da degradação (0..4)")
+    parser.add_argument("--scorer", type=str, default="simple", choices=["simple", "fixed"],
+                        help="fixed = ROI reamostrado p/ buffer fixo pré-alocado (sem alocação por frame)")
+    parser.add_argument("--roi-size", type=int, default=64, help="Lado do buffer do scorer fixed (px)")
+    parser.add_argument("--multi-face", action="store_true",
+                        help="Pontua todos os rostos (trackId + estado por rosto; um evento por trilha)")
+    parser.add_argument("--max-faces", type=int, default=8, help="Trilhas simultâneas (--multi-face)")
+    parser.add_argument("--track-iou", type=float, default=0.3, help="IoU mínimo p/ manter o trackId")
+    parser.add_argument("--track-misses", type=int, default=10,
+                        help="Frames sem caixa até encerrar a trilha (mín. = --detect-every)")
+    # pipeline (captura → detecção → saída)
+    parser.add_argument("--capture-depth", type=int, default=4, help="Fila captura→detecção (frames)")
+    parser.add_argument("--output-depth", type=int, default=4, help="Fila detecção→saída (frames)")
+    parser.add_argument("--queue-policy", type=str, default="auto", choices=["auto", "drop", "block"],
+                        help="drop = descarta o frame mais antigo (tempo real); block = não perde frames. "
+                             "auto: drop p/ webcam, block p/ arquivo")
+    # instrumentação
+    parser.add_argument("--profile", action="store_true",
+                        help="Mede cada estágio (p50/p95/p99, FPS) e imprime [PROF] periodicamente")
+    parser.add_argument("--profile-interval", type=float, default=10.0, help="Intervalo do resumo [PROF] (s)")
+    parser.add_argument("--profile-port", type=int, default=0,
+                        help="Se > 0, expõe http://127.0.0.1:PORTA/metrics (Prometheus)")
+    parser.add_argument("--profile-window", type=int, default=1000, help="Amostras por estágio p/ os percentis")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="Imprime [BOOT]: tempo de import/inicialização por componente até o 1º frame")
 
     args = parser.parse_args()
 
+    # o parse do XML do Haar roda em paralelo com a abertura da câmera/arquivo
+    cascade_box = {}
+    def _load_cascade():
+        t = time.perf_counter()
+        try:
+            cascade_box["cascade"] = load_face_cascade()
+        except Exception as e:
+            cascade_box["error"] = e
+        cascade_box["s"] = time.perf_counter() - t
+    cascade_th = threading.Thread(target=_load_cascade, name="cascade-load", daemon=True)
+    cascade_th.start()
+
     # vídeo
-    cap = cv2.VideoCapture(0 if not args.video else args.video)
+    with BOOT.step("abrir captura"):
+        cap = cv2.VideoCapture(0 if not args.video else args.video)
     if args.video:
         print(f"[INFO] Abrindo vídeo: {args.video}")
     if not cap.isOpened():
@@ -217,59 +235,164 @@ def main():
             csv_writer = None
 
     target_w = max(320, int(args.width))
-    router = TrainingRouter()
-    heur = SimpleFaceHeuristics()
-    score_window = deque(maxlen=30)
-    last_alert_t = 0.0
-    frame_idx = 0
+    def make_router():
+        return TrainingRouter(args.threshold, window=args.window, smoothing=args.smoothing,
+                              hysteresis=args.hysteresis,
+                              cooldowns={"medio": args.cooldown, "alto": args.cooldown})
+    router = make_router()
+    heur = FixedSizeFaceHeuristics(args.roi_size) if args.scorer == "fixed" else SimpleFaceHeuristics()
+    # vários rostos: trilhas por IoU/centróide; entre detecções (--detect-every) só o
+    # rosto principal é rastreado, as demais trilhas sobrevivem por --track-misses
+    tracker = multi = None
+    if args.multi_face:
+        from face_tracks import FaceTracker, MultiFaceScorer
+        tracker = FaceTracker(make_router, iou_min=args.track_iou, max_tracks=args.max_faces,
+                              max_misses=max(args.track_misses, args.detect_every))
+        multi = MultiFaceScorer(args.roi_size, tracker.max_tracks)
     t0 = time.time()
 
-    # controle de envio REST
-    last_push = 0.0
-
-    # Haar Cascade
-    face_cascade = cv2.CascadeClassifier(
-        cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
-    )
-
-    # VideoWriter (headless)
-    writer = None
-    fourcc = cv2.VideoWriter_fourcc(*"mp4v")
-
-    while True:
-        ok, frame = cap.read()
-        if not ok:
-            break
-
-        # resize mantendo proporção
-        h, w = frame.shape[:2]
-        if w <= 0 or h <= 0:
-            continue
-        scale = target_w / float(w)
-        frame = cv2.resize(frame, (target_w, int(h*scale)), interpolation=cv2.INTER_AREA)
-
-        # inicializa writer se for salvar vídeo processado
-        if writer is None and args.out_video:
-            out_h, out_w = frame.shape[:2]
-            writer = cv2.VideoWriter(args.out_video, fourcc, 30.0, (out_w, out_h))
-
-        # detecção de rosto
-        gray_full = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    # Haar Cascade (+ tracker entre detecções, se --detect-every > 1)
+    with BOOT.step("aguardar cascade"):
+        cascade_th.join()
+    if "error" in cascade_box:
+        print(f"[ERRO] {cascade_box['error']}")
+        return
+    BOOT.steps.append(("cascade (paralelo)", cascade_box["s"]))
+    locator = FaceLocator(cascade_box["cascade"], detect_every=args.detect_every,
+                          min_conf=args.track_min_conf, search_pad=args.track_pad,
+                          strategy=args.detect_strategy, pyramid_scale=args.pyramid_scale)
+
+    # publicador REST (thread própria; nunca bloqueia a saída)
+    with BOOT.step("publisher"):
+        publisher = EventPublisher(args.api, batch_size=args.batch_size,
+                                   batch_window=args.batch_window, spool_path=args.spool)
+
+    # instrumentação por estágio (--profile); desligada = NullProfiler (métodos vazios)
+    prof = StageProfiler(args.profile_window) if args.profile else NullProfiler()
+
+    # estado do estágio de saída
+    send_policy = SendPolicy(args.send_policy, epsilon=args.send_epsilon,
+                             heartbeat=args.heartbeat, min_interval=args.push_interval)
+    panel_sprite = PanelSprite(args.panel_alpha)
+
+    # --target-fps: degradação adaptativa (escada em adaptive.py)
+    sched = None
+    if args.target_fps > 0:
+        from adaptive import AdaptiveScheduler
+        sched = AdaptiveScheduler(args.target_fps, latency_budget=args.latency_budget / 1000.0,
+                                  max_level=args.adapt_max_level)
+    det_state = {"scale": 1.0, "last": None}   # só a thread de detecção mexe
+
+    # ---------- estágio 1: captura (thread própria) ----------
+    cap_idx = [0]
+
+    def read_frame():
+        while True:
+            t = prof.tick()
+            ok, frame = cap.read()
+            if not ok:
+                return None
+            t = prof.lap("capture", t)
+            # resize mantendo proporção
+            h, w = frame.shape[:2]
+            if w <= 0 or h <= 0:
+                continue
+            scale = target_w / float(w)
+            frame = cv2.resize(frame, (target_w, int(h*scale)), interpolation=cv2.INTER_AREA)
+            prof.lap("resize", t)
+            pkt = {"idx": cap_idx[0], "t_rel": time.time() - t0, "frame": frame,
+                   "t_cap": time.perf_counter()}
+            cap_idx[0] += 1
+            return pkt
+
+    # ---------- estágio 2: detecção + score ----------
+    def detect_and_score(pkt):
+        frame = pkt["frame"]
+        t = prof.tick()
+        # --target-fps: o nível de degradação escolhe escala da detecção,
+        # espaçamento do Haar e se este frame é pontuado
+        mode = sched.mode if sched is not None else None
+        s = mode.detect_scale if mode is not None else 1.0
+        if mode is not None:
+            locator.detect_every = args.detect_every * mode.detect_mult
+            if s != det_state["scale"]:
+                locator.reset(min_size=(max(24, int(60 * s)),) * 2)
+                det_state["scale"] = s
+        src = frame if s == 1.0 else cv2.resize(frame, None, fx=s, fy=s, interpolation=cv2.INTER_LINEAR)
+        gray_full = cv2.cvtColor(src, cv2.COLOR_BGR2GRAY)
         gray_full = cv2.equalizeHist(gray_full)
-        faces = face_cascade.detectMultiScale(gray_full, scaleFactor=1.1, minNeighbors=5, minSize=(60,60))
+        t = prof.lap("preprocess", t)
+        faces = locator.locate(gray_full)
+        if s != 1.0:
+            faces = [tuple(int(round(v / s)) for v in r) for r in faces]
+        t = prof.lap("detect", t)
+        skip = mode is not None and not sched.score_this(pkt["idx"])
+
+        if tracker is not None:
+            seen = tracker.update(faces)
+            pkt["ended"] = tracker.ended_ids
+            if skip and all(tr.decision is not None for tr in seen):
+                # frame sem score (degradação): repete a última decisão de cada trilha
+                tracks = [(tr.id, tr.rect, tr.decision._replace(alert=False), tr.parts, tr)
+                          for tr in seen]
+            else:
+                seen = multi.score(frame, seen)
+                # instantâneo por trilha: a saída roda noutra thread
+                tracks = [(tr.id, tr.rect, tr.decision, tr.parts, tr) for tr in seen]
+            prof.lap("score", t)
+            pkt["tracks"] = tracks
+            faces = []
+            if tracks:
+                # o rosto principal (maior) alimenta HUD, painel e CSV
+                _, rect, d, main_parts, _ = max(tracks, key=lambda x: x[1][2] * x[1][3])
+                pkt.update(face=rect, score=d.score, parts=main_parts,
+                           level=d.level, route=d.label, alert=d.alert)
+                return pkt
 
         if len(faces) > 0:
-            faces = sorted(faces, key=lambda r: r[2]*r[3], reverse=True)
             x, y, w0, h0 = faces[0]
 
-            score, parts = heur.compute(frame, (x,y,w0,h0))
-            score_window.append(score)
-            score_smooth = float(np.mean(score_window))
-
-            level, route_key = router.map_score_to_route(score_smooth, args.threshold)
-            alert_label = router.routes[route_key]["label"]
-
-            if not args.no_draw:
+            if skip and det_state["last"] is not None:
+                # frame sem score (degradação): repete a última decisão, sem novo alerta
+                d, parts = det_state["last"]
+                d = d._replace(alert=False)
+            else:
+                score, parts = heur.compute(frame, (x,y,w0,h0))
+                d = router.update(score)
+                det_state["last"] = (d, parts)
+            prof.lap("score", t)
+            pkt.update(face=(x,y,w0,h0), score=d.score, parts=parts,
+                       level=d.level, route=d.label, alert=d.alert)
+        else:
+            # sem rosto
+            det_state["last"] = None
+            d = router.no_face()
+            pkt.update(face=None, score=d.score, parts=None,
+                       level=d.level, route=d.label, alert=False)
+        return pkt
+
+    def detect_stage(pkt):
+        t = time.perf_counter()
+        out = detect_and_score(pkt)
+        sched.observe("detect", time.perf_counter() - t)
+        return out
+
+    # ---------- estágio 3: saída (desenho, vídeo, CSV, REST) ----------
+    def emit(pkt) -> bool:
+        frame, frame_idx = pkt["frame"], pkt["idx"]
+        score_smooth, level, alert_label = pkt["score"], pkt["level"], pkt["route"]
+        parts = pkt["parts"]
+        t_emit = time.perf_counter()
+        t = prof.tick()
+
+        if pkt["face"] is not None:
+            x, y, w0, h0 = pkt["face"]
+            if not args.no_draw and "tracks" in pkt:
+                for tid, (tx, ty, tw, th), td, _, _ in pkt["tracks"]:
+                    color = (0,255,0) if td.score < args.threshold else (0,0,255)
+                    cv2.rectangle(frame, (tx,ty), (tx+tw, ty+th), color, 2)
+                    put_text(frame, f"#{tid} {td.score:.2f}", (tx, max(14, ty-6)), 0.5, 1)
+            elif not args.no_draw:
                 cv2.rectangle(frame, (x,y), (x+w0, y+h0),
                               (0,255,0) if score_smooth < args.threshold else (0,0,255), 2)
 
@@ -281,35 +404,57 @@ def main():
                           (0,255,0) if score_smooth < args.threshold else (0,0,255), -1)
             put_text(frame, f"score={score_smooth:.2f}  thr={args.threshold:.2f}", (bar_x, bar_y+38), 0.55, 2)
 
-            if not args.no_panel:
-                draw_panel(frame, score_smooth, level, alert_label,
-                           pos=args.panel_pos, panel_w=args.panel_w,
-                           alpha=args.panel_alpha, font_scale=args.font_scale)
-
-            # evento/rota (cooldown) — apenas log
-            now = time.time()
-            if score_smooth >= args.threshold and (now - last_alert_t) > args.cooldown:
-                last_alert_t = now
-                print(f"[ROTA] {alert_label} | score={score_smooth:.2f} | parts={parts}")
-
-            # ===== envio REST periódico =====
-            if args.api and (time.time() - last_push) >= args.push_interval:
-                payload = {
-                    "deviceId": args.device_id,
-                    "userId": args.user_id,
-                    "score": float(round(score_smooth, 3)),
-                    "level": level,             # "leve" | "medio" | "alto" | "neutro"
-                    "route": alert_label,
-                    "ts": int(time.time())
-                }
-                status = post_event(args.api, payload)
-                if status is not None:
-                    print(f"[POST] /events -> HTTP {status}  payload={payload}")
-                last_push = time.time()
-
-            # CSV
-            if csv_writer is not None:
-                t_rel = time.time() - t0
+        if not args.no_panel:
+            draw_panel(frame, score_smooth, level, alert_label,
+                       pos=args.panel_pos, panel_w=args.panel_w,
+                       alpha=args.panel_alpha, font_scale=args.font_scale, sprite=panel_sprite)
+        if sched is not None and sched.level > 0:
+            put_text(frame, f"modo degradado {sched.level}: {sched.mode.name}",
+                     (20, frame.shape[0] - 15), 0.5, 1)
+        t = prof.lap("draw", t)
+
+        now = time.time()
+        for tid in pkt.get("ended", ()):
+            send_policy.forget(f"{args.device_id}#{tid}")   # trilha encerrada: libera o estado
+        if pkt.get("tracks"):
+            # um evento por trilha (política de envio com estado por rosto)
+            for tid, _, td, tparts, _ in pkt["tracks"]:
+                if td.alert:
+                    print(f"[ROTA] #{tid} {td.label} | score={td.score:.2f} | parts={tparts}")
+                if args.api and send_policy.check(f"{args.device_id}#{tid}", td.level,
+                                                  td.score, now, td.alert):
+                    publisher.publish({
+                        "deviceId": args.device_id, "userId": args.user_id, "trackId": tid,
+                        "score": float(round(td.score, 3)), "level": td.level,
+                        "route": td.label, "ts": int(now)
+                    })
+            # nível do device acompanha o rosto principal: sem rostos, a volta a
+            # "neutro" sai na hora (troca de nível), sem esperar o heartbeat
+            send_policy.note(args.device_id, level, score_smooth)
+            t = prof.lap("rest", t)
+        elif pkt["alert"]:
+            # evento/rota (cooldown por nível no router) — apenas log
+            print(f"[ROTA] {alert_label} | score={score_smooth:.2f} | parts={parts}")
+
+        # ===== envio REST (também sem rosto, útil p/ presença): troca de nível,
+        # variação > --send-epsilon ou heartbeat; --send-policy interval = a cada --push-interval
+        if args.api and not pkt.get("tracks") and send_policy.check(
+                args.device_id, level, score_smooth, now, pkt["alert"]):
+            payload = {
+                "deviceId": args.device_id,
+                "userId": args.user_id,
+                "score": float(round(score_smooth, 3)),
+                "level": level,             # "leve" | "medio" | "alto" | "neutro"
+                "route": alert_label,
+                "ts": int(now)
+            }
+            publisher.publish(payload)
+            t = prof.lap("rest", t)
+
+        # CSV
+        if csv_writer is not None:
+            t_rel = pkt["t_rel"]
+            if parts is not None:
                 csv_writer.writerow([
                     frame_idx, f"{t_rel:.3f}", f"{score_smooth:.6f}", level, alert_label,
                     f"{parts.get('eye_tension', 0.0):.6f}",
@@ -321,62 +466,114 @@ def main():
                     f"{parts.get('mouth_open', 0.0):.6f}",
                     f"{parts.get('brow_eye_min', 0.0):.6f}",
                 ])
-
-        else:
-            # sem rosto
-            level = "neutro"
-            alert_label = "Sem rosto - pausar e respirar"
-            score_smooth = 0.0
-
-            if not args.no_panel:
-                draw_panel(frame, score_smooth, level, alert_label,
-                           pos=args.panel_pos, panel_w=args.panel_w,
-                           alpha=args.panel_alpha, font_scale=args.font_scale)
-
-            # envio REST periódico mesmo sem rosto (útil p/ presença)
-            if args.api and (time.time() - last_push) >= args.push_interval:
-                payload = {
-                    "deviceId": args.device_id,
-                    "userId": args.user_id,
-                    "score": 0.0,
-                    "level": level,
-                    "route": alert_label,
-                    "ts": int(time.time())
-                }
-                status = post_event(args.api, payload)
-                if status is not None:
-                    print(f"[POST] /events -> HTTP {status}  payload={payload}")
-                last_push = time.time()
-
-            if csv_writer is not None:
-                t_rel = time.time() - t0
+            else:
                 csv_writer.writerow([
                     frame_idx, f"{t_rel:.3f}", "0.000000", level,
                     alert_label, 0,0,0,0,0,0,0,0
                 ])
+            t = prof.lap("csv", t)
 
-        # saída: janela ou arquivo
+        # saída: janela ou arquivo (encode na thread do AsyncVideoWriter)
         if writer is not None:
-            writer.write(frame)
+            writer.write(frame, hot=pkt["face"] is not None and score_smooth >= args.threshold)
+            prof.lap("output", t)
         else:
             try:
                 put_text(frame, "ESC para sair", (20, 30), 0.6, 2)
                 cv2.imshow("XP - Aposta Consciente (proto) — sem MediaPipe", frame)
                 key = cv2.waitKey(1) & 0xFF
+                prof.lap("output", t)
                 if key == 27:
-                    break
+                    return False
             except Exception as e:
                 print("[WARN] Sem GUI; salve com --out-video. Detalhe:", e)
+                return False
+        prof.frame_done()
+        if sched is not None:
+            now = time.perf_counter()
+            sched.observe("output", now - t_emit)
+            sched.observe_latency(now - pkt["t_cap"])
+            if sched.tick():
+                print(f"[ADAPT] {sched.status_line()}")
+        if frame_idx == 0 and args.startup_profile:
+            BOOT.mark("1º frame")
+            print(f"[BOOT] {BOOT.report()}")
+        return True
+
+    # ---------- montagem do pipeline ----------
+    policy = args.queue_policy
+    if policy == "auto":
+        policy = "block" if args.video else "drop"
+    q_cap = FrameRing(args.capture_depth, policy, name="capture")
+    q_out = FrameRing(args.output_depth, policy, name="output")
+    if prof.enabled:
+        prof.gauge("queue_capture", lambda: len(q_cap), "Frames na fila captura→detecção")
+        prof.gauge("queue_output", lambda: len(q_out), "Frames na fila detecção→saída")
+        prof.gauge("dropped_capture", lambda: q_cap.dropped, "Frames descartados na captura")
+        prof.gauge("dropped_output", lambda: q_out.dropped, "Frames descartados antes da saída")
+        if sched is not None:
+            prof.gauge("degrade_level", lambda: sched.level, "Nível de degradação adaptativa (0 = normal)")
+            prof.gauge("adapt_load", sched.load, "Estágio mais lento / orçamento do --target-fps")
+        prof.gauge("detector_rate", lambda: locator.stats()["detector_rate"], "Fração de frames com Haar")
+        if args.api:
+            prof.gauge("rest_queue", lambda: publisher.metrics()["queue_depth"], "Eventos aguardando envio")
+            prof.gauge("rest_batch_ms", lambda: publisher.avg_batch_ms, "Latência média do POST de lote (ms)")
+            prof.gauge("events_sent", lambda: send_policy.totals()[0], "Eventos liberados pela política de envio")
+            prof.gauge("events_suppressed", lambda: send_policy.totals()[1], "Envios segurados pela política de envio")
+        if args.profile_port:
+            prof.serve(args.profile_port)
+        prof.start_reports(args.profile_interval)
+    writer = None
+    if args.out_video:
+        from video_writer import AsyncVideoWriter
+        out_fps = args.out_fps or cap.get(cv2.CAP_PROP_FPS) or 30.0
+        writer = AsyncVideoWriter(args.out_video, out_fps, codec=args.out_codec,
+                                  queue_size=args.video_queue, policy=policy,
+                                  segments=args.out_segments, pre_roll=args.pre_roll,
+                                  post_roll=args.post_roll, profiler=prof)
+        print(f"[VID] Gravando {'trechos de alerta' if args.out_segments else 'sessão'} em "
+              f"{args.out_video} ({args.out_codec}, {writer.fps:.2f} fps)")
+    stop = threading.Event()
+    cap_th = start_capture(read_frame, q_cap, stop)
+    det_th = StageThread("detect", detect_and_score if sched is None else detect_stage, q_cap, q_out)
+    det_th.start()
+
+    # saída fica na thread principal (imshow/waitKey exigem a thread da GUI)
+    try:
+        while True:
+            pkt = q_out.get()
+            if pkt is None:
                 break
-
-        frame_idx += 1
+            if not emit(pkt):
+                break
+    finally:
+        stop.set()
+        q_cap.close(); q_out.close()
+        cap_th.join(timeout=2.0)
+        det_th.join(timeout=2.0)
+        if q_cap.dropped or q_out.dropped:
+            print(f"[PIPE] frames descartados: captura={q_cap.dropped} saída={q_out.dropped} (policy={policy})")
+        if det_th.processed:
+            print(f"[DET] {locator.stats()} | estágio detecção+score: "
+                  f"{1000.0 * det_th.busy_s / det_th.processed:.2f} ms/frame")
+        if sched is not None:
+            print(f"[ADAPT] nível final={sched.level} trocas={sched.changes} tempo por nível (s)={sched.summary()}")
+        if tracker is not None:
+            print(f"[TRK] trilhas criadas={tracker.created} encerradas={tracker.ended} ativas={len(tracker.tracks)}")
+        if prof.enabled:
+            print(f"[PROF] {prof.summary_line()}")
+            prof.close()
 
     # limpeza
+    if args.api:
+        publisher.close()
+        print(f"[SEND] {send_policy.summary_line()}")
+        print(f"[PUB] {publisher.metrics()}")
     try: cap.release()
     except: pass
     if writer is not None:
-        try: writer.release()
-        except: pass
+        writer.close()
+        print(f"[VID] {writer.stats()}")
     try: cv2.destroyAllWindows()
     except: pass
     if csv_file is not None:
@@ -4,83 +4,67 @@
 main_no_mediapipe.py — Versão simplificada (sem MediaPipe)
 - Detecta rosto com Haar Cascade (OpenCV)
 - Calcula score simples com base em jitter + brilho da boca
-- Exibe painel com texto e envia eventos para API FastAPI
+- Exibe painel com texto e envia eventos para API FastAPI (EventPublisher, em lotes)
+  só quando mudam (SendPolicy: troca de nível, variação de score, heartbeat)
+- Suavização/nível/rota via TrainingRouter (o mesmo do main.py)
+- Painel pré-renderizado (overlay.PanelSprite), refeito só quando o texto muda
 """
 
 import argparse, time, csv, os
-from collections import deque
+from functools import lru_cache
 import cv2
-import numpy as np
 
-try:
-    import requests
-except Exception:
-    requests = None
+from event_publisher import EventPublisher
+from send_policy import SendPolicy
+from training_router import TrainingRouter
+from overlay import PanelSprite, text_size
 
 
 # ------------------------ util: texto ------------------------
 
+_ACCENTS = str.maketrans("çÇãÃáÁàÀâÂéÉêÊíÍóÓôÔõÕúÚñÑ",
+                         "cCaAaAaAaAeEeEiIoOoOoOuUnN")
+
+@lru_cache(maxsize=1024)
 def normalize(text: str) -> str:
     """Troca acentos para evitar 'fantasmas' no putText do OpenCV."""
-    return (text
-            .replace("ç", "c").replace("Ç", "C")
-            .replace("ã", "a").replace("Ã", "A")
-            .replace("á", "a").replace("Á", "A")
-            .replace("à", "a").replace("À", "A")
-            .replace("â", "a").replace("Â", "A")
-            .replace("é", "e").replace("É", "E")
-            .replace("ê", "e").replace("Ê", "E")
-            .replace("í", "i").replace("Í", "I")
-            .replace("ó", "o").replace("Ó", "O")
-            .replace("ô", "o").replace("Ô", "O")
-            .replace("õ", "o").replace("Õ", "O")
-            .replace("ú", "u").replace("Ú", "U")
-            .replace("ñ", "n").replace("Ñ", "N"))
+    return text.translate(_ACCENTS)
 
 def put_text(img, text, org, scale=0.55, color=(255,255,255), thickness=2):
     """Texto com contorno leve para melhor leitura."""
     x, y = org
-    cv2.putText(img, normalize(text), (x+1, y+1),
+    text = normalize(text)
+    cv2.putText(img, text, (x+1, y+1),
                 cv2.FONT_HERSHEY_DUPLEX, scale, (0,0,0), thickness, cv2.LINE_AA)
-    cv2.putText(img, normalize(text), (x, y),
+    cv2.putText(img, text, (x, y),
                 cv2.FONT_HERSHEY_DUPLEX, scale, color, thickness, cv2.LINE_AA)
 
 def draw_panel(frame, score, level, route_label, *, pos="br",
-               panel_w=300, alpha=0.7, margin=10, line_h=22):
-    """Painel lateral com transparência e quebra simples."""
+               panel_w=300, alpha=0.7, margin=10, line_h=22, sprite=None):
+    """Painel lateral com transparência; com `sprite`, só redesenha quando o texto muda."""
     h, w = frame.shape[:2]
     panel_w = int(max(220, min(panel_w, w*0.6)))
+    sprite = sprite or PanelSprite(alpha, blend_border=False)
+    lines = ("Aposta Consciente - XP (proto)", f"Stress score: {score:.2f}",
+             f"Nivel: {level}", "Sugestao:", route_label)
 
-    # define canto
-    x0 = w - panel_w - 10 if "r" in pos else 10
-    y0 = h - 150 - 10 if "b" in pos else 10
-    x1, y1 = x0 + panel_w, y0 + 150
-
-    # fundo translucido
-    overlay = frame.copy()
-    cv2.rectangle(overlay, (x0, y0), (x1, y1), (0,0,0), -1)
-    cv2.addWeighted(overlay, alpha, frame, 1-alpha, 0, frame)
-    cv2.rectangle(frame, (x0, y0), (x1, y1), (255,255,255), 1)
-
-    # conteúdo
-    y = y0 + margin + 18
-    put_text(frame, "Aposta Consciente - XP (proto)", (x0+margin, y)); y += line_h
-    put_text(frame, f"Stress score: {score:.2f}",         (x0+margin, y)); y += line_h
-    put_text(frame, f"Nivel: {level}",                    (x0+margin, y)); y += line_h
-    put_text(frame, "Sugestao:",                          (x0+margin, y)); y += line_h
-    put_text(frame, route_label,                          (x0+margin, y))
+    key = (lines, panel_w, margin, line_h)
+    if key != sprite.key or alpha != sprite.alpha:
+        widest = max(text_size(normalize(L), cv2.FONT_HERSHEY_DUPLEX, 0.55, 2)[0] for L in lines)
+        canvas_w = max(panel_w + 1, margin + widest + 4)
 
+        def draw_text(canvas):
+            cv2.rectangle(canvas, (0, 0), (panel_w, 150), (255,255,255), 1)
+            y = margin + 18
+            for L in lines:
+                put_text(canvas, L, (margin, y)); y += line_h
 
-# ------------------------ REST ------------------------
+        sprite.update(key, (151, canvas_w), draw_text, alpha, panel=(151, panel_w + 1))
 
-def post_event(api_base: str, payload: dict, timeout: float = 3.0):
-    if not api_base or requests is None:
-        return
-    try:
-        r = requests.post(f"{api_base}/events", json=payload, timeout=timeout)
-        print(f"[POST] {r.status_code}: {r.text[:100]}")
-    except Exception as e:
-        print("[WARN] Falha ao enviar evento:", e)
+    # define canto
+    x0 = w - panel_w - 10 if "r" in pos else 10
+    y0 = h - 150 - 10 if "b" in pos else 10
+    sprite.blit(frame, x0, y0)
 
 
 # ------------------------ Heuristica simples ------------------------
@@ -118,11 +102,20 @@ def main():
     parser.add_argument("--video", type=str, default="")
     parser.add_argument("--width", type=int, default=400)
     parser.add_argument("--threshold", type=float, default=0.35)
+    parser.add_argument("--smoothing", type=str, default="mean", choices=["mean", "ema"])
+    parser.add_argument("--window", type=int, default=30)
+    parser.add_argument("--hysteresis", type=float, default=0.0)
     parser.add_argument("--api", type=str, default="http://127.0.0.1:8081")
     parser.add_argument("--user-id", type=str, default="admin")
     parser.add_argument("--device-id", type=str, default="xp-edge-01")
     parser.add_argument("--push-interval", type=float, default=1.0)
+    parser.add_argument("--send-policy", type=str, default="change", choices=["change", "interval"])
+    parser.add_argument("--send-epsilon", type=float, default=0.05)
+    parser.add_argument("--heartbeat", type=float, default=30.0)
     parser.add_argument("--csv", type=str, default="")
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--batch-window", type=float, default=1.0)
+    parser.add_argument("--spool", type=str, default="events_spool.jsonl")
     args = parser.parse_args()
 
     # fonte do video
@@ -135,8 +128,13 @@ def main():
         cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
     )
     heur = SimpleFaceHeuristics()
-    score_window = deque(maxlen=30)
-    last_post_t = 0.0
+    panel = PanelSprite(0.7, blend_border=False)
+    publisher = EventPublisher(args.api, batch_size=args.batch_size,
+                               batch_window=args.batch_window, spool_path=args.spool)
+    router = TrainingRouter(args.threshold, window=args.window, smoothing=args.smoothing,
+                            hysteresis=args.hysteresis, cooldowns={})
+    send_policy = SendPolicy(args.send_policy, epsilon=args.send_epsilon,
+                             heartbeat=args.heartbeat, min_interval=args.push_interval)
     frame_idx = 0
 
     # CSV opcional
@@ -163,23 +161,17 @@ def main():
             x, y, fw, fh = max(faces, key=lambda r: r[2]*r[3])
 
             score, parts = heur.compute(frame, (x, y, fw, fh))
-            score_window.append(score)
-            avg = float(np.mean(score_window))
-
-            if   avg < args.threshold: level = "leve"
-            elif avg < 0.70          : level = "medio"
-            else                      : level = "alto"
-
-            route = "Pausa guiada (respiracao 60s)" if level != "leve" else "Continuar tranquilo"
+            d = router.update(score)
+            avg, level, route = d.score, d.level, d.label
 
             color = (0,255,0) if level == "leve" else (0,0,255)
             cv2.rectangle(frame, (x,y), (x+fw,y+fh), color, 2)
 
-            draw_panel(frame, avg, level, route, pos="br", panel_w=320)
+            draw_panel(frame, avg, level, route, pos="br", panel_w=320, sprite=panel)
 
-            # envia evento com cooldown
+            # envia evento só quando muda (ou heartbeat)
             now = time.time()
-            if now - last_post_t > args.push_interval and args.api:
+            if args.api and send_policy.check(args.device_id, level, avg, now, d.alert):
                 payload = {
                     "deviceId": args.device_id,
                     "userId":   args.user_id,
@@ -188,16 +180,15 @@ def main():
                     "route":    route,
                     "ts":       int(now)
                 }
-                post_event(args.api, payload)
-                last_post_t = now
+                publisher.publish(payload)
 
             if csv_writer:
                 csv_writer.writerow([frame_idx, f"{avg:.4f}", level,
                                      f"{parts['jitter']:.4f}", f"{parts['mouth_open']:.4f}"])
         else:
             # sem rosto
-            draw_panel(frame, 0.0, "neutro", "Sem rosto - pausar e respirar",
-                       pos="br", panel_w=320)
+            d = router.no_face()
+            draw_panel(frame, d.score, d.level, d.label, pos="br", panel_w=320, sprite=panel)
             if csv_writer:
                 csv_writer.writerow([frame_idx, "0.0000", "neutro", "0.0000", "0.0000"])
 
@@ -209,6 +200,10 @@ def main():
         frame_idx += 1
 
     cap.release()
+    if args.api:
+        publisher.close()
+        print(f"[SEND] {send_policy.summary_line()}")
+        print(f"[PUB] {publisher.metrics()}")
     if csv_file:
         csv_file.close()
     cv2.destroyAllWindows()
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+overlay.py — Painel translúcido pré-renderizado (sprite) para o HUD
+- text_size()/wrap_text(): medição e quebra de linha memorizadas (lru_cache);
+  cv2.getTextSize só roda na primeira vez que um texto aparece
+- PanelSprite: o painel (fundo + borda + texto) é desenhado uma vez num canvas do
+  tamanho do painel e reaproveitado enquanto a chave (score formatado, nível,
+  rota, geometria) não muda; por frame só a região do painel é misturada
+- O texto antialiasado é desenhado sobre fundo preto e sobre fundo branco: a
+  diferença dá a cobertura por pixel, então o resultado sobre qualquer frame é
+  o mesmo de desenhar direto nele
+
+Dependências: opencv-python, numpy
+"""
+
+from functools import lru_cache
+from typing import Callable, Hashable, Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+@lru_cache(maxsize=4096)
+def text_size(text: str, font: int, scale: float, thickness: int) -> Tuple[int, int]:
+    (tw, th), _ = cv2.getTextSize(text, font, scale, thickness)
+    return tw, th
+
+
+@lru_cache(maxsize=1024)
+def wrap_text(text: str, avail_w: int, font: int, scale: float, thickness: int) -> Tuple[str, ...]:
+    """Quebra `text` por palavras para caber em avail_w px."""
+    words = text.split()
+    if not words:
+        return ("",)
+    lines, cur = [], ""
+    for tok in words:
+        test = (cur + " " + tok).strip()
+        if not cur or text_size(test, font, scale, thickness)[0] <= avail_w:
+            cur = test
+        else:
+            lines.append(cur); cur = tok
+    if cur:
+        lines.append(cur)
+    return tuple(lines)
+
+
+class PanelSprite:
+    """
+    blend_border=True: a borda faz parte do fundo misturado com `alpha` (como o
+    addWeighted do main.py); False: a borda, se houver, vem opaca em draw_fn.
+
+    Fundo, borda e texto viram um único mapa afim por pixel, out = frame*K + C
+    (float32, pré-calculados), aplicado só na região do painel.
+    """
+
+    def __init__(self, alpha: float = 0.75, blend_border: bool = True):
+        self.alpha = alpha
+        self.blend_border = blend_border
+        self.key: Optional[Hashable] = None
+        self.size: Tuple[int, int] = (0, 0)
+        self._k: Optional[np.ndarray] = None
+        self._c: Optional[np.ndarray] = None
+        self._tmp: Optional[np.ndarray] = None
+        self.rebuilds = 0
+
+    def update(self, key: Hashable, size: Tuple[int, int],
+               draw_fn: Callable[[np.ndarray], None], alpha: Optional[float] = None,
+               panel: Optional[Tuple[int, int]] = None):
+        """
+        Reconstrói o sprite só se `key` (ou tamanho/alpha) mudou. size = (h, w) do
+        canvas; panel = (h, w) do fundo translúcido no canto superior esquerdo
+        (padrão: o canvas todo; menor quando o texto pode vazar do painel).
+        """
+        alpha = self.alpha if alpha is None else alpha
+        if key == self.key and size == self.size and alpha == self.alpha:
+            return
+        self.key, self.size, self.alpha = key, size, alpha
+        ph, pw = size
+        bh, bw = panel or size
+        base = np.zeros((ph, pw, 3), np.float32)
+        if self.blend_border:
+            cv2.rectangle(base, (0, 0), (bw-1, bh-1), (255, 255, 255), 1)
+        fade = np.ones((ph, pw, 1), np.float32)
+        fade[:bh, :bw] = 1.0 - alpha
+        black = np.zeros((ph, pw, 3), np.uint8)
+        white = np.full((ph, pw, 3), 255, np.uint8)
+        draw_fn(black)
+        draw_fn(white)
+        # cobertura do texto: fração do fundo que sobra em cada pixel
+        keep = (white.astype(np.float32) - black) / 255.0
+        self._k = fade * keep
+        self._c = (1.0 - fade) * base * keep + black + 0.5
+        self._tmp = np.empty((ph, pw, 3), np.float32)
+        self.rebuilds += 1
+
+    def blit(self, frame: np.ndarray, x0: int, y0: int):
+        """Mistura o sprite em frame[y0:y0+h, x0:x0+w] (recorta nas bordas do frame)."""
+        if self._k is None:
+            return
+        ph, pw = self.size
+        H, W = frame.shape[:2]
+        fx0, fy0 = max(0, x0), max(0, y0)
+        fx1, fy1 = min(W, x0 + pw), min(H, y0 + ph)
+        if fx1 <= fx0 or fy1 <= fy0:
+            return
+        sx0, sy0 = fx0 - x0, fy0 - y0
+        win = (slice(sy0, sy0 + fy1 - fy0), slice(sx0, sx0 + fx1 - fx0))
+        roi = frame[fy0:fy1, fx0:fx1]
+        tmp = self._tmp[win]
+        cv2.multiply(roi, self._k[win], dst=tmp, dtype=cv2.CV_32F)
+        cv2.add(tmp, self._c[win], dst=tmp)
+        np.copyto(roi, tmp, casting="unsafe")
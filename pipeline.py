@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+pipeline.py — Estágios encadeados (captura → detecção → saída) com filas limitadas
+- FrameRing: ring buffer limitado entre estágios, política "drop" (descarta o mais
+  antigo, mantém tempo real) ou "block" (produtor espera, não perde frames)
+- StageThread: thread que consome uma fila, aplica uma função e publica na próxima
+
+Sem dependências externas (apenas threading).
+"""
+
+import threading, time
+from collections import deque
+from typing import Any, Callable, Optional
+
+POLICIES = ("drop", "block")
+
+
+class FrameRing:
+    """Fila limitada thread-safe. get() devolve None quando fechada e vazia."""
+
+    def __init__(self, maxsize: int = 4, policy: str = "drop", name: str = ""):
+        if policy not in POLICIES:
+            raise ValueError(f"policy inválida: {policy!r} (use {POLICIES})")
+        self.maxsize = max(1, int(maxsize))
+        self.policy = policy
+        self.name = name
+        self._buf: deque = deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self.put_count = 0
+        self.dropped = 0
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def put(self, item: Any, timeout: Optional[float] = None) -> bool:
+        """Enfileira item. Retorna False se a fila foi fechada (ou timeout em "block")."""
+        with self._cond:
+            if self._closed:
+                return False
+            if len(self._buf) >= self.maxsize:
+                if self.policy == "drop":
+                    self._buf.popleft()
+                    self.dropped += 1
+                else:
+                    ok = self._cond.wait_for(
+                        lambda: self._closed or len(self._buf) < self.maxsize, timeout)
+                    if not ok or self._closed:
+                        return False
+            self._buf.append(item)
+            self.put_count += 1
+            self._cond.notify_all()
+            return True
+
+    def get(self, timeout: Optional[float] = None) -> Any:
+        """Retira o item mais antigo; None se fechada e vazia (ou timeout)."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._buf or self._closed, timeout):
+                return None
+            if not self._buf:
+                return None
+            item = self._buf.popleft()
+            self._cond.notify_all()
+            return item
+
+    def close(self):
+        """Sinaliza fim de fluxo: consumidores drenam o que restou e recebem None."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+
+class StageThread(threading.Thread):
+    """
+    Consome `inq`, aplica `fn(item)` e publica o resultado em `outq` (se houver).
+    `fn` pode devolver None para não publicar nada. Ao esgotar a entrada, fecha `outq`.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Any],
+                 inq: FrameRing, outq: Optional[FrameRing] = None):
+        super().__init__(name=name, daemon=True)
+        self.fn = fn
+        self.inq = inq
+        self.outq = outq
+        self.processed = 0
+        self.busy_s = 0.0
+
+    def run(self):
+        try:
+            while True:
+                item = self.inq.get()
+                if item is None:
+                    break
+                t = time.perf_counter()
+                try:
+                    out = self.fn(item)
+                except Exception as e:
+                    print(f"[WARN] Estágio {self.name} falhou:", e)
+                    continue
+                self.busy_s += time.perf_counter() - t
+                self.processed += 1
+                if out is not None and self.outq is not None:
+                    if not self.outq.put(out):
+                        break
+        finally:
+            if self.outq is not None:
+                self.outq.close()
+
+
+def start_capture(read_fn: Callable[[], Any], outq: FrameRing,
+                  stop: threading.Event, name: str = "capture") -> threading.Thread:
+    """
+    Thread de captura: chama read_fn() até devolver None (fim) ou `stop` ser setado.
+    Com política "drop" a captura nunca espera pelos estágios seguintes.
+    """
+    def _loop():
+        try:
+            while not stop.is_set():
+                item = read_fn()
+                if item is None:
+                    break
+                if not outq.put(item):
+                    break
+        except Exception as e:
+            print("[WARN] Captura interrompida:", e)
+        finally:
+            outq.close()
+
+    th = threading.Thread(target=_loop, name=name, daemon=True)
+    th.start()
+    return th
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+profiler.py — Instrumentação opcional por estágio (captura, pré-processamento,
+detecção, score, desenho, REST, encode...)
+- StageProfiler: lap(stage, t0) mede com perf_counter e guarda as últimas
+  `window` amostras por estágio num deque (append é O(1) e seguro entre threads);
+  p50/p95/p99 só são calculados no resumo ou no scrape
+- FPS: instantes de fim de frame (frame_done) nos últimos `fps_window` segundos
+- Gauges: funções registradas (profundidade de filas, descartes, publicador)
+- Resumo periódico ([PROF]) numa thread própria e endpoint HTTP local com o
+  formato texto do Prometheus (GET /metrics)
+- NullProfiler: mesma interface, métodos vazios; é o padrão quando desligado
+- StartupProfile: tempo de import/inicialização por componente (--startup-profile)
+
+Uso:
+    prof = StageProfiler(); prof.serve(9108); prof.start_reports(10.0)
+    t = prof.tick(); ...; t = prof.lap("detect", t); ...; prof.frame_done()
+
+Sem dependências externas.
+"""
+
+import threading, time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+QUANTILES = (0.50, 0.95, 0.99)
+
+
+def _quantiles(samples: List[float]) -> List[float]:
+    if not samples:
+        return [0.0 for _ in QUANTILES]
+    s = sorted(samples)
+    return [s[min(len(s)-1, int(q * (len(s)-1)))] for q in QUANTILES]
+
+
+class NullProfiler:
+    enabled = False
+
+    def tick(self) -> float: return 0.0
+    def lap(self, stage: str, t0: float) -> float: return 0.0
+    def add(self, stage: str, seconds: float): pass
+    def frame_done(self): pass
+    def gauge(self, name: str, fn: Callable[[], float], help: str = ""): pass
+    def serve(self, port: int, host: str = "127.0.0.1"): pass
+    def start_reports(self, interval: float): pass
+    def summary_line(self) -> str: return ""
+    def close(self): pass
+
+
+class StageProfiler:
+    enabled = True
+
+    def __init__(self, window: int = 1000, fps_window: float = 5.0, prefix: str = "facial"):
+        self.window = max(10, int(window))
+        self.fps_window = fps_window
+        self.prefix = prefix
+        self._samples: Dict[str, deque] = {}
+        self._count: Dict[str, int] = {}
+        self._sum: Dict[str, float] = {}
+        self._frames: deque = deque(maxlen=10000)
+        self.frames = 0
+        self._gauges: Dict[str, tuple] = {}
+        self._lock = threading.Lock()   # só p/ criar estágio novo
+        self._stop = threading.Event()
+        self._server: Optional[Any] = None
+
+    # ---------- hot loop ----------
+    tick = staticmethod(time.perf_counter)
+
+    def lap(self, stage: str, t0: float) -> float:
+        """Registra perf_counter() - t0 em `stage`; devolve o instante atual (p/ encadear)."""
+        now = time.perf_counter()
+        self.add(stage, now - t0)
+        return now
+
+    def add(self, stage: str, seconds: float):
+        d = self._samples.get(stage)
+        if d is None:
+            with self._lock:
+                d = self._samples.setdefault(stage, deque(maxlen=self.window))
+                self._count.setdefault(stage, 0)
+                self._sum.setdefault(stage, 0.0)
+        d.append(seconds)
+        self._count[stage] += 1
+        self._sum[stage] += seconds
+
+    def frame_done(self):
+        self._frames.append(time.monotonic())
+        self.frames += 1
+
+    def gauge(self, name: str, fn: Callable[[], float], help: str = ""):
+        self._gauges[name] = (fn, help)
+
+    # ---------- leitura ----------
+    def fps(self) -> float:
+        now = time.monotonic()
+        ts = [t for t in list(self._frames) if now - t <= self.fps_window]
+        if len(ts) < 2:
+            return 0.0
+        return (len(ts) - 1) / max(1e-6, ts[-1] - ts[0])
+
+    def snapshot(self) -> Dict[str, Dict[str, float]]:
+        out = {}
+        for stage, d in list(self._samples.items()):
+            p50, p95, p99 = _quantiles(list(d))
+            out[stage] = {"count": self._count[stage], "sum_s": self._sum[stage],
+                          "p50_ms": p50 * 1e3, "p95_ms": p95 * 1e3, "p99_ms": p99 * 1e3}
+        return out
+
+    def summary_line(self) -> str:
+        parts = [f"fps={self.fps():.1f}"]
+        for stage, st in self.snapshot().items():
+            parts.append(f"{stage} {st['p50_ms']:.1f}/{st['p95_ms']:.1f}/{st['p99_ms']:.1f}ms")
+        return " | ".join(parts) + "  (p50/p95/p99)"
+
+    def prometheus(self) -> str:
+        p = self.prefix
+        lines = [f"# HELP {p}_stage_seconds Duração por estágio (janela das últimas {self.window} amostras)",
+                 f"# TYPE {p}_stage_seconds summary"]
+        for stage, d in list(self._samples.items()):
+            for q, v in zip(QUANTILES, _quantiles(list(d))):
+                lines.append(f'{p}_stage_seconds{{stage="{stage}",quantile="{q}"}} {v:.6f}')
+            lines.append(f'{p}_stage_seconds_sum{{stage="{stage}"}} {self._sum[stage]:.6f}')
+            lines.append(f'{p}_stage_seconds_count{{stage="{stage}"}} {self._count[stage]}')
+        lines += [f"# HELP {p}_fps Frames por segundo (últimos {self.fps_window:g}s)",
+                  f"# TYPE {p}_fps gauge", f"{p}_fps {self.fps():.3f}",
+                  f"# TYPE {p}_frames_total counter", f"{p}_frames_total {self.frames}"]
+        for name, (fn, help) in list(self._gauges.items()):
+            try:
+                v = float(fn())
+            except Exception:
+                continue
+            if help:
+                lines.append(f"# HELP {p}_{name} {help}")
+            lines += [f"# TYPE {p}_{name} gauge", f"{p}_{name} {v:g}"]
+        return "\n".join(lines) + "\n"
+
+    # ---------- saídas ----------
+    def serve(self, port: int, host: str = "127.0.0.1"):
+        """Sobe GET /metrics (Prometheus) numa thread daemon."""
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        prof = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/metrics", "/"):
+                    self.send_error(404)
+                    return
+                body = prof.prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="prof-http", daemon=True).start()
+        print(f"[PROF] métricas em http://{host}:{port}/metrics")
+
+    def start_reports(self, interval: float):
+        if interval <= 0:
+            return
+
+        def _loop():
+            while not self._stop.wait(interval):
+                print(f"[PROF] {self.summary_line()}")
+
+        threading.Thread(target=_loop, name="prof-report", daemon=True).start()
+
+    def close(self):
+        self._stop.set()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+
+class StartupProfile:
+    """
+    Cronômetro do cold start. Uso:
+        boot = StartupProfile()
+        with boot.step("import cv2"): import cv2
+        ...; print(boot.report())
+    """
+
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.steps: List[Tuple[str, float]] = []
+
+    @contextmanager
+    def step(self, name: str):
+        t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((name, time.perf_counter() - t))
+
+    def mark(self, name: str):
+        """Marco absoluto (tempo desde a criação), ex.: primeiro frame."""
+        self.steps.append((f"@{name}", time.perf_counter() - self.t0))
+
+    def report(self) -> str:
+        parts = [f"{name} {sec * 1e3:.0f}ms" for name, sec in self.steps]
+        parts.append(f"total {(time.perf_counter() - self.t0) * 1e3:.0f}ms")
+        return " | ".join(parts)
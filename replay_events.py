@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+replay_events.py — Reproduz tráfego gravado contra a API (asyncio, milhares de devices num processo)
+- Fontes: events_log.csv (ts_iso,deviceId,userId,score,level,route,ts) e/ou
+  scores_face.csv (frame,score,level,jitter,mouth_open; amostrado a cada
+  --push-interval s, como o main.py envia)
+- Tempo: mantém os intervalos originais (ts / frame÷--fps); pausas longas entre
+  sessões são cortadas em --max-gap s. --speed 1 = tempo real, N = N vezes mais
+  rápido, 0 = o mais rápido possível
+- Fan-out: --devices N pares deviceId/userId simulados, cada um reproduz o traço
+  inteiro com uma defasagem aleatória (--stagger), num único httpx.AsyncClient
+- Relatório: eventos/s, status HTTP, erros, latência p50/p95/p99 e atraso de
+  agendamento (quanto o envio saiu depois do instante previsto)
+
+Uso:
+    python replay_events.py --spawn --devices 1000 --speed 10 --duration 60
+    python replay_events.py --url http://127.0.0.1:8081 --source scores_face.csv --devices 200 --speed 1
+    python replay_events.py --spawn --devices 50 --speed 0 --endpoint batch --batch-size 50
+
+Obs.: com milhares de conexões, aumente o limite de arquivos (ulimit -n).
+Dependências: httpx, (com --spawn) uvicorn
+"""
+
+import argparse, asyncio, csv, json, os, random, sys, tempfile, time
+from typing import Any, Dict, List, Tuple
+
+from training_router import LEVEL_ROUTE, ROUTES
+
+Trace = List[Tuple[float, Dict[str, Any]]]
+
+
+def pct(values, p):
+    if not values:
+        return 0.0
+    s = sorted(values)
+    return s[min(len(s)-1, int(round(p/100.0 * (len(s)-1))))]
+
+
+# ==================== Traços ====================
+def load_events_log(path: str, max_gap: float) -> Trace:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        rows = [r for r in csv.DictReader(f) if r.get("ts")]
+    rows.sort(key=lambda r: int(r["ts"]))
+    trace: Trace = []
+    t, prev = 0.0, None
+    for r in rows:
+        ts = int(r["ts"])
+        if prev is not None:
+            t += min(max_gap, ts - prev)
+        prev = ts
+        trace.append((t, {"score": float(r["score"]), "level": r["level"], "route": r["route"]}))
+    return trace
+
+
+def load_scores_face(path: str, fps: float, push_interval: float) -> Trace:
+    trace: Trace = []
+    next_t = 0.0
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        for r in csv.DictReader(f):
+            t = int(r["frame"]) / fps
+            if t + 1e-9 < next_t:
+                continue
+            level = r["level"]
+            trace.append((t, {"score": float(r["score"]), "level": level,
+                              "route": ROUTES[LEVEL_ROUTE.get(level, "sem_rosto")]["label"]}))
+            next_t = t + push_interval
+    return trace
+
+
+def load_trace(paths: List[str], args) -> Trace:
+    """Concatena as fontes (uma depois da outra)."""
+    trace: Trace = []
+    for p in paths:
+        part = (load_scores_face(p, args.fps, args.push_interval)
+                if "frame" in open(p, encoding="utf-8").readline().split(",")
+                else load_events_log(p, args.max_gap))
+        base = trace[-1][0] + 1.0 if trace else 0.0
+        trace.extend((base + t, ev) for t, ev in part)
+        print(f"[REPLAY] {p}: {len(part)} eventos, {part[-1][0] if part else 0:.0f}s de traço")
+    if args.limit:
+        trace = trace[:args.limit]
+    return trace
+
+
+# ==================== Devices simulados ====================
+class Stats:
+    def __init__(self):
+        self.sent = 0
+        self.events = 0
+        self.errors = 0
+        self.duplicates = 0
+        self.status: Dict[int, int] = {}
+        self.lat: List[float] = []
+        self.lag: List[float] = []
+
+    def line(self, elapsed: float) -> str:
+        return (f"{self.events} eventos ({self.events / max(1e-6, elapsed):.0f}/s) | "
+                f"p50={pct(self.lat, 50):.1f}ms p95={pct(self.lat, 95):.1f}ms | "
+                f"erros={self.errors} duplicados={self.duplicates} status={self.status}")
+
+
+async def device(client, dev: int, trace: Trace, args, stats: Stats, t_start: float, stop_at: float):
+    device_id, user_id = f"{args.device_prefix}-{dev:05d}", f"{args.user_prefix}-{dev % args.users}"
+    offset = random.uniform(0, args.stagger) if args.stagger > 0 else 0.0
+    batch: List[Dict[str, Any]] = []
+    for i, (t, ev) in enumerate(trace):
+        due = t_start + (offset + t) / args.speed if args.speed > 0 else 0.0
+        now = time.perf_counter()
+        if stop_at and now >= stop_at:
+            break
+        if due > now:
+            await asyncio.sleep(due - now)
+        # eventId único por rodada: ts é o segundo atual, então linhas iguais do traço
+        # enviadas no mesmo segundo cairiam na dedup por conteúdo da API
+        payload = dict(ev, deviceId=device_id, userId=user_id, ts=int(time.time()),
+                       eventId=f"{args.run_id}-{dev}-{i}")
+        if args.endpoint == "batch":
+            batch.append(payload)
+            if len(batch) < args.batch_size and i < len(trace) - 1:
+                continue
+            path, body, n = "/events/batch", batch, len(batch)
+            batch = []
+        else:
+            path, body, n = "/events", payload, 1
+        t0 = time.perf_counter()
+        if due:
+            stats.lag.append((t0 - due) * 1000.0)
+        try:
+            r = await client.post(path, json=body)
+            stats.status[r.status_code] = stats.status.get(r.status_code, 0) + 1
+            if r.status_code >= 400:
+                stats.errors += 1
+            else:
+                res = r.json()
+                stats.duplicates += (res.get("duplicates", 0) if path == "/events/batch"
+                                     else int(bool(res.get("duplicate"))))
+        except Exception:
+            stats.errors += 1
+            continue
+        finally:
+            stats.sent += 1
+        stats.lat.append((time.perf_counter() - t0) * 1000.0)
+        stats.events += n
+
+
+async def run(url: str, trace: Trace, args) -> Dict[str, Any]:
+    import httpx
+    limits = httpx.Limits(max_connections=args.connections, max_keepalive_connections=args.connections)
+    stats = Stats()
+    async with httpx.AsyncClient(base_url=url, limits=limits,
+                                 timeout=httpx.Timeout(args.timeout, pool=None)) as client:
+        t_start = time.perf_counter()
+        stop_at = t_start + args.duration if args.duration else 0.0
+        tasks = [asyncio.create_task(device(client, d, trace, args, stats, t_start, stop_at))
+                 for d in range(args.devices)]
+        done = asyncio.gather(*tasks)
+        while not done.done():
+            await asyncio.wait([done], timeout=args.report_interval)
+            print(f"[REPLAY] {time.perf_counter() - t_start:6.1f}s  {stats.line(time.perf_counter() - t_start)}")
+        elapsed = time.perf_counter() - t_start
+    return {
+        "url": url, "devices": args.devices, "speed": args.speed, "endpoint": args.endpoint,
+        "trace_events": len(trace), "seconds": round(elapsed, 3),
+        "requests": stats.sent, "events": stats.events,
+        "events_per_s": round(stats.events / max(1e-6, elapsed), 1),
+        "duplicates": stats.duplicates,
+        "errors": stats.errors, "error_rate": round(stats.errors / max(1, stats.sent), 4),
+        "status": {str(k): v for k, v in sorted(stats.status.items())},
+        "lat_p50_ms": round(pct(stats.lat, 50), 2), "lat_p95_ms": round(pct(stats.lat, 95), 2),
+        "lat_p99_ms": round(pct(stats.lat, 99), 2), "lat_max_ms": round(max(stats.lat, default=0.0), 2),
+        "lag_p95_ms": round(pct(stats.lag, 95), 2) if stats.lag else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay de tráfego gravado contra a API")
+    parser.add_argument("--source", type=str, nargs="+", default=["events_log.csv"],
+                        help="events_log.csv e/ou scores_face.csv")
+    parser.add_argument("--url", type=str, default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="Sobe um uvicorn local (CSV temporário)")
+    parser.add_argument("--port", type=int, default=8798)
+    parser.add_argument("--devices", type=int, default=100, help="Pares deviceId/userId simulados")
+    parser.add_argument("--users", type=int, default=0, help="Usuários distintos (0 = um por device)")
+    parser.add_argument("--device-prefix", type=str, default="replay-edge")
+    parser.add_argument("--user-prefix", type=str, default="replay-user")
+    parser.add_argument("--speed", type=float, default=1.0, help="1 = tempo real, N = N×, 0 = máximo")
+    parser.add_argument("--max-gap", type=float, default=5.0, help="Maior pausa (s) mantida do traço")
+    parser.add_argument("--stagger", type=float, default=1.0, help="Defasagem máx. (s de traço) entre devices")
+    parser.add_argument("--fps", type=float, default=30.0, help="FPS do scores_face.csv")
+    parser.add_argument("--push-interval", type=float, default=1.0, help="Amostragem do scores_face.csv (s)")
+    parser.add_argument("--limit", type=int, default=0, help="Eventos do traço por device (0 = todos)")
+    parser.add_argument("--duration", type=float, default=0.0, help="Para após N segundos (0 = fim do traço)")
+    parser.add_argument("--endpoint", type=str, default="events", choices=["events", "batch"])
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--connections", type=int, default=200, help="Conexões HTTP simultâneas")
+    parser.add_argument("--timeout", type=float, default=10.0)
+    parser.add_argument("--report-interval", type=float, default=5.0)
+    parser.add_argument("--json", type=str, default="")
+    args = parser.parse_args()
+    args.users = args.users or args.devices
+    args.run_id = os.urandom(4).hex()
+
+    trace = load_trace(args.source, args)
+    if not trace:
+        print("[ERRO] Traço vazio.")
+        return 1
+
+    proc, tmp = None, None
+    url = args.url.rstrip("/")
+    if args.spawn:
+        from bench_stream import start_server
+        tmp = tempfile.TemporaryDirectory()
+        proc = start_server(args.port, tmp.name)
+        url = f"http://127.0.0.1:{args.port}"
+    try:
+        span = trace[-1][0] / args.speed if args.speed > 0 else 0.0
+        print(f"[REPLAY] {args.devices} devices × {len(trace)} eventos → {url}"
+              + (f" (~{span:.0f}s por device)" if span else " (velocidade máxima)"))
+        res = asyncio.run(run(url, trace, args))
+    finally:
+        if proc is not None:
+            proc.terminate(); proc.wait(timeout=10)
+            tmp.cleanup()
+
+    print(f"[REPLAY] {res['events']} eventos em {res['seconds']}s = {res['events_per_s']} ev/s | "
+          f"p50={res['lat_p50_ms']}ms p95={res['lat_p95_ms']}ms p99={res['lat_p99_ms']}ms | "
+          f"erros={res['errors']} ({res['error_rate']:.2%}) duplicados={res['duplicates']}"
+          + (f" | atraso p95={res['lag_p95_ms']}ms" if res["lag_p95_ms"] is not None else ""))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(res, f, indent=2)
+        print(f"[REPLAY] Resultados em: {args.json}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
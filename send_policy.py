@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+send_policy.py — Quando um evento do edge vale um POST
+- mode="change" (padrão): envia na troca de nível, em alerta do router, quando o
+  score se afasta mais que `epsilon` do último valor enviado (respeitando
+  `min_interval`) e, fora isso, só um heartbeat a cada `heartbeat` segundos —
+  um stream parado em "neutro"/"Sem rosto" vira 1 evento por heartbeat
+- mode="interval": comportamento antigo (um evento a cada `min_interval` s)
+- Estado e contadores por chave (deviceId, ou deviceId#trackId): enviados,
+  enviados por motivo (first/level/alert/delta/heartbeat/interval) e suprimidos;
+  "suprimido" = evento que o modo interval teria enviado (a cada min_interval)
+  e esta política segurou, então enviados + suprimidos ≈ carga antiga
+- check() é O(1) e pode ser chamado em todo frame
+- forget(): remove a chave de uma trilha encerrada (contadores vão p/ o total);
+  note(): registra o nível atual de uma chave sem enviar (ex.: o deviceId enquanto
+  os eventos saem por trilha), para a volta a "neutro" contar como troca de nível
+
+Sem dependências externas.
+"""
+
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+REASONS = ("first", "level", "alert", "delta", "heartbeat", "interval")
+
+
+class _KeyState:
+    __slots__ = ("level", "score", "t", "base_t", "sent", "suppressed", "reasons")
+
+    def __init__(self):
+        self.level: Optional[str] = None
+        self.score = 0.0
+        self.t = 0.0
+        self.base_t = float("-inf")   # cadência do modo interval (referência p/ "suprimido")
+        self.sent = 0
+        self.suppressed = 0
+        self.reasons: Dict[str, int] = {}
+
+
+class SendPolicy:
+    def __init__(self, mode: str = "change", *, epsilon: float = 0.05,
+                 heartbeat: float = 30.0, min_interval: float = 1.0):
+        if mode not in ("change", "interval"):
+            raise ValueError(f"mode inválido: {mode!r} (use 'change' ou 'interval')")
+        self.mode = mode
+        self.epsilon = float(epsilon)
+        self.heartbeat = max(0.0, float(heartbeat))
+        self.min_interval = max(0.0, float(min_interval))
+        self._keys: Dict[Hashable, _KeyState] = {}
+        self._retired = _KeyState()   # contadores das chaves já removidas
+
+    def _reason(self, st: _KeyState, level: str, score: float, now: float, alert: bool) -> str:
+        since = now - st.t
+        if st.level is None:
+            return "first"
+        if self.mode == "interval":
+            return "interval" if since >= self.min_interval else ""
+        if level != st.level:
+            return "level"
+        if alert:
+            return "alert"
+        if abs(score - st.score) >= self.epsilon and since >= self.min_interval:
+            return "delta"
+        if self.heartbeat and since >= self.heartbeat:
+            return "heartbeat"
+        return ""
+
+    def check(self, key: Hashable, level: str, score: float, now: float,
+              alert: bool = False) -> str:
+        """Motivo do envio ("" = suprimir). Se houver motivo, o evento conta como enviado."""
+        st = self._keys.get(key)
+        if st is None:
+            st = self._keys[key] = _KeyState()
+        due = now - st.base_t >= self.min_interval
+        if due:
+            st.base_t = now
+        reason = self._reason(st, level, score, now, alert)
+        if not reason:
+            if due:
+                st.suppressed += 1
+            return ""
+        st.level, st.score, st.t = level, score, now
+        st.sent += 1
+        st.reasons[reason] = st.reasons.get(reason, 0) + 1
+        return reason
+
+    def note(self, key: Hashable, level: str, score: float):
+        """Atualiza o último nível/score da chave sem contar envio."""
+        st = self._keys.get(key)
+        if st is None:
+            st = self._keys[key] = _KeyState()
+        st.level, st.score = level, score
+
+    def forget(self, key: Hashable):
+        st = self._keys.pop(key, None)
+        if st is None:
+            return
+        r = self._retired
+        r.sent += st.sent
+        r.suppressed += st.suppressed
+        for k, n in st.reasons.items():
+            r.reasons[k] = r.reasons.get(k, 0) + n
+
+    # ---------- contadores ----------
+    def per_key(self) -> Dict[str, Dict[str, Any]]:
+        return {str(k): {"sent": st.sent, "suppressed": st.suppressed, **st.reasons}
+                for k, st in self._keys.items()}
+
+    def totals(self) -> Tuple[int, int]:
+        states = (*self._keys.values(), self._retired)
+        return sum(st.sent for st in states), sum(st.suppressed for st in states)
+
+    def summary_line(self) -> str:
+        sent, sup = self.totals()
+        reasons: Dict[str, int] = {}
+        for st in (*self._keys.values(), self._retired):
+            for r, n in st.reasons.items():
+                reasons[r] = reasons.get(r, 0) + n
+        ratio = sup / max(1, sent + sup)
+        rs = " ".join(f"{r}={reasons[r]}" for r in REASONS if r in reasons)
+        return (f"modo={self.mode} enviados={sent} suprimidos={sup} ({ratio:.0%}) | {rs}"
+                f" | chaves={len(self._keys)}")
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+training_router.py — Suavização do score + nível + rota de treino (sem OpenCV/NumPy)
+- ScoreSmoother: média móvel por soma corrente num anel fixo (O(1) por frame,
+  mesmo resultado do np.mean sobre o deque de 30) ou EMA
+- TrainingRouter: nível com histerese (leve → medio → alto), cooldown de alerta
+  por nível e tabela de rotas embutida (ROUTES)
+- Compartilhado por main.py, main_no_mediapipe.py, edge_daemon.py e batch_analyze.py
+
+Uso:
+    router = TrainingRouter(threshold=0.65, window=30, hysteresis=0.03, cooldowns={"medio": 8, "alto": 8})
+    d = router.update(score)          # por frame com rosto
+    d = router.no_face()              # por frame sem rosto
+    d.score, d.level, d.label, d.alert
+
+Sem dependências externas.
+"""
+
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+LEVELS = ("leve", "medio", "alto")
+_RANK = {lv: i for i, lv in enumerate(LEVELS)}
+
+ROUTES: Dict[str, Dict[str, str]] = {
+    "continuar":        {"label": "Continuar tranquilo"},
+    "pausa_respiracao": {"label": "Pausa guiada (respiracao 60s)"},
+    "sem_rosto":        {"label": "Sem rosto - pausar e respirar"},
+}
+LEVEL_ROUTE: Dict[str, str] = {
+    "leve": "continuar", "medio": "pausa_respiracao",
+    "alto": "pausa_respiracao", "neutro": "sem_rosto",
+}
+
+
+class ScoreSmoother:
+    """
+    mode="mean": média das últimas `window` amostras (soma corrente; a soma é
+    recalculada a cada volta do anel para não acumular erro de ponto flutuante).
+    mode="ema":  value = alpha*x + (1-alpha)*value (alpha padrão = 2/(window+1)).
+    """
+
+    def __init__(self, window: int = 30, mode: str = "mean", alpha: Optional[float] = None):
+        if mode not in ("mean", "ema"):
+            raise ValueError(f"mode inválido: {mode!r} (use 'mean' ou 'ema')")
+        self.window = max(1, int(window))
+        self.mode = mode
+        self.alpha = float(alpha) if alpha else 2.0 / (self.window + 1)
+        self.reset()
+
+    def reset(self):
+        self._buf: List[float] = [0.0] * self.window
+        self._i = 0
+        self._n = 0
+        self._sum = 0.0
+        self.value = 0.0
+
+    def push(self, x: float) -> float:
+        x = float(x)
+        if self.mode == "ema":
+            self.value = x if self._n == 0 else self.alpha * x + (1.0 - self.alpha) * self.value
+            self._n = 1
+            return self.value
+        self._sum += x - self._buf[self._i]
+        self._buf[self._i] = x
+        self._i += 1
+        if self._i == self.window:
+            self._i = 0
+            self._sum = sum(self._buf)
+        if self._n < self.window:
+            self._n += 1
+        self.value = self._sum / self._n
+        return self.value
+
+    def __len__(self):
+        return self._n
+
+
+class RouteDecision(NamedTuple):
+    score: float
+    level: str        # "leve" | "medio" | "alto" | "neutro"
+    route_key: str
+    label: str
+    alert: bool       # True quando o nível disparou alerta (fora do cooldown)
+
+
+class TrainingRouter:
+    """
+    Níveis: leve < threshold <= medio < medio_max <= alto.
+    hysteresis > 0: para *descer* de nível o score precisa ficar `hysteresis`
+    abaixo da fronteira (subir continua imediato). 0 = mapeamento direto.
+    cooldowns: segundos entre alertas por nível; níveis fora do dict não alertam.
+    """
+
+    def __init__(self, threshold: float = 0.65, medio_max: float = 0.70, *,
+                 window: int = 30, smoothing: str = "mean", alpha: Optional[float] = None,
+                 hysteresis: float = 0.0, cooldowns: Optional[Dict[str, float]] = None,
+                 routes: Optional[Dict[str, Dict[str, str]]] = None):
+        self.threshold = threshold
+        self.medio_max = medio_max
+        self.hysteresis = max(0.0, float(hysteresis))
+        self.cooldowns = dict(cooldowns) if cooldowns is not None else {"medio": 8.0, "alto": 8.0}
+        self.routes = routes or ROUTES
+        self.smoother = ScoreSmoother(window, smoothing, alpha)
+        self.level: Optional[str] = None
+        self._last_alert: Dict[str, float] = {}
+        self.transitions = 0
+        self.alerts = 0
+
+    def classify(self, score: float, threshold: Optional[float] = None) -> str:
+        thr = self.threshold if threshold is None else threshold
+        if score < thr:
+            return "leve"
+        if score < self.medio_max:
+            return "medio"
+        return "alto"
+
+    def map_score_to_route(self, score: float, threshold: Optional[float] = None) -> Tuple[str, str]:
+        """Mapeamento sem estado: score → (level, route_key)."""
+        level = self.classify(score, threshold)
+        return level, LEVEL_ROUTE[level]
+
+    def _level_with_hysteresis(self, score: float) -> str:
+        raw = self.classify(score)
+        cur = self.level
+        if cur not in _RANK or self.hysteresis <= 0.0 or _RANK[raw] >= _RANK[cur]:
+            return raw
+        # descendo: só desce até onde o score + margem permite
+        held = self.classify(score + self.hysteresis)
+        return LEVELS[min(_RANK[cur], _RANK[held])]
+
+    def _decide(self, score: float, level: str, now: Optional[float]) -> RouteDecision:
+        if level != self.level:
+            self.transitions += 1
+            self.level = level
+        alert = False
+        cd = self.cooldowns.get(level)
+        if cd is not None:
+            now = time.time() if now is None else now
+            if now - self._last_alert.get(level, float("-inf")) > cd:
+                self._last_alert[level] = now
+                self.alerts += 1
+                alert = True
+        key = LEVEL_ROUTE[level]
+        return RouteDecision(score, level, key, self.routes[key]["label"], alert)
+
+    def update(self, score: float, now: Optional[float] = None) -> RouteDecision:
+        """Frame com rosto: suaviza o score bruto e decide nível/rota/alerta."""
+        smooth = self.smoother.push(score)
+        return self._decide(smooth, self._level_with_hysteresis(smooth), now)
+
+    def no_face(self, now: Optional[float] = None) -> RouteDecision:
+        """Frame sem rosto: nível neutro; a janela de suavização é mantida."""
+        return self._decide(0.0, "neutro", now)
@@ -0,0 +1,131 @@
+# -*- coding: utf-8 -*-
+"""
+video_writer.py — Gravação do vídeo anotado fora da thread de saída
+- AsyncVideoWriter: os frames entram numa FrameRing limitada e uma thread própria
+  faz o encode (cv2.VideoWriter), então o encode não segura detecção/HUD
+- FPS vem da fonte (CAP_PROP_FPS); codec = FourCC configurável, container pela
+  extensão do arquivo (.mp4, .avi, .mkv...)
+- Modo por segmentos (segments=True): só grava trechos ao redor de alertas.
+  Fora de alerta os frames ficam num ring buffer de pre_roll segundos; quando um
+  frame "quente" chega, abre <base>_alert_NNN<ext>, despeja o pre-roll e segue
+  gravando até post_roll segundos depois do último frame quente
+
+Dependências: opencv-python
+"""
+
+import os, threading, time
+from collections import deque
+from typing import Any, Dict
+
+import cv2
+
+from pipeline import FrameRing
+
+
+class AsyncVideoWriter:
+    def __init__(self, path: str, fps: float, *, codec: str = "mp4v",
+                 queue_size: int = 32, policy: str = "block",
+                 segments: bool = False, pre_roll: float = 3.0, post_roll: float = 5.0,
+                 profiler=None):
+        if len(codec) != 4:
+            raise ValueError(f"codec inválido: {codec!r} (FourCC de 4 letras, ex.: mp4v, MJPG, avc1)")
+        self.path = path
+        self.fps = float(fps) if fps and fps > 0 else 30.0
+        self.fourcc = cv2.VideoWriter_fourcc(*codec)
+        self.segments = segments
+        self.pre_frames = max(0, int(round(pre_roll * self.fps)))
+        self.post_frames = max(1, int(round(post_roll * self.fps)))
+        self._q = FrameRing(queue_size, policy, name="video")
+        self._writer = None
+        self._size = None
+        self._pre: deque = deque(maxlen=self.pre_frames or None)
+        self._tail = 0          # frames restantes do post-roll no segmento aberto
+        self.written = 0
+        self.segment_count = 0
+        self.encode_s = 0.0
+        self.failed = False
+        self.profiler = profiler  # opcional: StageProfiler (estágio "encode")
+        self._th = threading.Thread(target=self._run, name="video-writer", daemon=True)
+        self._th.start()
+
+    # ---------- produtor ----------
+    def write(self, frame, hot: bool = False) -> bool:
+        """Enfileira o frame (o chamador não deve mais alterá-lo). hot = frame de alerta."""
+        return self._q.put((frame, hot))
+
+    def close(self, timeout: float = 30.0):
+        self._q.close()
+        self._th.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "written": self.written,
+            "dropped": self._q.dropped,
+            "segments": self.segment_count,
+            "fps": self.fps,
+            "encode_ms": round(1000.0 * self.encode_s / self.written, 2) if self.written else 0.0,
+        }
+
+    # ---------- thread de encode ----------
+    def _open(self, path: str):
+        h, w = self._size
+        wr = cv2.VideoWriter(path, self.fourcc, self.fps, (w, h))
+        if not wr.isOpened():
+            print(f"[WARN] VideoWriter não abriu {path} (codec/container incompatíveis?)")
+            self.failed = True
+            return None
+        return wr
+
+    def _segment_path(self) -> str:
+        base, ext = os.path.splitext(self.path)
+        return f"{base}_alert_{self.segment_count:03d}{ext or '.mp4'}"
+
+    def _encode(self, frame):
+        t = time.perf_counter()
+        self._writer.write(frame)
+        dt = time.perf_counter() - t
+        self.encode_s += dt
+        if self.profiler is not None:
+            self.profiler.add("encode", dt)
+        self.written += 1
+
+    def _run(self):
+        try:
+            while True:
+                item = self._q.get()
+                if item is None:
+                    break
+                frame, hot = item
+                if self._size is None:
+                    self._size = frame.shape[:2]
+                    if not self.segments:
+                        self._writer = self._open(self.path)
+                if self.failed:
+                    continue
+                if not self.segments:
+                    self._encode(frame)
+                    continue
+                if hot:
+                    if self._writer is None:
+                        self.segment_count += 1
+                        self._writer = self._open(self._segment_path())
+                        if self._writer is None:
+                            continue
+                        while self._pre:
+                            self._encode(self._pre.popleft())
+                    self._tail = self.post_frames
+                if self._writer is not None:
+                    self._encode(frame)
+                    if not hot:
+                        self._tail -= 1
+                    if self._tail <= 0:
+                        self._writer.release()
+                        self._writer = None
+                elif self.pre_frames:
+                    self._pre.append(frame)
+        except Exception as e:
+            print("[WARN] Gravação de vídeo interrompida:", e)
+        finally:
+            if self._writer is not None:
+                self._writer.release()
+                self._writer = None